@@ -3,14 +3,21 @@
 from __future__ import annotations
 
 import logging
+import time
 
 import arcade
 
-from .core.config import load_config
+from .battle.core.replay import Replay, ReplayWriter
+from .core.config import DATA_DIR, load_config
+from .core.profiler import FrameProfiler
+from .core.saveio import SaveWriter, close_archive
 from .core.scene import SceneStack
 
 logger = logging.getLogger(__name__)
 
+TRACES_DIR = DATA_DIR / "traces"
+REPLAYS_DIR = DATA_DIR / "replays"
+
 
 class MainApp(arcade.Window):
     """Main Arcade window hosting a SceneStack."""
@@ -19,23 +26,61 @@ class MainApp(arcade.Window):
         cfg = load_config()
         super().__init__(cfg.window_width, cfg.window_height, cfg.window_title)
         logging.basicConfig(level=logging.INFO)
-        self.scene_stack = SceneStack(self)
+        self.settings = cfg
+        # F3 toggles recording and the overlay, F4 writes a Chrome trace
+        self.profiler = FrameProfiler()
+        self.profiler.set_enabled(cfg.profile)
+        self.profiler.overlay = cfg.profile
+        self.scene_stack = SceneStack(self, self.profiler)
         self.save_slot: int | None = None
         self.save_data = None
+        # saves are written off the UI thread; close() waits for them
+        self.save_writer = SaveWriter()
+        self.replay_writer = ReplayWriter(REPLAYS_DIR, cfg.replays_kept)
+        self.skill_watcher = None
+        if cfg.watch_skills:
+            from .battle.core.skills import SkillWatcher
+
+            self.skill_watcher = SkillWatcher()
+            self.skill_watcher.start()
 
         from .scenes.title import TitleScene
 
         # Start at the title scene to allow menu navigation
         self.scene_stack.push(TitleScene(self))
 
+    def watch_replay(self, replay: Replay) -> None:
+        """Play ``replay`` back at real speed over the current scene."""
+        from .scenes.battle_shuttle import BattleShuttleScene
+
+        self.scene_stack.push(BattleShuttleScene(self, replay=replay))
+
     def on_draw(self) -> None:
         self.clear()
         self.scene_stack.on_draw()
+        self.profiler.draw(self.height)
 
     def on_update(self, delta_time: float) -> None:
+        self.save_writer.poll()
         self.scene_stack.on_update(delta_time)
 
+    def close(self) -> None:
+        self.save_writer.close()
+        self.replay_writer.close()
+        close_archive()
+        super().close()
+
     def on_key_press(self, symbol: int, modifiers: int) -> None:
+        if symbol == arcade.key.F3:
+            on = not self.profiler.enabled
+            self.profiler.set_enabled(on)
+            self.profiler.overlay = on
+            return
+        if symbol == arcade.key.F4 and self.profiler.enabled:
+            path = TRACES_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+            self.profiler.export_chrome(path)
+            logger.info("trace written to %s", path)
+            return
         self.scene_stack.on_key_press(symbol, modifiers)
 
     def on_key_release(self, symbol: int, modifiers: int) -> None:
@@ -0,0 +1,279 @@
+"""Lookahead command policies.
+
+Every living opponent combined with every skill is a candidate. Candidates are
+scored by rollouts: the battle is cloned once and restored from a snapshot
+before each rollout, the candidate is applied and the battle is played forward
+for ``horizon`` ticks, the searching side focusing fire and its opponents
+attacking the nearest target. Rollouts run in rounds; within a round every
+candidate sees the same hit rolls. The search can stop after any round and
+keeps the focus-fire choice unless another candidate is clearly better.
+
+:class:`LookaheadPolicy` searches inside ``decide`` and is deterministic when
+its budget has no deadline, which suits headless simulations.
+:class:`AsyncLookaheadPolicy` runs the search on a worker and answers through
+:meth:`~AsyncLookaheadPolicy.poll`, so a frame never waits for it.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import statistics
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from random import Random
+from typing import TYPE_CHECKING
+
+from .models import PlannedAction, Unit
+from .policy import PENDING, LowestHpPolicy, NearestTargetPolicy, _Pending
+from .skills import skill_table
+
+if TYPE_CHECKING:
+    from .controller import BattleController
+
+logger = logging.getLogger(__name__)
+
+# (skill index, target slot)
+Candidate = tuple[int, int]
+
+
+@dataclass(frozen=True, slots=True)
+class SearchBudget:
+    """Limits for one decision."""
+
+    rollouts: int
+    horizon: int  # ticks simulated per rollout
+    deadline: float | None = None  # seconds; None searches the full budget
+
+
+DIFFICULTY: dict[str, SearchBudget] = {
+    "easy": SearchBudget(rollouts=12, horizon=240, deadline=0.004),
+    "normal": SearchBudget(rollouts=48, horizon=600, deadline=0.012),
+    "hard": SearchBudget(rollouts=192, horizon=1200, deadline=0.030),
+}
+
+
+# ticks a rollout runs between deadline checks
+ROLLOUT_SLICE = 60
+
+
+def candidates(ctrl: BattleController, unit: Unit) -> list[Candidate]:
+    foes = [
+        slot
+        for slot, u in enumerate(ctrl._slots)
+        if u.side != unit.side and u.state != "DEAD"
+    ]
+    return [(k, t) for k in range(len(skill_table())) for t in foes]
+
+
+def evaluate(ctrl: BattleController, side: str) -> float:
+    """Score in ``[-2, 2]``: hp share of ``side`` minus that of its
+    opponents, plus or minus one for a decided battle."""
+    hp = {"ally": 0, "enemy": 0}
+    cap = {"ally": 0, "enemy": 0}
+    for u in ctrl._slots:
+        hp[u.side] += max(0, u.hp)
+        cap[u.side] += u.stats.max_hp
+    foe = "enemy" if side == "ally" else "ally"
+    score = hp[side] / (cap[side] or 1) - hp[foe] / (cap[foe] or 1)
+    if ctrl.winner:
+        score += 1.0 if ctrl.winner == side else -1.0
+    return score
+
+
+def search(
+    ctrl: BattleController, slot: int, budget: SearchBudget, seed: int | str
+) -> Candidate | None:
+    """Return the best candidate for the unit in ``slot``, or ``None`` to
+    wait. ``ctrl`` is only cloned, never modified."""
+    start = time.perf_counter()
+    unit = ctrl._slots[slot]
+    options = candidates(ctrl, unit)
+    if len(options) <= 1:
+        return options[0] if options else None
+    skills = skill_table().skills
+    base = ctrl.clone()
+    # the searching side focuses fire in rollouts; opponents are modelled
+    # as nearest-target attackers
+    foe = "enemy" if unit.side == "ally" else "ally"
+    base.policies = {unit.side: LowestHpPolicy(), foe: NearestTargetPolicy()}
+    # units still waiting for a command decide with the rollout policy; the
+    # searching unit waits for the candidates (a synchronous policy is
+    # asked while it is still IDLE)
+    for u in base._slots:
+        if u.state == "COMMAND" and u is not base._slots[slot]:
+            u.state = "IDLE"
+            base.mark_ready(u)
+    base._slots[slot].state = "COMMAND"
+    # the candidate the rollout policy would pick is the default; another
+    # one has to beat it clearly, otherwise noise spreads the damage around
+    plan = base.policies[unit.side].decide(base, base._slots[slot])
+    default = 0
+    if plan:
+        default = options.index(
+            (skill_table().lookup(plan.skill_id), base._slot_of[plan.target_id])
+        )
+    rng = Random(seed)  # noqa: S311
+    start_state = base.snapshot()
+    stop = math.inf if budget.deadline is None else start + budget.deadline
+    n = len(options)
+    scores: list[list[float]] = [[] for _ in options]
+    # every round plays all candidates against the same hit rolls, so their
+    # scores differ by the choice rather than by luck; a round cut short by
+    # the deadline is dropped and the finished rounds decide
+    while (len(scores[0]) + 1) * n <= max(budget.rollouts, n):
+        round_seed = rng.getrandbits(64)
+        played: list[float] = []
+        for k, target in options:
+            if time.perf_counter() >= stop:
+                break
+            base.restore(start_state)
+            base.rng.seed(round_seed)
+            base.decide_action(base._slots[slot], skills[k].id, base._slots[target])
+            if base.ready_queue:
+                base.enqueue_ready_units()
+            if not _rollout(base, base.ticks + budget.horizon, stop):
+                break
+            played.append(evaluate(base, unit.side))
+        if len(played) < n:
+            break
+        for c, score in enumerate(played):
+            scores[c].append(score)
+    best, best_gain = default, 0.0
+    for c in range(n):
+        if c != default:
+            gain = _clear_gain(scores[c], scores[default])
+            if gain > best_gain:
+                best, best_gain = c, gain
+    return options[best]
+
+
+def _rollout(ctrl: BattleController, until: int, stop: float) -> bool:
+    """Run ``ctrl`` to tick ``until`` in slices of :data:`ROLLOUT_SLICE`
+    ticks; ``False`` once :func:`time.perf_counter` passes ``stop``."""
+    tick = ctrl.ticks
+    while tick < until:
+        tick = min(tick + ROLLOUT_SLICE, until)
+        if ctrl.run(tick) != "ongoing":
+            return True
+        if time.perf_counter() >= stop:
+            return False
+    return True
+
+
+def _clear_gain(scores: list[float], baseline: list[float]) -> float:
+    """Mean paired improvement over ``baseline``, or 0 unless it exceeds
+    two standard errors."""
+    diffs = [a - b for a, b in zip(scores, baseline, strict=True)]
+    if len(diffs) < 2:
+        return 0.0
+    mean = statistics.fmean(diffs)
+    error = statistics.stdev(diffs) / math.sqrt(len(diffs))
+    return mean if mean > 2 * error else 0.0
+
+
+def _seed(ctrl: BattleController, slot: int) -> str:
+    # derived from the battle, never drawn from ctrl.rng: searching must not
+    # change the battle's own random sequence
+    return f"{ctrl.seed}:{ctrl.ticks}:{slot}"
+
+
+def _plan(
+    ctrl: BattleController, unit: Unit, choice: Candidate | None
+) -> PlannedAction | None:
+    if choice is None:
+        return None
+    k, target = choice
+    return PlannedAction(
+        skill_id=skill_table().skills[k].id,
+        user_id=unit.id,
+        target_id=ctrl._slots[target].id,
+        skill=k,
+    )
+
+
+class LookaheadPolicy:
+    """Search synchronously inside ``decide``."""
+
+    def __init__(self, budget: SearchBudget = DIFFICULTY["normal"]) -> None:
+        self.budget = budget
+
+    def decide(self, controller: BattleController, unit: Unit) -> PlannedAction | None:
+        slot = controller._slot_of[unit.id]
+        choice = search(controller, slot, self.budget, _seed(controller, slot))
+        return _plan(controller, unit, choice)
+
+
+_shared: ThreadPoolExecutor | None = None
+
+
+def _shared_executor() -> ThreadPoolExecutor:
+    global _shared
+    if _shared is None:
+        _shared = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lookahead")
+    return _shared
+
+
+class AsyncLookaheadPolicy:
+    """Search on a worker; units stay in ``COMMAND`` until :meth:`poll`
+    finds their answer.
+
+    The default worker is a single shared thread. The search holds the GIL
+    in short slices, so the frame loop keeps running; pass a
+    ``ProcessPoolExecutor`` to move it off the interpreter entirely. The
+    controller holds the battle clock while a search runs, and the deadline
+    of the budget bounds that pause.
+    """
+
+    def __init__(
+        self,
+        budget: SearchBudget = DIFFICULTY["normal"],
+        executor: Executor | None = None,
+    ) -> None:
+        self.budget = budget
+        self.executor = executor
+        self._pending: dict[int, Future[Candidate | None]] = {}
+
+    def decide(self, controller: BattleController, unit: Unit) -> _Pending:
+        slot = controller._slot_of[unit.id]
+        state = controller.clone()
+        state.policies = dict.fromkeys(state.policies)
+        pool = self.executor or _shared_executor()
+        self._pending[slot] = pool.submit(
+            search, state, slot, self.budget, _seed(controller, slot)
+        )
+        return PENDING
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._pending)
+
+    def poll(self, controller: BattleController) -> None:
+        if not self._pending:
+            return
+        for slot, future in list(self._pending.items()):
+            if not future.done():
+                continue
+            del self._pending[slot]
+            unit = controller._slots[slot]
+            if unit.state != "COMMAND":
+                continue
+            try:
+                choice = future.result()
+            except Exception:
+                logger.exception("lookahead search failed")
+                choice = None
+            if choice is None:
+                controller.wait(unit)
+            else:
+                skill, target = choice
+                controller.decide_action(
+                    unit, skill_table().skills[skill].id, controller._slots[target]
+                )
+
+    def cancel(self) -> None:
+        """Drop every outstanding search."""
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
@@ -1,47 +1,150 @@
-"""Simple placeholders for battle effects and damage pops."""
+"""Battle effects and damage pops.
 
-from __future__ import annotations
-
-import time
-from dataclasses import dataclass
-
-import arcade
+Each battle scene owns an :class:`EffectSystem`. Effects age on the battle
+clock: :meth:`EffectSystem.update` receives simulated seconds, so they keep
+pace with the battle at any speed and freeze when it pauses.
 
+Entries live in fixed-capacity pools of typed arrays. Every entry of a pool
+lasts equally long and entries are added in clock order, so the oldest are
+always the first to expire: expiring only moves the pool's tail and a full
+pool reuses its oldest slot. Neither a hit nor a frame allocates.
+"""
 
-@dataclass
-class DamagePop:
-    value: str
-    pos: tuple[float, float]
-    start: float
-
-
-_effects: list[tuple[str, float, tuple[float, float]]] = []
-_damage: list[DamagePop] = []
-
+from __future__ import annotations
 
-def update(dt: float) -> None:
-    now = time.time()
-    _effects[:] = [e for e in _effects if now - e[1] < 0.5]
-    _damage[:] = [d for d in _damage if now - d.start < 1.0]
+import math
+from array import array
+from functools import lru_cache
 
+import arcade
 
-def draw() -> None:  # pragma: no cover - visuals
-    for name, _start, pos in _effects:
+from ...core.text import draw_text
+from .models import Unit, Vec2
+
+FLASH_TIME = 0.5
+POP_TIME = 1.0
+SHAKE_TIME = 0.25
+SHAKE_MAGNITUDE = 6.0
+
+
+class _Pool:
+    """Ring of timed entries sharing one lifetime."""
+
+    __slots__ = ("lifetime", "x", "y", "start", "value", "head", "count")
+
+    def __init__(self, capacity: int, lifetime: float) -> None:
+        self.lifetime = lifetime
+        self.x = array("d", bytes(8 * capacity))
+        self.y = array("d", bytes(8 * capacity))
+        self.start = array("d", bytes(8 * capacity))
+        self.value = array("i", bytes(4 * capacity))
+        self.head = 0  # oldest live entry
+        self.count = 0
+
+    def add(self, now: float, pos: Vec2, value: int = 0) -> None:
+        capacity = len(self.x)
+        if self.count == capacity:
+            i = self.head  # full: the oldest entry makes room
+            self.head = (i + 1) % capacity
+        else:
+            i = (self.head + self.count) % capacity
+            self.count += 1
+        self.x[i], self.y[i] = pos
+        self.start[i] = now
+        self.value[i] = value
+
+    def expire(self, now: float) -> None:
+        capacity = len(self.x)
+        start, lifetime = self.start, self.lifetime
+        while self.count and now - start[self.head] >= lifetime:
+            self.head = (self.head + 1) % capacity
+            self.count -= 1
+
+    def live(self) -> range:
+        """Slot numbers of live entries, oldest first; take them modulo the
+        capacity."""
+        return range(self.head, self.head + self.count)
+
+    def clear(self) -> None:
+        self.head = self.count = 0
+
+
+@lru_cache(maxsize=1024)
+def _label(value: int) -> str:
+    return str(value)
+
+
+class EffectSystem:
+    """Flashes, screen shake and damage pops of one battle.
+
+    :meth:`play_effect` and :meth:`pop_damage` match the controller's
+    ``on_effect`` and ``on_damage`` callbacks.
+    """
+
+    def __init__(self, flashes: int = 64, pops: int = 256) -> None:
+        self.now = 0.0
+        self._flashes = _Pool(flashes, FLASH_TIME)
+        self._pops = _Pool(pops, POP_TIME)
+        self._shake_end = 0.0
+        self._shake_time = 0.0
+        self._shake_magnitude = 0.0
+
+    def update(self, dt: float) -> None:
+        self.now += dt
+        self._flashes.expire(self.now)
+        self._pops.expire(self.now)
+
+    def play_effect(self, name: str, user: Unit, target: Unit) -> None:
         if name == "flash":
-            arcade.draw_circle_filled(pos[0], pos[1], 30, arcade.color.WHITE)
-    for dmg in _damage:
-        alpha = int(255 * (1 - (time.time() - dmg.start)))
-        arcade.draw_text(dmg.value, dmg.pos[0], dmg.pos[1] + 20, (255, 0, 0, alpha), 16)
-
-
-def play_effect(name: str, user, target) -> None:
-    _effects.append((name, time.time(), target.pos))
-
-
-def pop_damage(value: int, pos: tuple[float, float]) -> None:
-    _damage.append(DamagePop(str(value), pos, time.time()))
-
-
-def shake(duration: float, magnitude: float) -> None:
-    # Placeholder: no camera implementation
-    pass
+            self._flashes.add(self.now, target.pos)
+        elif name == "shake":
+            self.shake(SHAKE_TIME, SHAKE_MAGNITUDE)
+
+    def pop_damage(self, value: int, pos: Vec2) -> None:
+        self._pops.add(self.now, pos, value)
+
+    def shake(self, duration: float, magnitude: float) -> None:
+        """Shake the field for ``duration`` seconds; a stronger or longer
+        shake replaces a weaker one still running."""
+        left = self._shake_end - self.now
+        if left > 0 and magnitude * duration < self._shake_magnitude * left:
+            return
+        self._shake_end = self.now + duration
+        self._shake_time = duration
+        self._shake_magnitude = magnitude
+
+    def offset(self) -> Vec2:
+        """Camera offset of the running shake, decaying to zero."""
+        left = self._shake_end - self.now
+        if left <= 0:
+            return (0.0, 0.0)
+        amount = self._shake_magnitude * left / self._shake_time
+        # fixed frequencies rather than random jitter: replays look the same
+        return (amount * math.sin(self.now * 97.0), amount * math.cos(self.now * 71.0))
+
+    def clear(self) -> None:
+        self._flashes.clear()
+        self._pops.clear()
+        self._shake_end = 0.0
+
+    def draw(self) -> None:  # pragma: no cover - visuals
+        now = self.now
+        pool = self._flashes
+        capacity = len(pool.x)
+        for j in pool.live():
+            i = j % capacity
+            alpha = int(255 * (1 - (now - pool.start[i]) / FLASH_TIME))
+            arcade.draw_circle_filled(pool.x[i], pool.y[i], 30, (255, 255, 255, alpha))
+        pool = self._pops
+        capacity = len(pool.x)
+        for j in pool.live():
+            i = j % capacity
+            age = now - pool.start[i]
+            alpha = int(255 * (1 - age / POP_TIME))
+            draw_text(
+                _label(pool.value[i]),
+                pool.x[i],
+                pool.y[i] + 20,
+                (255, 0, 0, alpha),
+                16,
+            )
@@ -0,0 +1,566 @@
+"""Array-backed unit storage for very large shuttle-run battles.
+
+:class:`ArrayBattleController` runs the same rules as
+:class:`~game.battle.core.controller.BattleController` but keeps per-unit
+state in NumPy arrays (struct-of-arrays). Finding due transitions, ATB fill
+and movement are masked vector operations, so a battle can hold tens of
+thousands of units. The scene and widgets keep working on
+:class:`UnitView` objects, which read and write the arrays in place.
+
+NumPy is optional; it is only needed when this module is used.
+"""
+
+from __future__ import annotations
+
+import copy
+from array import array
+from collections.abc import Iterable
+from dataclasses import replace
+from math import ceil
+from random import Random
+from typing import Any
+
+from .controller import _EPS, CENTER_X, PX_PER_SEC, BattleController
+from .events import EventBus
+from .models import STATE_CODE, STATES, PlannedAction, Stats, Unit, UnitState, Vec2
+from .skills import skill_table
+from .snapshot import BattleSnapshot, capture_rng, restore_rng
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+IDLE = STATE_CODE["IDLE"]
+CHARGE = STATE_CODE["CHARGE"]
+COOLDOWN = STATE_CODE["COOLDOWN"]
+DEAD = STATE_CODE["DEAD"]
+
+SIDE_CODE = {"ally": 0, "enemy": 1}
+
+_FIELDS: tuple[tuple[str, str], ...] = (
+    ("state", "int8"),
+    ("side", "int8"),
+    ("facing", "int8"),
+    ("hp", "int32"),
+    ("atb", "float64"),
+    ("x", "float64"),
+    ("y", "float64"),
+    ("home_x", "float64"),
+    ("speed", "float64"),
+    ("atb_rate", "float64"),
+    ("threshold", "float64"),
+    # phase bookkeeping, see BattleController
+    ("start", "int64"),
+    ("origin", "float64"),
+    ("due", "int64"),
+    # pending action: skill index and target slot, -1 when empty
+    ("skill", "int16"),
+    ("target", "int32"),
+)
+_EMPTY_IS_NEGATIVE = ("due", "skill", "target")
+
+
+class UnitArrays:
+    """Struct-of-arrays store; every field is an array indexed by slot."""
+
+    state: Any
+    side: Any
+    facing: Any
+    hp: Any
+    atb: Any
+    x: Any
+    y: Any
+    home_x: Any
+    speed: Any
+    atb_rate: Any
+    threshold: Any
+    start: Any
+    origin: Any
+    due: Any
+    skill: Any
+    target: Any
+
+    def __init__(self, capacity: int = 64) -> None:
+        if np is None:
+            raise RuntimeError("NumPy is required for array-backed battles")
+        self.size = 0
+        self.capacity = max(1, capacity)
+        self.ids: list[str] = []
+        self.slot_of: dict[str, int] = {}
+        for name, dtype in _FIELDS:
+            setattr(self, name, np.zeros(self.capacity, dtype=dtype))
+        for name in _EMPTY_IS_NEGATIVE:
+            getattr(self, name)[:] = -1
+
+    def append(self, unit: Unit, tick_speed: float) -> int:
+        """Copy ``unit`` into the next free slot and return its index."""
+        if self.size == self.capacity:
+            self.reserve(self.capacity * 2)
+        i = self.size
+        self.size += 1
+        self.ids.append(unit.id)
+        self.slot_of[unit.id] = i
+        self.state[i] = STATE_CODE[unit.state]
+        self.side[i] = SIDE_CODE[unit.side]
+        self.facing[i] = unit.facing
+        self.hp[i] = unit.hp
+        self.atb[i] = unit.atb
+        self.x[i], self.y[i] = unit.pos
+        self.home_x[i] = unit.home_x
+        self.speed[i] = unit.stats.spd * tick_speed
+        self.atb_rate[i] = unit.stats.atb_rate
+        self.threshold[i] = unit.stats.threshold
+        return i
+
+    def copy(self) -> UnitArrays:
+        """Return a store with copies of every array."""
+        other = UnitArrays.__new__(UnitArrays)
+        other.size = self.size
+        other.capacity = self.capacity
+        other.ids = self.ids.copy()
+        other.slot_of = self.slot_of.copy()
+        for name, _ in _FIELDS:
+            setattr(other, name, getattr(self, name).copy())
+        return other
+
+    def reserve(self, capacity: int) -> None:
+        """Grow every array to hold at least ``capacity`` units."""
+        if capacity <= self.capacity:
+            return
+        self.capacity = capacity
+        for name, _ in _FIELDS:
+            old = getattr(self, name)
+            fill = -1 if name in _EMPTY_IS_NEGATIVE else 0
+            new = np.full(self.capacity, fill, dtype=old.dtype)
+            new[: old.shape[0]] = old
+            setattr(self, name, new)
+
+
+class UnitView:
+    """Lightweight :class:`Unit` look-alike backed by a :class:`UnitArrays`."""
+
+    __slots__ = ("_store", "index", "id", "name", "side", "lane", "stats", "target_id")
+
+    def __init__(self, store: UnitArrays, index: int, unit: Unit) -> None:
+        self._store = store
+        self.index = index
+        self.id = unit.id
+        self.name = unit.name
+        self.side = unit.side
+        self.lane = unit.lane
+        self.stats: Stats = unit.stats
+        self.target_id = unit.target_id
+
+    @property
+    def hp(self) -> int:
+        return int(self._store.hp[self.index])
+
+    @hp.setter
+    def hp(self, value: int) -> None:
+        self._store.hp[self.index] = value
+
+    @property
+    def atb(self) -> float:
+        return float(self._store.atb[self.index])
+
+    @atb.setter
+    def atb(self, value: float) -> None:
+        self._store.atb[self.index] = value
+
+    @property
+    def state(self) -> UnitState:
+        return STATES[self._store.state[self.index]]
+
+    @state.setter
+    def state(self, value: UnitState) -> None:
+        self._store.state[self.index] = STATE_CODE[value]
+
+    @property
+    def pos(self) -> Vec2:
+        i = self.index
+        return (float(self._store.x[i]), float(self._store.y[i]))
+
+    @pos.setter
+    def pos(self, value: Vec2) -> None:
+        i = self.index
+        self._store.x[i], self._store.y[i] = value
+
+    @property
+    def home_x(self) -> float:
+        return float(self._store.home_x[self.index])
+
+    @property
+    def facing(self) -> int:
+        return int(self._store.facing[self.index])
+
+    @property
+    def action_queue(self) -> _ActionSlot:
+        return _ActionSlot(self)
+
+
+class _ActionSlot:
+    """List-like access to the single pending action stored in the arrays."""
+
+    __slots__ = ("_view",)
+
+    def __init__(self, view: UnitView) -> None:
+        self._view = view
+
+    def __bool__(self) -> bool:
+        return bool(self._view._store.skill[self._view.index] >= 0)
+
+    def __len__(self) -> int:
+        return int(bool(self))
+
+    def append(self, pa: PlannedAction) -> None:
+        view = self._view
+        store = view._store
+        store.skill[view.index] = (
+            pa.skill if pa.skill >= 0 else skill_table().lookup(pa.skill_id)
+        )
+        store.target[view.index] = store.slot_of.get(pa.target_id, -1)
+
+    def pop(self, index: int = 0) -> PlannedAction:
+        view = self._view
+        store = view._store
+        i = view.index
+        skill = int(store.skill[i])
+        target = int(store.target[i])
+        pa = PlannedAction(
+            skill_id=skill_table().skills[skill].id,
+            user_id=view.id,
+            target_id=store.ids[target] if target >= 0 else None,
+            skill=skill,
+        )
+        store.skill[i] = -1
+        store.target[i] = -1
+        return pa
+
+
+class SortedSide:
+    """Living units of one side as arrays sorted by ``(x, slot)``; the
+    array counterpart of :class:`~.targeting.SideIndex`.
+
+    Deaths are cut out of the arrays as they happen. Other changes (units
+    added, units stopping, state restored) mark the index stale, and while
+    any of its units is on the move it is re-sorted once per tick, the first
+    time it is queried, from the positions of every slot at that tick.
+    Queries are :func:`numpy.searchsorted` bisections.
+    """
+
+    def __init__(self, store: UnitArrays, side: str) -> None:
+        self.store = store
+        self.code = SIDE_CODE[side]
+        self.xs: Any = np.empty(0)
+        self.slots: Any = np.empty(0, dtype=np.int64)
+        self.moving = False
+        self._stale = True
+        self._synced = -1
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def add(self, slot: int, x: float) -> None:
+        self._stale = True
+
+    def remove(self, slot: int) -> None:
+        if self._stale:
+            return
+        i = np.flatnonzero(self.slots == slot)
+        if i.size:
+            self.xs = np.delete(self.xs, i)
+            self.slots = np.delete(self.slots, i)
+
+    def move(self, slot: int, x: float) -> None:
+        self._stale = True
+
+    def start_moving(self, slot: int) -> None:
+        self.moving = True
+
+    def stop_moving(self, slot: int, x: float) -> None:
+        self._stale = True
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    def sync(self, tick: int, positions: Any) -> None:
+        """Re-sort if stale or if units were moving since ``tick`` was last
+        synced; ``positions`` holds the x of every slot at ``tick``."""
+        if not self._stale and (tick == self._synced or not self.moving):
+            return
+        store = self.store
+        n = store.size
+        state = store.state[:n]
+        mine = (store.side[:n] == self.code) & (state != DEAD)
+        slots = np.flatnonzero(mine)
+        xs = positions[slots]
+        order = np.lexsort((slots, xs))
+        self.slots = slots[order]
+        self.xs = xs[order]
+        self.moving = bool(((state == CHARGE) | (state == COOLDOWN))[slots].any())
+        self._stale = False
+        self._synced = tick
+
+    def nearest(self, x: float) -> int:
+        """Return the slot closest to ``x``, or ``-1`` when empty.
+
+        Ties go to the lowest slot, like :meth:`.SideIndex.nearest`.
+        """
+        xs = self.xs
+        n = len(xs)
+        if not n:
+            return -1
+        i = int(xs.searchsorted(x))
+        if i == n:
+            return int(self.slots[xs.searchsorted(xs[n - 1])])
+        right = int(self.slots[i])
+        if i == 0:
+            return right
+        left_x = xs[i - 1]
+        d_left = x - left_x
+        d_right = xs[i] - x
+        if d_right < d_left:
+            return right
+        left = int(self.slots[xs.searchsorted(left_x)])
+        if d_left < d_right:
+            return left
+        return left if left < right else right
+
+
+class ArrayBattleController(BattleController):
+    """:class:`BattleController` whose units live in a :class:`UnitArrays`.
+
+    Due transitions are found with one vectorized scan of the ``due`` array
+    instead of a heap, and the earliest due tick is cached between scans.
+    Positions/ATB are evaluated for all units at once and nearest targets
+    come from a :class:`SortedSide` per side. Transitions themselves reuse
+    the base class rules through the views, so for the same seed and roster
+    both controllers produce the same battle.
+    """
+
+    def __init__(self, seed: int | None = None, *, capacity: int = 64, **kwargs: Any):
+        super().__init__(seed, **kwargs)
+        self.store = UnitArrays(capacity)
+        self.targets = self._side_indexes()  # type: ignore[assignment]
+        self._slots: list[UnitView] = []  # type: ignore[assignment]
+        self._x_cache_tick = -1
+        self._x_cache: Any = None
+        # earliest due tick, see _next_due
+        self._earliest: int | None = None
+        self._earliest_known = False
+
+    def add_unit(self, unit: Unit) -> None:
+        store = self.store
+        slot = store.append(unit, PX_PER_SEC * self.tick)
+        view = UnitView(store, slot, unit)
+        self.units[unit.id] = view  # type: ignore[assignment]
+        self._slots.append(view)
+        self._slot_of[unit.id] = slot
+        store.start[slot] = self.ticks
+        if unit.state != "DEAD":
+            self.alive[unit.side] += 1
+            self.targets[unit.side].add(slot, unit.pos[0])
+        self._check_end = True
+        if self._damage is not None:
+            self._damage.extend(self._slots)  # type: ignore[arg-type]
+        if unit.state == "IDLE":
+            self._begin_idle(view)  # type: ignore[arg-type]
+
+    def clone(self) -> BattleController:
+        """Return an independent copy of the battle for lookahead search.
+
+        The arrays are copied and new views made over them; otherwise this
+        follows :meth:`BattleController.clone`.
+        """
+        other = copy.copy(self)
+        store = other.store = self.store.copy()
+        other.units = {}
+        other._slots = []
+        for view in self._slots:
+            dup = UnitView(store, view.index, view)  # type: ignore[arg-type]
+            dup.stats = replace(view.stats)
+            other.units[dup.id] = dup  # type: ignore[assignment]
+            other._slots.append(dup)
+        slots = other._slots
+        other.ready_queue = self.ready_queue.copy(lambda u: slots[u.index])  # type: ignore[attr-defined]
+        other._slot_of = self._slot_of.copy()
+        other.targets = other._side_indexes()  # type: ignore[assignment]
+        other.policies = self.policies.copy()
+        other.alive = self.alive.copy()
+        other.rng = Random()  # noqa: S311
+        other.rng.setstate(self.rng.getstate())
+        other.events = EventBus()
+        other.on_command = other.on_effect = other.on_damage = None
+        other.recorder = other.playback = None
+        other.profiler = None
+        other._x_cache_tick = -1
+        other._x_cache = None
+        return other
+
+    def snapshot(self) -> BattleSnapshot:
+        """Copy the used part of every array; stats outside the arrays
+        (hp cap, attack, defence) are not captured."""
+        store = self.store
+        n = store.size
+        return BattleSnapshot(
+            size=n,
+            ticks=self.ticks,
+            acc=self._acc,
+            winner=self.winner,
+            alive=(self.alive["ally"], self.alive["enemy"]),
+            units={name: getattr(store, name)[:n].copy() for name, _ in _FIELDS},
+            actions=array("q"),
+            ready=array("q", [u.index for u in self.ready_queue]),  # type: ignore[attr-defined]
+            heap=None,
+            seq=None,
+            sides=(),
+            rng=capture_rng(self.rng),
+        )
+
+    def restore(self, snap: BattleSnapshot) -> None:
+        store = self.store
+        n = store.size
+        if snap.size != n:
+            raise ValueError("snapshot was taken from a different roster")
+        for name, values in snap.units.items():
+            getattr(store, name)[:n] = values
+        self.ticks = snap.ticks
+        self._acc = snap.acc
+        self.winner = snap.winner
+        self.alive["ally"], self.alive["enemy"] = snap.alive
+        self._check_end = True
+        self.ready_queue.clear()
+        for i in snap.ready:
+            self.mark_ready(self._slots[i])  # type: ignore[arg-type]
+        self._x_cache_tick = -1
+        self._earliest_known = False
+        for index in self.targets.values():
+            index.invalidate()  # type: ignore[attr-defined]
+        restore_rng(self.rng, snap.rng)
+
+    def add_units(self, units: Iterable[Unit]) -> None:
+        units = list(units)
+        self.store.reserve(self.store.size + len(units))
+        super().add_units(units)
+
+    # simulation
+    def advance_to(self, tick: int) -> None:
+        if self._check_end:
+            self._end_if_over()
+        store = self.store
+        slots = self._slots
+        while True:
+            due = self._next_due()
+            if due is None or due > tick:
+                break
+            self.ticks = due
+            for slot in np.flatnonzero(store.due[: store.size] == due).tolist():
+                # a unit killed earlier in this tick has been cancelled
+                if store.due[slot] == due:
+                    self._cancel(slot)
+                    self._transition(slots[slot])  # type: ignore[arg-type]
+            if self.ready_queue:
+                self.enqueue_ready_units()
+        if tick > self.ticks:
+            self.ticks = tick
+
+    def interpolate(self, alpha: float = 0.0) -> None:
+        store = self.store
+        n = store.size
+        t = self.ticks + alpha
+        state = store.state[:n]
+        idle = state == IDLE
+        atb = store.origin[:n] + store.atb_rate[:n] * self.tick * (t - store.start[:n])
+        np.minimum(atb, store.threshold[:n], out=atb)
+        store.atb[:n][idle] = atb[idle]
+        store.x[:n] = self._positions(t)
+
+    def find_target(self, unit: Unit) -> Unit | None:
+        t = self.ticks
+        if self._x_cache_tick != t:
+            self._x_cache = self._positions(t)
+            self._x_cache_tick = t
+        xs = self._x_cache
+        index = self.targets["enemy" if unit.side == "ally" else "ally"]
+        index.sync(t, xs)  # type: ignore[arg-type]
+        slot = index.nearest(float(xs[self._slot_of[unit.id]]))
+        return self._slots[slot] if slot >= 0 else None  # type: ignore[return-value]
+
+    def _side_indexes(self) -> dict[str, SortedSide]:
+        return {side: SortedSide(self.store, side) for side in SIDE_CODE}
+
+    # phase helpers
+    def _schedule(self, slot: int, tick: int) -> None:
+        self.store.due[slot] = tick
+        earliest = self._earliest
+        if self._earliest_known and (earliest is None or tick < earliest):
+            self._earliest = tick
+
+    def _cancel(self, slot: int) -> None:
+        due = self.store.due
+        if due[slot] == self._earliest:
+            self._earliest_known = False
+        due[slot] = -1
+
+    def _next_due(self) -> int | None:
+        # cached until the earliest transition is cancelled or has run;
+        # only then is the due array scanned again
+        if not self._earliest_known:
+            due = self.store.due[: self.store.size]
+            pending = due[due >= 0]
+            self._earliest = int(pending.min()) if pending.size else None
+            self._earliest_known = True
+        return self._earliest
+
+    def _begin_idle(self, unit: Unit) -> None:
+        store = self.store
+        slot = self._slot_of[unit.id]
+        store.start[slot] = self.ticks
+        store.origin[slot] = store.atb[slot]
+        per_tick = store.atb_rate[slot] * self.tick
+        if per_tick <= 0:
+            self._cancel(slot)
+            return
+        need = (store.threshold[slot] - store.atb[slot]) / per_tick
+        self._schedule(slot, self.ticks + max(1, ceil(need - _EPS)))
+
+    def _begin_move(self, unit: Unit, dest: float) -> None:
+        store = self.store
+        slot = self._slot_of[unit.id]
+        x = store.x[slot]
+        store.start[slot] = self.ticks
+        store.origin[slot] = x
+        per_tick = store.speed[slot]
+        if per_tick <= 0:
+            self._cancel(slot)
+            return
+        need = abs(dest - x) / per_tick
+        self._schedule(slot, self.ticks + max(1, ceil(need - _EPS)))
+        self.targets[unit.side].start_moving(slot)
+
+    def _transition(self, unit: Unit) -> None:
+        super()._transition(unit)
+        if self._x_cache_tick == self.ticks:
+            # on its transition tick a unit is exactly at its stored x
+            slot = self._slot_of[unit.id]
+            self._x_cache[slot] = self.store.x[slot]
+
+    def _positions(self, t: float) -> Any:
+        """Return the x position of every slot at tick ``t``."""
+        store = self.store
+        n = store.size
+        state = store.state[:n]
+        x = store.x[:n].copy()
+        charge = state == CHARGE
+        back = state == COOLDOWN
+        moving = charge | back
+        if not moving.any():
+            return x
+        dest = np.where(charge, float(CENTER_X), store.home_x[:n])
+        x0 = store.origin[:n]
+        travelled = store.speed[:n] * (t - store.start[:n])
+        forward = np.minimum(dest, x0 + travelled)
+        backward = np.maximum(dest, x0 - travelled)
+        x[moving] = np.where(dest >= x0, forward, backward)[moving]
+        return x
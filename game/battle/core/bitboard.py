@@ -0,0 +1,138 @@
+"""Bitboards for the grid ATB battle.
+
+A board is a Python int with one bit per cell, bit ``y * width + x``.
+:class:`Bitboards` keeps one board per team and one for terrain that cannot
+be walked on, plus masks precomputed per cell: its neighbours and every cell
+within a given attack range. Questions about the whole grid then become a
+few bitwise operations on ints instead of loops over units or cells:
+
+* "is any enemy next to this cell?" is ``neighbours[i] & team``;
+* "which targets are in range?" is ``in_range(r)[i] & team``;
+* "where can a unit get in k moves?" is k rounds of :meth:`expand`, each
+  four shifts of the whole frontier at once.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+
+
+class Bitboards:
+    """Team and terrain boards of a ``width`` x ``height`` grid."""
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.full = (1 << width * height) - 1
+        # cells a shift east or west must not carry over into the next row
+        first_column = sum(1 << y * width for y in range(height))
+        self._not_first = self.full & ~first_column
+        self._not_last = self.full & ~(first_column << (width - 1))
+        self.teams: dict[str, int] = {}
+        self.terrain = 0
+        # reach -> per-cell boards of the cells within it, built on first use
+        self._ranges: dict[int, list[int]] = {}
+
+    # boards
+    def bit(self, x: int, y: int) -> int:
+        return 1 << y * self.width + x
+
+    def team(self, name: str) -> int:
+        return self.teams.get(name, 0)
+
+    @property
+    def occupied(self) -> int:
+        board = 0
+        for mask in self.teams.values():
+            board |= mask
+        return board
+
+    @property
+    def free(self) -> int:
+        """Cells a unit can step on: no unit and no terrain."""
+        return self.full & ~(self.occupied | self.terrain)
+
+    def set(self, name: str, x: int, y: int) -> None:
+        self.teams[name] = self.teams.get(name, 0) | self.bit(x, y)
+
+    def clear(self, x: int, y: int) -> None:
+        bit = self.bit(x, y)
+        for name, mask in self.teams.items():
+            if mask & bit:
+                self.teams[name] = mask & ~bit
+
+    def move(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        old, new = self.bit(x0, y0), self.bit(x1, y1)
+        for name, mask in self.teams.items():
+            if mask & old:
+                self.teams[name] = mask & ~old | new
+
+    def block(self, x: int, y: int, blocked: bool = True) -> None:
+        """Mark terrain at ``(x, y)`` as impassable or walkable again."""
+        if blocked:
+            self.terrain |= self.bit(x, y)
+        else:
+            self.terrain &= ~self.bit(x, y)
+
+    # queries
+    @property
+    def neighbours(self) -> list[int]:
+        """Per cell, the board of the cells next to it."""
+        return self.in_range(1)
+
+    def expand(self, board: int) -> int:
+        """Cells next to any cell of ``board``."""
+        w = self.width
+        return (
+            (board & self._not_last) << 1
+            | (board & self._not_first) >> 1
+            | board >> w
+            | board << w
+        ) & self.full
+
+    def in_range(self, reach: int) -> list[int]:
+        """Per cell, the board of cells at Manhattan distance 1 to
+        ``reach``. Built the first time a reach is asked for; a large grid
+        that only floods whole boards never pays for them."""
+        masks = self._ranges.get(reach)
+        if masks is None:
+            masks = []
+            for i in range(self.width * self.height):
+                origin = 1 << i
+                area = origin
+                for _ in range(reach):
+                    area |= self.expand(area)
+                masks.append(area & ~origin)
+            self._ranges[reach] = masks
+        return masks
+
+    def adjacent(self, x: int, y: int, team: str) -> int:
+        """Board of ``team`` units next to ``(x, y)``."""
+        return self.in_range(1)[y * self.width + x] & self.teams.get(team, 0)
+
+    def targets(self, x: int, y: int, team: str, reach: int = 1) -> int:
+        """Board of ``team`` units within ``reach`` steps of ``(x, y)``,
+        ignoring what stands in between."""
+        return self.in_range(reach)[y * self.width + x] & self.teams.get(team, 0)
+
+    def reachable(self, x: int, y: int, moves: int) -> int:
+        """Board of free cells a unit on ``(x, y)`` can walk to in at most
+        ``moves`` steps, going around units and terrain."""
+        free = self.free
+        reached = self.bit(x, y)
+        frontier = reached
+        for _ in range(moves):
+            frontier = self.expand(frontier) & free & ~reached
+            if not frontier:
+                break
+            reached |= frontier
+        return reached & free
+
+    def cells(self, board: int) -> Iterator[tuple[int, int]]:
+        """``(x, y)`` of every set cell, lowest index first."""
+        w = self.width
+        while board:
+            low = board & -board
+            i = low.bit_length() - 1
+            yield (i % w, i // w)
+            board ^= low
@@ -1,28 +1,46 @@
-"""Battle controller managing shuttle-run combat."""
+"""Battle controller managing shuttle-run combat.
+
+The controller only implements the rules and has no dependency on ``arcade``;
+drawing lives in :mod:`game.battle.ui.renderer` so battles can also be run
+headless with :meth:`BattleController.run`.
+
+Time advances in fixed ticks. ATB fill and movement are linear, so instead of
+integrating them every tick the controller computes the tick at which each
+unit's current phase ends and keeps those in an :class:`EventScheduler`.
+Headless runs jump from one transition to the next; the per-frame path only
+evaluates the same closed forms to place units for drawing, so both paths
+produce identical battles.
+"""
 
 from __future__ import annotations
 
-import json
+import copy
 import logging
-from collections import deque
-from collections.abc import Callable
-from pathlib import Path
-from random import random
-
-import arcade
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import replace
+from math import ceil
+from random import Random
+from time import perf_counter, perf_counter_ns
+from typing import TYPE_CHECKING
 
-from ..ui.widgets import draw_atb_bar
-from .animations import (
-    draw as anim_draw,
+from .damage import DamageMatrix
+from .events import ActionApplied, BattleEnded, EventBus, UnitDied, UnitReady
+from .models import PlannedAction, Unit, Vec2
+from .policy import (
+    CommandPolicy,
+    DeferredPolicy,
+    NearestTargetPolicy,
+    Policies,
+    _Pending,
 )
-from .animations import (
-    play_effect,
-    pop_damage,
-)
-from .animations import (
-    update as anim_update,
-)
-from .models import PlannedAction, Unit
+from .scheduler import EventScheduler, ReadyQueue
+from .skills import skill_table
+from .snapshot import BattleSnapshot, capture_state, restore_state
+from .targeting import SideIndex
+
+if TYPE_CHECKING:
+    from ...core.profiler import FrameProfiler
+    from .replay import ReplayPlayer, ReplayRecorder
 
 PX_PER_SEC = 180
 CENTER_X = 400
@@ -30,156 +48,626 @@ ALLY_X = 120
 ENEMY_X = 680
 LANE_Y = [360, 300, 240]
 
-SKILL_PATH = Path(__file__).resolve().parent.parent / "data" / "skills.json"
-with SKILL_PATH.open(encoding="utf-8") as f:
-    SKILLS = {s["id"]: s for s in json.load(f)}
+TICK = 1 / 60
+MAX_TICKS = 60 * 60 * 10
+_EPS = 1e-9
+
+# battle speed multipliers offered to the player; None runs as fast as the
+# frame budget allows
+SPEEDS: tuple[float | None, ...] = (1.0, 2.0, 4.0, None)
+MAX_FRAME_DT = 0.25  # longest wall-clock frame that is caught up
+MAX_SPEED_BUDGET = 0.008  # seconds per frame spent simulating at max speed
+MAX_SPEED_CHUNK = 60  # ticks between budget checks at max speed
+
+# profiler span of each transition, by the state it ends
+_PHASES = {
+    "IDLE": "battle.atb",
+    "CHARGE": "battle.move",
+    "ACT": "battle.action",
+    "COOLDOWN": "battle.move",
+}
 
 logger = logging.getLogger(__name__)
 
 
 class BattleController:
-    """Update and render logic for the shuttle-run battle."""
+    """Rules for the shuttle-run battle.
+
+    Each side is driven either by a :class:`CommandPolicy` or, when the policy
+    is ``None``, manually through the ``on_command`` callback. All randomness
+    comes from a per-battle ``Random`` so a seed fully determines the outcome.
+    """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        seed: int | None = None,
+        *,
+        tick: float = TICK,
+        ally_policy: CommandPolicy | None = None,
+        enemy_policy: CommandPolicy | None = None,
+    ) -> None:
         self.units: dict[str, Unit] = {}
-        self.ready_queue: deque[Unit] = deque()
+        self.ready_queue: ReadyQueue[Unit] = ReadyQueue()
         self.on_command: Callable[[Unit], None] | None = None
-        self.last_message: str | None = None
+        self.on_effect: Callable[[str, Unit, Unit], None] | None = None
+        self.on_damage: Callable[[int, Vec2], None] | None = None
+        self.seed = seed
+        self.rng = Random(seed)  # noqa: S311
+        self.tick = tick
+        self.ticks = 0
+        self.policies = {
+            "ally": ally_policy,
+            "enemy": enemy_policy or NearestTargetPolicy(),
+        }
+        self.scheduler = EventScheduler()
+        self._acc = 0.0
+        self.speed: float | None = 1.0
+        # per-slot phase data: slot -> unit, tick the phase began and the
+        # ATB (IDLE) or x position (CHARGE/COOLDOWN) at that tick
+        self._slots: list[Unit] = []
+        self._slot_of: dict[str, int] = {}
+        self._start: list[int] = []
+        self._origin: list[float] = []
+        # living units per side ordered by x, for nearest-target lookups
+        self.targets: dict[str, SideIndex] = {
+            "ally": SideIndex(),
+            "enemy": SideIndex(),
+        }
+        self.events = EventBus()
+        self.alive: dict[str, int] = {"ally": 0, "enemy": 0}
+        self.winner: str | None = None
+        # the alive counts changed other than by a kill (units added, state
+        # restored); checked before the next tick, once subscribers are in
+        self._check_end = False
+        self._damage: DamageMatrix | None = None
+        # replay hooks, see game.battle.core.replay
+        self.recorder: ReplayRecorder | None = None
+        self.playback: ReplayPlayer | None = None
+        # frame profiler, see game.core.profiler; spans are only recorded
+        # while it is enabled
+        self.profiler: FrameProfiler | None = None
+
+    @property
+    def policies(self) -> Policies:
+        """Policy per side; assigning a plain dict wraps it in
+        :class:`~.policy.Policies`."""
+        return self._policies
+
+    @policies.setter
+    def policies(self, policies: Mapping[str, CommandPolicy | None]) -> None:
+        self._policies = Policies(policies)
 
     def add_unit(self, unit: Unit) -> None:
         self.units[unit.id] = unit
+        slot = self.scheduler.add_slot()
+        self._slots.append(unit)
+        self._slot_of[unit.id] = slot
+        self._start.append(self.ticks)
+        self._origin.append(0.0)
+        if unit.state != "DEAD":
+            self.alive[unit.side] += 1
+            self.targets[unit.side].add(slot, unit.pos[0])
+        self._check_end = True
+        if self._damage is not None:
+            self._damage.extend(self._slots)
+        if unit.state == "IDLE":
+            self._begin_idle(unit)
+
+    def add_units(self, units: Iterable[Unit]) -> None:
+        for unit in units:
+            self.add_unit(unit)
+
+    @property
+    def damage(self) -> DamageMatrix:
+        """Damage matrix for the current roster and skill table.
+
+        Built on first use, extended as units join and rebuilt when the skill
+        table is reloaded.
+        """
+        matrix = self._damage
+        table = skill_table()
+        if matrix is None or matrix.table is not table:
+            matrix = self._damage = DamageMatrix(table, self._slots)
+        elif matrix.size < len(self._slots):
+            matrix.extend(self._slots)
+        return matrix
+
+    def _check_skills(self) -> None:
+        """Drop the damage matrix if the skill table was reloaded. Hits use
+        the matrix as it is, so this runs once per frame or :meth:`run`."""
+        if self._damage is not None and self._damage.table is not skill_table():
+            self._damage = None
+
+    def stats_changed(self, unit: Unit) -> None:
+        """Call after changing ``unit.stats`` mid-battle (buffs, lost parts)."""
+        if self._damage is not None:
+            self._damage.stats_changed(self._slot_of[unit.id], unit)
+
+    def clone(self) -> BattleController:
+        """Return an independent copy of the battle for lookahead search.
+
+        Callbacks, event subscribers and replay hooks are not copied; the
+        damage matrix is shared, so do not change stats on a clone.
+        """
+        other = copy.copy(self)
+        other.units = {}
+        other._slots = []
+        for unit in self._slots:
+            dup = replace(
+                unit, stats=replace(unit.stats), action_queue=unit.action_queue.copy()
+            )
+            other.units[dup.id] = dup
+            other._slots.append(dup)
+        slots, slot_of = other._slots, self._slot_of
+        other.ready_queue = self.ready_queue.copy(lambda u: slots[slot_of[u.id]])
+        other._slot_of = slot_of.copy()
+        other._start = self._start.copy()
+        other._origin = self._origin.copy()
+        other.scheduler = self.scheduler.copy()
+        other.targets = {side: index.copy() for side, index in self.targets.items()}
+        other.policies = self.policies.copy()
+        other.alive = self.alive.copy()
+        other.rng = Random()  # noqa: S311
+        other.rng.setstate(self.rng.getstate())
+        other.events = EventBus()
+        other.on_command = other.on_effect = other.on_damage = None
+        other.recorder = other.playback = None
+        other.profiler = None
+        return other
+
+    def snapshot(self) -> BattleSnapshot:
+        """Capture the battle state; see :mod:`game.battle.core.snapshot`."""
+        return capture_state(self)
+
+    def restore(self, snap: BattleSnapshot) -> None:
+        """Return to a state captured by :meth:`snapshot` on this battle."""
+        restore_state(self, snap)
+        self._check_end = True
+
+    @property
+    def elapsed(self) -> float:
+        """Simulated battle time in seconds."""
+        return self.ticks * self.tick
+
+    # simulation
+    def step(self) -> None:
+        """Advance the battle by exactly one fixed tick."""
+        self.advance_to(self.ticks + 1)
+
+    def advance_to(self, tick: int) -> None:
+        """Process every transition due up to ``tick`` and move the clock there.
+
+        Ticks without a transition cost nothing, so jumping far ahead is as
+        cheap as stepping through the same span one tick at a time.
+        """
+        if self._check_end:
+            self._end_if_over()
+        scheduler = self.scheduler
+        slots = self._slots
+        prof = self.profiler
+        if prof is not None and prof.enabled:
+            transition, enqueue = self._timed_transition, self._timed_enqueue
+        else:
+            transition, enqueue = self._transition, self.enqueue_ready_units
+        while True:
+            due = scheduler.peek()
+            if due is None or due > tick:
+                break
+            self.ticks = due
+            while (slot := scheduler.pop(due)) is not None:
+                transition(slots[slot])
+            if self.ready_queue:
+                enqueue()
+        if tick > self.ticks:
+            self.ticks = tick
+
+    def run(self, max_ticks: int = MAX_TICKS) -> str:
+        """Jump between transitions until the battle ends or stalls.
+
+        The battle stalls when nothing is scheduled, e.g. allies waiting for a
+        manual command because no ally policy is set. Returns the result of
+        :meth:`check_victory`.
+        """
+        if self._check_end:
+            self._end_if_over()
+        self._check_skills()
+        result = self.check_victory()
+        while result == "ongoing":
+            due = self._next_due()
+            if due is None or due > max_ticks:
+                break
+            self.advance_to(due)
+            result = self.check_victory()
+        return result
+
+    @property
+    def clock(self) -> float:
+        """Simulated time including the part of the next tick already
+        accumulated; animations run on this clock."""
+        return (self.ticks + self._acc / self.tick) * self.tick
 
-    # update & draw
     def update(self, dt: float) -> None:
-        for unit in self.units.values():
-            if unit.state == "DEAD":
-                continue
-            if unit.state in {"CHARGE", "COOLDOWN"}:
-                self._update_movement(unit, dt)
-            elif unit.state == "ACT":
-                if unit.action_queue:
-                    pa = unit.action_queue.pop(0)
-                    target = self.units.get(pa.target_id)
-                    if not target or target.state == "DEAD":
-                        new_target = self._find_target(unit)
-                        if new_target:
-                            pa.target_id = new_target.id
-                        else:
-                            unit.state = "COOLDOWN"
-                            continue
-                    self.apply_action(pa)
-                unit.state = "COOLDOWN"
-            elif unit.state == "IDLE":
-                if unit.atb < unit.stats.threshold:
-                    unit.atb = min(
-                        unit.stats.threshold, unit.atb + unit.stats.atb_rate * dt
-                    )
-                if unit.atb >= unit.stats.threshold:
-                    self.ready_queue.append(unit)
+        """Frame entry point: run the whole ticks covered by ``dt``, then
+        place units for drawing at the fractional time in between.
 
-        self.enqueue_ready_units()
-        anim_update(dt)
+        ``dt`` is wall time. It is capped at :data:`MAX_FRAME_DT` so a hitch
+        is not caught up all at once, then scaled by :attr:`speed`; with
+        ``speed=None`` ticks run until :data:`MAX_SPEED_BUDGET` seconds of
+        the frame are used. Ticks are whole and transitions are scheduled
+        per tick, so the speed never changes the outcome. While a deferred
+        policy is thinking the clock holds at the tick it was asked on.
+        """
+        prof = self.profiler
+        if prof is None or not prof.enabled:
+            self._simulate(dt)
+            self.interpolate(self._acc / self.tick)
+            return
+        start = perf_counter_ns()
+        self._simulate(dt)
+        prof.record(prof.key("battle.simulate"), start)
+        start = perf_counter_ns()
+        self.interpolate(self._acc / self.tick)
+        prof.record(prof.key("battle.interpolate"), start)
 
-    def draw_field(self) -> None:  # pragma: no cover - visual
-        for lane_y in LANE_Y:
-            arcade.draw_line(0, lane_y, 800, lane_y, arcade.color.DARK_SLATE_GRAY)
-        for unit in self.units.values():
-            if unit.state == "DEAD":
-                continue
-            x, y = unit.pos
-            color = arcade.color.BLUE if unit.side == "ally" else arcade.color.RED
-            arcade.draw_circle_filled(x, y, 20, color)
-            draw_atb_bar(unit)
+    def _simulate(self, dt: float) -> None:
+        if self._check_end:
+            self._end_if_over()
+        self._check_skills()
+        deferred = self._policies.deferred
+        for policy in deferred:
+            policy.poll(self)
+        if not self._held(deferred):
+            if self.speed is None:
+                self._run_for(MAX_SPEED_BUDGET, deferred)
+                self._acc = 0.0
+            else:
+                self._acc += min(dt, MAX_FRAME_DT) * self.speed
+                steps = int(self._acc / self.tick)
+                if steps:
+                    self._acc -= steps * self.tick
+                    self._advance(self.ticks + steps, deferred)
+
+    def _held(self, deferred: list[DeferredPolicy]) -> bool:
+        return any(policy.busy for policy in deferred)
+
+    def _advance(self, tick: int, deferred: list[DeferredPolicy]) -> None:
+        if self.playback:
+            self.playback.advance_to(tick)
+            return
+        if not deferred:
+            self.advance_to(tick)
+            return
+        while not self._held(deferred):
+            due = self._next_due()
+            if due is None or due > tick:
+                self.advance_to(tick)
+                return
+            self.advance_to(due)
+        # held: the remaining ticks run once the decision has been applied
+        self._acc += (tick - self.ticks) * self.tick
+
+    def _run_for(self, budget: float, deferred: list[DeferredPolicy]) -> None:
+        end = perf_counter() + budget
+        while self.winner is None and perf_counter() < end:
+            if not self.playback and self._next_due() is None:
+                break  # waiting for the player
+            self._advance(self.ticks + MAX_SPEED_CHUNK, deferred)
+            if self._held(deferred):
+                self._acc = 0.0
+                break
+
+    def interpolate(self, alpha: float = 0.0) -> None:
+        """Write ``atb`` and ``pos`` of every unit at ``ticks + alpha``."""
+        t = self.ticks + alpha
+        for slot, unit in enumerate(self._slots):
+            state = unit.state
+            if state == "IDLE":
+                unit.atb = self._atb_at(slot, t)
+            elif state == "CHARGE" or state == "COOLDOWN":
+                unit.pos = (self._x_at(slot, t), unit.pos[1])
 
-    def draw_effect(self) -> None:  # pragma: no cover - visual
-        anim_draw()
+    # commands
+    def mark_ready(self, unit: Unit) -> None:
+        """Queue ``unit`` for a command on the current tick."""
+        self.ready_queue.push(unit, self.ticks, unit.stats.spd)
 
-    # placeholders for API compatibility
     def enqueue_ready_units(self) -> None:
-        ready = list(self.ready_queue)
-        self.ready_queue.clear()
-        ready.sort(key=lambda u: (-u.stats.spd, -u.atb, random()))  # noqa: S311
-        for unit in ready:
-            if unit.side == "ally":
+        # units come off the queue one at a time, so those still undecided
+        # stay queued for a policy cloning the battle to see
+        queue = self.ready_queue
+        events = self.events
+        announce = events.wants(UnitReady)
+        policies = self._policies
+        batched = policies.batch
+        while queue:
+            unit = queue.pop()
+            if unit.state != "IDLE":
+                continue
+            batch_policy = batched.get(unit.side) if batched else None
+            if batch_policy is not None:
+                # every unit of this side readied on this tick decides at once
+                batch = [unit]
+                for u in list(queue):
+                    if u.side == unit.side and u.state == "IDLE":
+                        queue.remove(u)
+                        batch.append(u)
+                if announce:
+                    for u in batch:
+                        events.publish(UnitReady(u))
+                plans = batch_policy.decide_batch(self, batch)
+                for u, plan in zip(batch, plans, strict=True):
+                    self._follow(u, plan)
+                continue
+            policy = policies[unit.side]
+            if announce:
+                events.publish(UnitReady(unit))
+            if policy is None:
                 self.start_command(unit)
             else:
-                target = self._find_target(unit)
-                if target:
-                    self.decide_action(unit, "melee_punch", target)
+                self._follow(unit, policy.decide(self, unit))
+
+    def _follow(self, unit: Unit, plan: PlannedAction | _Pending | None) -> None:
+        # the plan is taken like a command from the player
+        unit.state = "COMMAND"
+        if isinstance(plan, _Pending):
+            return
+        target = self.units.get(plan.target_id) if plan else None
+        if plan and target:
+            self.decide_action(unit, plan.skill_id, target)
+        else:
+            self.wait(unit)
+
+    def hand_over(self, side: str) -> None:
+        """Let the policy of ``side`` decide for its units waiting in
+        ``COMMAND``, e.g. when auto-battle is switched on mid-battle."""
+        policy = self.policies[side]
+        if policy is None:
+            return
+        waiting = [u for u in self._slots if u.side == side and u.state == "COMMAND"]
+        if not waiting:
+            return
+        batch_policy = self._policies.batch.get(side)
+        if batch_policy is not None:
+            plans = batch_policy.decide_batch(self, waiting)
+        else:
+            plans = [policy.decide(self, u) for u in waiting]
+        for unit, plan in zip(waiting, plans, strict=True):
+            self._follow(unit, plan)
 
     def start_command(self, unit: Unit) -> None:
         unit.state = "COMMAND"
         if self.on_command:
             self.on_command(unit)
 
+    def external(self, side: str) -> bool:
+        """Whether commands for ``side`` arrive from outside the tick loop,
+        i.e. from the player or a deferred policy; replays record those
+        sides by default."""
+        policies = self._policies
+        return policies[side] is None or policies.is_deferred(side)
+
     def decide_action(self, unit: Unit, skill_id: str, target: Unit) -> None:
+        """Give ``unit``, waiting in ``COMMAND``, its action; ignored for a
+        unit that is not waiting, e.g. one killed while a menu was open."""
+        if unit.state != "COMMAND":
+            logger.warning("%s is not awaiting a command (%s)", unit.id, unit.state)
+            return
+        if self.recorder:
+            self.recorder.record(unit, skill_id, target)
         unit.action_queue.append(
-            PlannedAction(skill_id=skill_id, user_id=unit.id, target_id=target.id)
+            PlannedAction(
+                skill_id=skill_id,
+                user_id=unit.id,
+                target_id=target.id,
+                skill=skill_table().lookup(skill_id),
+            )
         )
         unit.state = "CHARGE"
+        self._begin_move(unit, CENTER_X)
+
+    def wait(self, unit: Unit) -> None:
+        """Skip the turn: empty the ATB gauge and return to IDLE. Like
+        :meth:`decide_action`, only for a unit waiting in ``COMMAND``."""
+        if unit.state != "COMMAND":
+            logger.warning("%s is not awaiting a command (%s)", unit.id, unit.state)
+            return
+        if self.recorder:
+            self.recorder.record(unit, None, None)
+        unit.atb = 0.0
+        unit.state = "IDLE"
+        self._begin_idle(unit)
 
     def apply_action(self, pa: PlannedAction) -> None:
         user = self.units.get(pa.user_id)
         target = self.units.get(pa.target_id)
         if not user or not target or target.state == "DEAD":
             return
-        skill = SKILLS.get(pa.skill_id)
-        if not skill:
-            return
-        play_effect(skill.get("effect", ""), user, target)
-        if random() > skill.get("hit", 1.0):  # noqa: S311
-            self.last_message = f"{user.name} の {skill['name']} は ミス！"
-            pop_damage(0, target.pos)
-            return
-        dmg = max(1, skill["power"] + user.stats.atk - target.stats.defn)
-        target.hp -= dmg
-        pop_damage(dmg, target.pos)
-        if target.hp <= 0:
-            target.state = "DEAD"
-            self.last_message = (
-                f"{user.name} の {skill['name']}！ {target.name} を たおした!"
-            )
-        else:
-            self.last_message = (
-                f"{user.name} の {skill['name']}！ {target.name} に {dmg} ダメージ"
-            )
-        logger.info(self.last_message)
+        table = skill_table()
+        skill = table.skills[pa.skill] if pa.skill >= 0 else table.get(pa.skill_id)
+        if skill:
+            slot_of = self._slot_of
+            self._resolve(slot_of[user.id], slot_of[target.id], skill.index)
+
+    def _resolve(self, user: int, target: int, skill: int) -> None:
+        """Apply compiled skill ``skill`` of slot ``user`` to slot ``target``."""
+        matrix = self._damage or self.damage
+        slots = self._slots
+        defender = slots[target]
+        on_effect, on_damage, events = self.on_effect, self.on_damage, self.events
+        announce = events.wants(ActionApplied)
+        if on_effect or announce:
+            attacker, info = slots[user], matrix.table.skills[skill]
+            if on_effect:
+                on_effect(info.effect, attacker, defender)
+        if self.rng.random() > matrix.hit[skill]:
+            if on_damage:
+                on_damage(0, defender.pos)
+            if announce:
+                events.publish(ActionApplied(attacker, defender, info.id, False, 0))
+            return
+        dmg = matrix.damage(skill, user, target)
+        defender.hp -= dmg
+        if on_damage:
+            on_damage(dmg, defender.pos)
+        if announce:
+            events.publish(ActionApplied(attacker, defender, info.id, True, dmg))
+        if defender.hp <= 0:
+            self._kill(defender, slots[user])
 
     def check_victory(self) -> str:
-        allies = [
-            u for u in self.units.values() if u.side == "ally" and u.state != "DEAD"
-        ]
-        enemies = [
-            u for u in self.units.values() if u.side == "enemy" and u.state != "DEAD"
-        ]
-        if not allies:
+        if self.winner:
+            return self.winner
+        if not self.alive["ally"]:
             return "enemy"
-        if not enemies:
+        if not self.alive["enemy"]:
             return "ally"
         return "ongoing"
 
-    # helpers
-    def _update_movement(self, unit: Unit, dt: float) -> None:
-        speed = unit.stats.spd * PX_PER_SEC * dt * unit.facing
-        unit.pos = (unit.pos[0] + speed, unit.pos[1])
-        if unit.state == "CHARGE" and (
-            (unit.facing > 0 and unit.pos[0] >= CENTER_X)
-            or (unit.facing < 0 and unit.pos[0] <= CENTER_X)
-        ):
+    def find_target(self, unit: Unit) -> Unit | None:
+        """Return the living opponent closest to ``unit`` along the x axis.
+
+        Ties go to the opponent added to the battle first.
+        """
+        t = self.ticks
+        index = self.targets["enemy" if unit.side == "ally" else "ally"]
+        index.sync(t, self._x_at)
+        slot = index.nearest(self._x_at(self._slot_of[unit.id], t))
+        return self._slots[slot] if slot >= 0 else None
+
+    def _kill(self, unit: Unit, killer: Unit) -> None:
+        unit.state = "DEAD"
+        slot = self._slot_of[unit.id]
+        self._cancel(slot)
+        self.targets[unit.side].remove(slot)
+        self.alive[unit.side] -= 1
+        events = self.events
+        if events.wants(UnitDied):
+            events.publish(UnitDied(unit, killer))
+        if not self.alive[unit.side]:
+            self._end_if_over()
+
+    def _end_if_over(self) -> None:
+        """Publish :class:`BattleEnded` the first time a side has no living
+        units; the only place a winner is decided."""
+        self._check_end = False
+        if self.winner is not None:
+            return
+        if not self.alive["ally"]:
+            self.winner = "enemy"
+        elif not self.alive["enemy"]:
+            self.winner = "ally"
+        else:
+            return
+        self.events.publish(BattleEnded(self.winner, self.ticks))
+
+    # phase helpers
+    def _schedule(self, slot: int, tick: int) -> None:
+        self.scheduler.schedule(slot, tick)
+
+    def _cancel(self, slot: int) -> None:
+        self.scheduler.cancel(slot)
+
+    def _next_due(self) -> int | None:
+        return self.scheduler.peek()
+
+    def _move_per_tick(self, unit: Unit) -> float:
+        return unit.stats.spd * PX_PER_SEC * self.tick
+
+    def _begin_idle(self, unit: Unit) -> None:
+        slot = self._slot_of[unit.id]
+        self._start[slot] = self.ticks
+        self._origin[slot] = unit.atb
+        per_tick = unit.stats.atb_rate * self.tick
+        if per_tick <= 0:
+            self._cancel(slot)
+            return
+        need = (unit.stats.threshold - unit.atb) / per_tick
+        self._schedule(slot, self.ticks + max(1, ceil(need - _EPS)))
+
+    def _begin_move(self, unit: Unit, dest: float) -> None:
+        slot = self._slot_of[unit.id]
+        x = unit.pos[0]
+        self._start[slot] = self.ticks
+        self._origin[slot] = x
+        per_tick = self._move_per_tick(unit)
+        if per_tick <= 0:
+            self._cancel(slot)
+            return
+        need = abs(dest - x) / per_tick
+        self._schedule(slot, self.ticks + max(1, ceil(need - _EPS)))
+        self.targets[unit.side].start_moving(slot)
+
+    def _transition(self, unit: Unit) -> None:
+        """Finish the current phase of ``unit``; called on its due tick."""
+        state = unit.state
+        if state == "IDLE":
+            unit.atb = unit.stats.threshold
+            self.mark_ready(unit)
+        elif state == "CHARGE":
             unit.pos = (CENTER_X, unit.pos[1])
             unit.state = "ACT"
-        elif unit.state == "COOLDOWN" and (
-            (unit.facing > 0 and unit.pos[0] >= unit.home_x)
-            or (unit.facing < 0 and unit.pos[0] <= unit.home_x)
-        ):
+            slot = self._slot_of[unit.id]
+            self._schedule(slot, self.ticks + 1)
+            self.targets[unit.side].stop_moving(slot, CENTER_X)
+        elif state == "ACT":
+            self._act(unit, self._slot_of[unit.id])
+            unit.state = "COOLDOWN"
+            self._begin_move(unit, unit.home_x)
+        elif state == "COOLDOWN":
             unit.pos = (unit.home_x, unit.pos[1])
             unit.atb = 0.0
             unit.state = "IDLE"
+            self._begin_idle(unit)
+            self.targets[unit.side].stop_moving(self._slot_of[unit.id], unit.home_x)
+
+    def _timed_transition(self, unit: Unit) -> None:
+        prof = self.profiler
+        phase = _PHASES[unit.state]
+        start = perf_counter_ns()
+        self._transition(unit)
+        prof.record(prof.key(phase), start)  # type: ignore[union-attr]
+
+    def _timed_enqueue(self) -> None:
+        prof = self.profiler
+        start = perf_counter_ns()
+        self.enqueue_ready_units()
+        prof.record(prof.key("battle.command"), start)  # type: ignore[union-attr]
+
+    def _act(self, unit: Unit, slot: int) -> None:
+        if not unit.action_queue:
+            return
+        pa = unit.action_queue.pop(0)
+        if pa.skill < 0:
+            self.apply_action(pa)
+            return
+        target = self._slot_of.get(pa.target_id, -1)  # type: ignore[arg-type]
+        if target < 0 or self._slots[target].state == "DEAD":
+            found = self.find_target(unit)
+            if not found:
+                return
+            target = self._slot_of[found.id]
+        self._resolve(slot, target, pa.skill)
 
-    def _find_target(self, unit: Unit) -> Unit | None:
-        enemies = [
-            u for u in self.units.values() if u.side != unit.side and u.state != "DEAD"
-        ]
-        if not enemies:
-            return None
-        return min(enemies, key=lambda e: abs(e.pos[0] - unit.pos[0]))
+    def _atb_at(self, slot: int, t: float) -> float:
+        unit = self._slots[slot]
+        if unit.state != "IDLE":
+            return unit.atb
+        atb = self._origin[slot] + unit.stats.atb_rate * self.tick * (
+            t - self._start[slot]
+        )
+        return min(unit.stats.threshold, atb)
+
+    def _x_at(self, slot: int, t: float) -> float:
+        unit = self._slots[slot]
+        state = unit.state
+        if state == "CHARGE":
+            dest = CENTER_X
+        elif state == "COOLDOWN":
+            dest = unit.home_x
+        else:
+            return unit.pos[0]
+        x0 = self._origin[slot]
+        travelled = self._move_per_tick(unit) * (t - self._start[slot])
+        if dest >= x0:
+            return min(dest, x0 + travelled)
+        return max(dest, x0 - travelled)
@@ -0,0 +1,153 @@
+"""Per-battle damage and hit-probability matrix.
+
+Damage only depends on the skill and on the attacker's and defender's stats,
+all of which are fixed for most of a battle, so it is computed once per
+``(skill, attacker, defender)`` triple instead of on every hit. Headless
+simulations and AI lookahead read the same pairs many times.
+
+Rows are per skill and attacker slot and list the damage against every
+defender slot. Small battles fill every row up front and keep them, adding a
+column as units join. A full matrix of a large battle would not fit, so there
+a single hit is computed from the stats when it lands, and a row is only
+built for policies that scan every defender; the :data:`ROW_CACHE` most
+recently used rows are kept. :meth:`DamageMatrix.stats_changed` refreshes a
+single unit after a stat change.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Sequence
+
+from .models import Unit
+from .skills import SkillTable
+
+# build every row eagerly while skills * units**2 stays below this
+EAGER_LIMIT = 1 << 16
+# rows kept at a time once the matrix is past EAGER_LIMIT
+ROW_CACHE = 128
+
+
+class DamageMatrix:
+    """Damage, hit chance and expected damage of every skill on every pair.
+
+    Hit chance currently depends on the skill alone, so it is stored as one
+    value per skill rather than per pair.
+    """
+
+    def __init__(self, table: SkillTable, units: Sequence[Unit]) -> None:
+        self.table = table
+        self.power = [s.power for s in table]
+        self.hit = [s.hit for s in table]
+        self._atk: list[int] = []
+        self._defn: list[int] = []
+        self._rows: list[list[list[int] | None]] = [[] for _ in table]
+        self._expected: list[list[list[float] | None]] = [[] for _ in table]
+        # (skill, attacker) of the rows built past EAGER_LIMIT, oldest first
+        self._recent: OrderedDict[tuple[int, int], None] = OrderedDict()
+        self.eager = True
+        self.extend(units)
+
+    @property
+    def size(self) -> int:
+        return len(self._atk)
+
+    def extend(self, units: Sequence[Unit]) -> None:
+        """Add the units beyond the current size (slots are append-only)."""
+        new = units[self.size :]
+        if not new:
+            return
+        self._atk.extend(u.stats.atk for u in new)
+        self._defn.extend(u.stats.defn for u in new)
+        added = [u.stats.defn for u in new]
+        for k, (rows, expected) in enumerate(
+            zip(self._rows, self._expected, strict=True)
+        ):
+            # built rows gain a column for the new defenders
+            power, hit = self.power[k], self.hit[k]
+            for a, row in enumerate(rows):
+                if row is not None:
+                    base = power + self._atk[a]
+                    column = [max(1, base - d) for d in added]
+                    row += column
+                    expected[a] += [v * hit for v in column]  # type: ignore[operator]
+            rows += [None] * len(new)
+            expected += [None] * len(new)
+        eager = len(self.table) * self.size * self.size <= EAGER_LIMIT
+        if eager:
+            for k in range(len(self.table)):
+                for a in range(self.size):
+                    self.row(k, a)
+        elif self.eager:
+            # past the limit: the rows built so far become the cache
+            self._recent = OrderedDict.fromkeys(
+                (k, a)
+                for k, rows in enumerate(self._rows)
+                for a, row in enumerate(rows)
+                if row is not None
+            )
+            self._trim()
+        self.eager = eager
+
+    def stats_changed(self, slot: int, unit: Unit) -> None:
+        """Refresh ``slot`` after its attack or defence changed."""
+        atk, defn = unit.stats.atk, unit.stats.defn
+        if atk != self._atk[slot]:
+            self._atk[slot] = atk
+            for k, (rows, expected) in enumerate(
+                zip(self._rows, self._expected, strict=True)
+            ):
+                rows[slot] = None
+                expected[slot] = None
+                self._recent.pop((k, slot), None)
+        if defn != self._defn[slot]:
+            self._defn[slot] = defn
+            for k, rows in enumerate(self._rows):
+                base = self.power[k] - defn
+                hit = self.hit[k]
+                for a, row in enumerate(rows):
+                    if row is not None:
+                        row[slot] = dmg = max(1, base + self._atk[a])
+                        self._expected[k][a][slot] = dmg * hit  # type: ignore[index]
+
+    def row(self, skill: int, attacker: int) -> list[int]:
+        """Damage of ``skill`` used by ``attacker`` against every slot."""
+        row = self._rows[skill][attacker]
+        if row is None:
+            base = self.power[skill] + self._atk[attacker]
+            row = [max(1, base - d) for d in self._defn]
+            hit = self.hit[skill]
+            self._rows[skill][attacker] = row
+            self._expected[skill][attacker] = [v * hit for v in row]
+            if not self.eager:
+                self._recent[skill, attacker] = None
+                self._trim()
+        elif not self.eager:
+            self._recent.move_to_end((skill, attacker))
+        return row
+
+    def _trim(self) -> None:
+        recent = self._recent
+        while len(recent) > ROW_CACHE:
+            k, a = recent.popitem(last=False)[0]
+            self._rows[k][a] = None
+            self._expected[k][a] = None
+
+    def expected_row(self, skill: int, attacker: int) -> list[float]:
+        """Hit chance times damage against every slot."""
+        expected = self._expected[skill][attacker]
+        if expected is None:
+            self.row(skill, attacker)
+            expected = self._expected[skill][attacker]
+        return expected  # type: ignore[return-value]
+
+    def damage(self, skill: int, attacker: int, defender: int) -> int:
+        row = self._rows[skill][attacker]
+        if row is not None:
+            return row[defender]
+        if self.eager:
+            return self.row(skill, attacker)[defender]
+        return max(1, self.power[skill] + self._atk[attacker] - self._defn[defender])
+
+    def expected(self, skill: int, attacker: int, defender: int) -> float:
+        return self.damage(skill, attacker, defender) * self.hit[skill]
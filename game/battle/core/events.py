@@ -0,0 +1,70 @@
+"""Typed battle events and a minimal publish/subscribe bus."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from .models import Unit
+
+
+@dataclass(frozen=True, slots=True)
+class UnitReady:
+    """A unit's ATB gauge filled and it is about to choose a command."""
+
+    unit: Unit
+
+
+@dataclass(frozen=True, slots=True)
+class ActionApplied:
+    """A skill resolved; ``damage`` is 0 on a miss."""
+
+    user: Unit
+    target: Unit
+    skill_id: str
+    hit: bool
+    damage: int
+
+
+@dataclass(frozen=True, slots=True)
+class UnitDied:
+    unit: Unit
+    killer: Unit
+
+
+@dataclass(frozen=True, slots=True)
+class BattleEnded:
+    """Published once, when the last unit of a side falls."""
+
+    winner: str
+    tick: int
+
+
+E = TypeVar("E")
+
+
+class EventBus:
+    """Dispatch events to the subscribers of their exact type."""
+
+    def __init__(self) -> None:
+        self._subs: dict[type, list[Callable[[Any], None]]] = {}
+
+    def subscribe(self, kind: type[E], handler: Callable[[E], None]) -> None:
+        self._subs.setdefault(kind, []).append(handler)
+
+    def unsubscribe(self, kind: type[E], handler: Callable[[E], None]) -> None:
+        handlers = self._subs.get(kind)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self._subs[kind]
+
+    def wants(self, kind: type) -> bool:
+        """Whether anyone listens to ``kind``; lets publishers skip building
+        events nobody will see."""
+        return kind in self._subs
+
+    def publish(self, event: object) -> None:
+        for handler in self._subs.get(type(event), ()):
+            handler(event)
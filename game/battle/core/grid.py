@@ -0,0 +1,203 @@
+"""Occupancy and distance fields for the grid ATB battle.
+
+:class:`OccupancyGrid` stores which unit stands on every cell in a flat
+array, so "who is at (x, y)" is one index instead of a scan over the units,
+and keeps the team :class:`~.bitboard.Bitboards` in step with it. Every
+change bumps :attr:`OccupancyGrid.version`, terrain changes also
+:attr:`OccupancyGrid.terrain_version`.
+
+:class:`DistanceFields` answers "how far is this cell from the nearest of
+these goals, walking around terrain" with breadth-first distance fields, one
+per set of goal cells, holding the distance of every cell so a lookup is one
+index. A field is computed the first time its goals are asked for and reused
+until the terrain changes, so units moving around do not throw it away and
+any number of units can look up their next step cheaply; the
+:data:`FIELD_CACHE` most recently used fields are kept. Other units are
+local obstacles: a step only goes to a free cell.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterable
+
+from .bitboard import Bitboards
+
+EMPTY = -1
+UNREACHABLE = -1
+
+# neighbour order is also the tie-break between equally good steps
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+# distance fields kept by a DistanceFields, least recently used dropped first
+FIELD_CACHE = 32
+
+
+class OccupancyGrid:
+    """Which occupant (a non-negative int, e.g. a unit index) is on each
+    cell, or :data:`EMPTY`."""
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.cells = array("i", [EMPTY]) * (width * height)
+        self.version = 0
+        self.terrain_version = 0
+        # cell index -> indices of the cells next to it
+        self.neighbours: list[tuple[int, ...]] = [
+            tuple(
+                (y + dy) * width + x + dx
+                for dx, dy in DIRECTIONS
+                if 0 <= x + dx < width and 0 <= y + dy < height
+            )
+            for y in range(height)
+            for x in range(width)
+        ]
+        self.boards = Bitboards(width, height)
+        # 1 where the terrain can be walked on, per cell index
+        self.walkable = bytearray(b"\1") * (width * height)
+
+    def index(self, x: int, y: int) -> int:
+        return y * self.width + x
+
+    def inside(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def at(self, x: int, y: int) -> int:
+        """Occupant of ``(x, y)``; :data:`EMPTY` when free or outside."""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return EMPTY
+        return self.cells[y * self.width + x]
+
+    def place(self, occupant: int, x: int, y: int, team: str = "") -> None:
+        i = self.index(x, y)
+        if self.cells[i] != EMPTY:
+            raise ValueError(f"cell ({x}, {y}) is already occupied")
+        if self.boards.terrain >> i & 1:
+            raise ValueError(f"cell ({x}, {y}) is blocked")
+        self.cells[i] = occupant
+        self.boards.set(team, x, y)
+        self.version += 1
+
+    def remove(self, x: int, y: int) -> None:
+        self.cells[self.index(x, y)] = EMPTY
+        self.boards.clear(x, y)
+        self.version += 1
+
+    def block(self, x: int, y: int, blocked: bool = True) -> None:
+        """Make terrain at ``(x, y)`` impassable, or walkable again."""
+        self.boards.block(x, y, blocked)
+        self.walkable[self.index(x, y)] = not blocked
+        self.version += 1
+        self.terrain_version += 1
+
+    def move(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        i, j = self.index(x0, y0), self.index(x1, y1)
+        if self.cells[j] != EMPTY:
+            raise ValueError(f"cell ({x1}, {y1}) is already occupied")
+        if self.boards.terrain >> j & 1:
+            raise ValueError(f"cell ({x1}, {y1}) is blocked")
+        self.cells[j] = self.cells[i]
+        self.cells[i] = EMPTY
+        self.boards.move(x0, y0, x1, y1)
+        self.version += 1
+
+
+class DistanceFields:
+    """Cached walking distances toward goal cells on an
+    :class:`OccupancyGrid`.
+
+    The distance of a cell is the number of steps from it to the nearest
+    goal around terrain (:data:`UNREACHABLE` if there is no way); units
+    standing in the way are not counted, so a field only depends on the
+    terrain and its goals. :meth:`step` treats units as obstacles by only
+    stepping onto free cells.
+    """
+
+    def __init__(self, grid: OccupancyGrid) -> None:
+        self.grid = grid
+        # sorted goal cell indices -> distance of every cell
+        self._fields: OrderedDict[tuple[int, ...], array] = OrderedDict()
+        self._version = grid.terrain_version
+        self.computed = 0  # fields built so far, for tests and benchmarks
+
+    def field(self, *goals: tuple[int, int]) -> array:
+        """Steps from every cell index to the nearest of ``goals``."""
+        grid = self.grid
+        fields = self._fields
+        if grid.terrain_version != self._version:
+            fields.clear()
+            self._version = grid.terrain_version
+        key = tuple(sorted({grid.index(x, y) for x, y in goals}))
+        dist = fields.get(key)
+        if dist is None:
+            dist = fields[key] = self._build(key)
+            if len(fields) > FIELD_CACHE:
+                fields.popitem(last=False)
+        else:
+            fields.move_to_end(key)
+        return dist
+
+    def _build(self, goals: tuple[int, ...]) -> array:
+        grid = self.grid
+        neighbours, walkable = grid.neighbours, grid.walkable
+        dist = array("i", [UNREACHABLE]) * len(walkable)
+        for goal in goals:
+            dist[goal] = 0
+        frontier = list(goals)
+        d = 0
+        while frontier:
+            d += 1
+            ring = []
+            for i in frontier:
+                for j in neighbours[i]:
+                    if dist[j] < 0 and walkable[j]:
+                        dist[j] = d
+                        ring.append(j)
+            frontier = ring
+        self.computed += 1
+        return dist
+
+    def distance(self, x: int, y: int, gx: int, gy: int) -> int:
+        """Steps for a unit on ``(x, y)`` to reach ``(gx, gy)``; it stands on
+        its own cell, so this looks at its free neighbours."""
+        grid = self.grid
+        start = grid.index(x, y)
+        goal = grid.index(gx, gy)
+        if start == goal:
+            return 0
+        if goal in grid.neighbours[start]:
+            return 1
+        best, _ = self._closest(start, self.field((gx, gy)))
+        return best + 1 if best != UNREACHABLE else UNREACHABLE
+
+    def step(self, x: int, y: int, gx: int, gy: int) -> tuple[int, int] | None:
+        """The free cell next to ``(x, y)`` that is closest to the goal, or
+        ``None`` when no free neighbour leads there."""
+        return self.step_toward(x, y, ((gx, gy),))
+
+    def step_toward(
+        self, x: int, y: int, goals: Iterable[tuple[int, int]]
+    ) -> tuple[int, int] | None:
+        """The free cell next to ``(x, y)`` that is closest to the nearest of
+        ``goals``, or ``None`` when no free neighbour leads to any."""
+        goals = tuple(goals)
+        if not goals:
+            return None
+        grid = self.grid
+        _, best = self._closest(grid.index(x, y), self.field(*goals))
+        if best < 0:
+            return None
+        return (best % grid.width, best // grid.width)
+
+    def _closest(self, start: int, dist: array) -> tuple[int, int]:
+        grid = self.grid
+        cells = grid.cells
+        best, best_d = -1, UNREACHABLE
+        for j in grid.neighbours[start]:
+            if cells[j] != EMPTY:
+                continue
+            d = dist[j]
+            if d != UNREACHABLE and (best_d < 0 or d < best_d):
+                best, best_d = j, d
+        return best_d, best
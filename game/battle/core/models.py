@@ -6,6 +6,11 @@ from dataclasses import dataclass, field
 from typing import Literal
 
 Vec2 = tuple[float, float]
+UnitState = Literal["IDLE", "COMMAND", "CHARGE", "ACT", "COOLDOWN", "DEAD"]
+
+# integer codes for array-backed and serialized battle state
+STATES: tuple[UnitState, ...] = ("IDLE", "COMMAND", "CHARGE", "ACT", "COOLDOWN", "DEAD")
+STATE_CODE: dict[str, int] = {name: i for i, name in enumerate(STATES)}
 
 
 @dataclass
@@ -31,7 +36,7 @@ class Unit:
     stats: Stats
     hp: int
     atb: float = 0.0
-    state: Literal["IDLE", "COMMAND", "CHARGE", "ACT", "COOLDOWN", "DEAD"] = "IDLE"
+    state: UnitState = "IDLE"
     pos: Vec2 = (0.0, 0.0)
     home_x: float = 0.0
     facing: int = 1
@@ -45,4 +50,6 @@ class PlannedAction:
 
     skill_id: str
     user_id: str
-    target_id: str
+    target_id: str | None
+    # index into the compiled skill table, filled in when the action is chosen
+    skill: int = -1
@@ -0,0 +1,219 @@
+"""Command policies deciding actions for ready units."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from typing import TYPE_CHECKING, Any, Final, Protocol, runtime_checkable
+
+from .models import PlannedAction, Unit
+from .skills import skill_table
+
+if TYPE_CHECKING:
+    from .controller import BattleController
+
+
+class _Pending:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "PENDING"
+
+
+PENDING: Final = _Pending()
+
+
+class CommandPolicy(Protocol):
+    """Chooses an action for a unit whose ATB gauge is full.
+
+    Returning ``None`` makes the unit wait, exactly like the 待機 command.
+    """
+
+    def decide(
+        self, controller: BattleController, unit: Unit
+    ) -> PlannedAction | None | _Pending: ...
+
+
+@runtime_checkable
+class DeferredPolicy(CommandPolicy, Protocol):
+    """A policy that may answer later.
+
+    ``decide`` returns :data:`PENDING` to leave the unit in ``COMMAND``; the
+    controller calls :meth:`poll` once per frame, where the policy hands its
+    finished decisions to ``decide_action``/``wait`` like a player would.
+    The battle clock holds while the policy is :attr:`busy`, so decisions
+    land on the tick they were asked for regardless of frame timing.
+    """
+
+    def poll(self, controller: BattleController) -> None: ...
+
+    @property
+    def busy(self) -> bool:
+        """Whether a decision is still being worked on."""
+        ...
+
+
+@runtime_checkable
+class BatchPolicy(CommandPolicy, Protocol):
+    """A policy that decides for all units of its side readied on the same
+    tick together, e.g. to spread attacks instead of overkilling one target.
+
+    ``decide_batch`` returns one plan (or ``None`` to wait) per unit, in
+    order. ``decide`` must give the same answer for a batch of one.
+    """
+
+    def decide_batch(
+        self, controller: BattleController, units: Sequence[Unit]
+    ) -> list[PlannedAction | None]: ...
+
+
+class Policies(dict[str, "CommandPolicy | None"]):
+    """The policy of each side, ``None`` where the player gives commands.
+
+    Which policies are deferred or batch policies is worked out when one is
+    assigned, so the controller reads :attr:`deferred` and :attr:`batch`
+    every frame and ready unit instead of running a protocol ``isinstance``
+    check, which walks the protocol's members.
+    """
+
+    __slots__ = ("deferred", "batch", "_deferred_sides")
+
+    def __init__(self, policies: Mapping[str, CommandPolicy | None] | None = None):
+        super().__init__(policies or {})
+        self._classify()
+
+    def __setitem__(self, side: str, policy: CommandPolicy | None) -> None:
+        super().__setitem__(side, policy)
+        self._classify()
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        super().update(*args, **kwargs)
+        self._classify()
+
+    def copy(self) -> Policies:
+        return Policies(self)
+
+    def is_deferred(self, side: str) -> bool:
+        return side in self._deferred_sides
+
+    def _classify(self) -> None:
+        self.deferred: list[DeferredPolicy] = []
+        self._deferred_sides: set[str] = set()
+        # side -> its policy, for sides whose policy decides in batches
+        self.batch: dict[str, BatchPolicy] = {}
+        for side, policy in self.items():
+            if isinstance(policy, DeferredPolicy):
+                self.deferred.append(policy)
+                self._deferred_sides.add(side)
+            if isinstance(policy, BatchPolicy):
+                self.batch[side] = policy
+
+
+class NearestTargetPolicy:
+    """Use a fixed skill on the nearest living opponent."""
+
+    def __init__(self, skill_id: str = "melee_punch") -> None:
+        self.skill_id = skill_id
+
+    def decide(self, controller: BattleController, unit: Unit) -> PlannedAction | None:
+        target = controller.find_target(unit)
+        if target is None:
+            return None
+        return PlannedAction(
+            skill_id=self.skill_id, user_id=unit.id, target_id=target.id
+        )
+
+
+class LowestHpPolicy:
+    """Use a fixed skill on the living opponent with the least hp.
+
+    Ties go to the opponent added to the battle first. Deciding a batch,
+    damage already planned by earlier units counts against a target's hp,
+    so a nearly dead opponent is not attacked by everyone at once.
+    """
+
+    def __init__(self, skill_id: str = "melee_punch") -> None:
+        self.skill_id = skill_id
+
+    def decide(self, controller: BattleController, unit: Unit) -> PlannedAction | None:
+        return self.decide_batch(controller, [unit])[0]
+
+    def decide_batch(
+        self, controller: BattleController, units: Sequence[Unit]
+    ) -> list[PlannedAction | None]:
+        skill = skill_table().lookup(self.skill_id)
+        matrix = controller.damage
+        slot_of = controller._slot_of
+        foes = _foes(controller, units[0].side)
+        left = [float(t.hp) for t in foes]
+        plans: list[PlannedAction | None] = []
+        for unit in units:
+            if not foes:
+                plans.append(None)
+                continue
+            best = min(range(len(foes)), key=lambda i: (left[i] <= 0, left[i]))
+            target = foes[best]
+            expected = matrix.expected_row(skill, slot_of[unit.id])
+            left[best] -= expected[slot_of[target.id]]
+            plans.append(_plan(unit, target, self.skill_id, skill))
+        return plans
+
+
+class ExpectedDamagePolicy:
+    """Pick the skill and opponent with the highest expected damage.
+
+    Expected damage is hit chance times damage. Ties go to the opponent with
+    the least hp left, then to the first skill and the opponent added to the
+    battle first. In a batch, damage planned by earlier units counts against
+    the remaining hp, and opponents it already covers are skipped.
+    """
+
+    def decide(self, controller: BattleController, unit: Unit) -> PlannedAction | None:
+        return self.decide_batch(controller, [unit])[0]
+
+    def decide_batch(
+        self, controller: BattleController, units: Sequence[Unit]
+    ) -> list[PlannedAction | None]:
+        table = skill_table()
+        matrix = controller.damage
+        slot_of = controller._slot_of
+        foes = _foes(controller, units[0].side)
+        foe_slots = [slot_of[t.id] for t in foes]
+        left = [float(t.hp) for t in foes]
+        plans: list[PlannedAction | None] = []
+        for unit in units:
+            if not foes:
+                plans.append(None)
+                continue
+            attacker = slot_of[unit.id]
+            # opponents already covered by the batch are worth nothing; among
+            # equal values the most damaged opponent is finished off first
+            best_key = (-1.0, -1.0)
+            best = (0, 0)
+            for skill in table:
+                row = matrix.row(skill.index, attacker)
+                for i, slot in enumerate(foe_slots):
+                    key = (skill.hit * row[slot] if left[i] > 0 else 0.0, -left[i])
+                    if key > best_key:
+                        best_key, best = key, (skill.index, i)
+            k, i = best
+            left[i] -= table.skills[k].hit * matrix.row(k, attacker)[foe_slots[i]]
+            plans.append(_plan(unit, foes[i], table.skills[k].id, k))
+        return plans
+
+
+def _foes(controller: BattleController, side: str) -> list[Unit]:
+    return [u for u in controller._slots if u.side != side and u.state != "DEAD"]
+
+
+def _plan(unit: Unit, target: Unit, skill_id: str, skill: int) -> PlannedAction:
+    return PlannedAction(
+        skill_id=skill_id, user_id=unit.id, target_id=target.id, skill=skill
+    )
+
+
+# ally policies offered by auto-battle, in menu order
+AUTO_POLICIES: dict[str, type[CommandPolicy]] = {
+    "nearest": NearestTargetPolicy,
+    "lowest_hp": LowestHpPolicy,
+    "expected_damage": ExpectedDamagePolicy,
+}
@@ -0,0 +1,452 @@
+"""Compact binary battle replays.
+
+A replay stores the seed, the tick length, the starting roster and every
+command given to a manually controlled unit together with the tick it was
+given on. Everything else follows from the seeded rules, so a replay costs a
+few bytes per command and a recorded battle re-simulates headless in
+milliseconds::
+
+    python -m game.battle.core.replay game/data/replays/*.mbr
+
+File layout (little endian, ``v`` = unsigned LEB128 varint, ``z`` = zigzag
+varint, ``s`` = ``v`` length + UTF-8)::
+
+    header   b"MBRP" u8 version  i64 seed  f64 tick  u8 recorded sides
+             (bit 0 ally, bit 1 enemy)
+    roster   v count, per unit: s id, s name, u8 side, v lane, i8 facing,
+             z max_hp, z atk, z defn, f64 spd, f64 atb_rate, f64 threshold,
+             z hp, f64 atb, f64 x, f64 y, f64 home_x
+    skills   v count, s skill_id ...
+    commands v count, per command: v tick delta, v unit slot,
+             v op (0 = wait, n = skill n - 1), v target slot when op > 0
+    result   u8 winner (0 ongoing, 1 ally, 2 enemy), v tick, u32 digest
+
+Sides driven by the player or by a deferred policy (see
+:class:`~game.battle.core.policy.DeferredPolicy`) are recorded and become
+manual on playback. Other policy-driven sides are not recorded; playback must
+use the same policies as the recording (by default nearest-target enemies).
+"""
+
+from __future__ import annotations
+
+import logging
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ...core.binary import DecodeError, Reader, Writer
+from .controller import BattleController
+from .events import BattleEnded
+from .models import STATE_CODE, Stats, Unit
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MBRP"
+VERSION = 3
+# versions 1 and 2 broke ties in turn order with a random draw; they can no
+# longer be re-simulated
+_OLD_ORDER = (1, 2)
+WINNERS = ("ongoing", "ally", "enemy")
+SIDES = ("ally", "enemy")
+
+_HEADER = struct.Struct("<4sBqd")
+_RESULT = struct.Struct("<I")
+
+
+class ReplayError(ValueError):
+    """Raised for malformed or unsupported replay data."""
+
+
+@dataclass(frozen=True, slots=True)
+class Command:
+    tick: int
+    slot: int
+    skill_id: str | None  # None means wait
+    target: int = -1
+
+
+@dataclass
+class Replay:
+    seed: int
+    tick: float
+    roster: list[Unit]
+    commands: list[Command] = field(default_factory=list)
+    winner: str = "ongoing"
+    end_tick: int = 0
+    digest: int = 0
+    manual: tuple[str, ...] = ("ally",)
+
+    def build(self, **kwargs: object) -> BattleController:
+        """Return a fresh controller set up exactly like the recorded one."""
+        ctrl = BattleController(self.seed, tick=self.tick, **kwargs)  # type: ignore[arg-type]
+        for side in self.manual:
+            ctrl.policies[side] = None
+        ctrl.add_units(_copy_unit(u) for u in self.roster)
+        return ctrl
+
+
+def state_digest(ctrl: BattleController) -> int:
+    """CRC32 over the clock and every unit's hp and state."""
+    crc = zlib.crc32(ctrl.ticks.to_bytes(8, "little"))
+    for unit in ctrl.units.values():
+        crc = zlib.crc32(struct.pack("<iB", unit.hp, STATE_CODE[unit.state]), crc)
+    return crc
+
+
+def _copy_unit(unit: Unit) -> Unit:
+    stats = unit.stats
+    return Unit(
+        id=unit.id,
+        name=unit.name,
+        side=unit.side,
+        lane=unit.lane,
+        stats=Stats(
+            stats.max_hp,
+            stats.atk,
+            stats.defn,
+            stats.spd,
+            stats.atb_rate,
+            stats.threshold,
+        ),
+        hp=unit.hp,
+        atb=unit.atb,
+        pos=unit.pos,
+        home_x=unit.home_x,
+        facing=unit.facing,
+    )
+
+
+class ReplayRecorder:
+    """Collects the manual commands given to a controller.
+
+    Attach with ``ctrl.recorder = ReplayRecorder(ctrl)`` before the first
+    tick. The controller reports every command; those of ``sides`` are kept.
+    By default these are the sides driven by the player or a deferred
+    policy, and they stay recorded if a policy takes over mid-battle.
+    """
+
+    def __init__(
+        self, ctrl: BattleController, sides: Sequence[str] | None = None
+    ) -> None:
+        if ctrl.seed is None:
+            raise ReplayError("only seeded battles can be recorded")
+        self.ctrl = ctrl
+        self.replay = Replay(
+            seed=ctrl.seed,
+            tick=ctrl.tick,
+            roster=[_copy_unit(u) for u in ctrl.units.values()],
+            manual=tuple(
+                side
+                for side in SIDES
+                if (ctrl.external(side) if sides is None else side in sides)
+            ),
+        )
+        self._stamped = False
+        ctrl.events.subscribe(BattleEnded, self._on_end)
+
+    def record(self, unit: Unit, skill_id: str | None, target: Unit | None) -> None:
+        if unit.side not in self.replay.manual:
+            return
+        slot = self.ctrl._slot_of
+        self.replay.commands.append(
+            Command(
+                self.ctrl.ticks,
+                slot[unit.id],
+                skill_id,
+                slot[target.id] if target else -1,
+            )
+        )
+
+    def finish(self) -> Replay:
+        """Return the replay, stamped with the outcome.
+
+        A finished battle is stamped at the moment it ended; otherwise the
+        current state is used.
+        """
+        if not self._stamped:
+            self._stamp()
+        return self.replay
+
+    def _on_end(self, _event: BattleEnded) -> None:
+        self._stamp()
+
+    def _stamp(self) -> None:
+        self._stamped = True
+        self.replay.winner, self.replay.end_tick, self.replay.digest = _outcome(
+            self.ctrl
+        )
+
+
+class ReplayPlayer:
+    """Feeds recorded commands back into a controller at their ticks.
+
+    Set ``ctrl.playback`` to a player to watch a replay in the scene at real
+    speed, or call :meth:`run` to play it headless at full speed.
+    """
+
+    def __init__(self, replay: Replay, ctrl: BattleController | None = None) -> None:
+        self.replay = replay
+        self.ctrl = ctrl or replay.build()
+        self.pos = 0
+
+    def advance_to(self, tick: int) -> None:
+        ctrl = self.ctrl
+        commands = self.replay.commands
+        while self.pos < len(commands) and commands[self.pos].tick <= tick:
+            cmd = commands[self.pos]
+            self.pos += 1
+            ctrl.advance_to(cmd.tick)
+            self._apply(cmd)
+        ctrl.advance_to(tick)
+
+    def run(self) -> BattleController:
+        """Play the whole replay as fast as possible."""
+        self.advance_to(self.replay.end_tick)
+        return self.ctrl
+
+    def _apply(self, cmd: Command) -> None:
+        ctrl = self.ctrl
+        unit = ctrl._slots[cmd.slot]
+        if unit.state != "COMMAND":
+            raise ReplayError(f"tick {cmd.tick}: {unit.id} is not awaiting a command")
+        if cmd.skill_id is None:
+            ctrl.wait(unit)
+        else:
+            ctrl.decide_action(unit, cmd.skill_id, ctrl._slots[cmd.target])
+
+
+def _outcome(ctrl: BattleController) -> tuple[str, int, int]:
+    return ctrl.check_victory(), ctrl.ticks, state_digest(ctrl)
+
+
+def verify(replay: Replay) -> tuple[bool, BattleController]:
+    """Re-simulate ``replay`` and compare outcome, end tick and digest."""
+    player = ReplayPlayer(replay)
+    ctrl = player.ctrl
+    ended: list[tuple[str, int, int]] = []
+    ctrl.events.subscribe(BattleEnded, lambda _e: ended.append(_outcome(ctrl)))
+    player.run()
+    result = ended[0] if ended else _outcome(ctrl)
+    return result == (replay.winner, replay.end_tick, replay.digest), ctrl
+
+
+# encoding
+_STATS = struct.Struct("<ddd")
+_POS = struct.Struct("<dddd")
+_FACING = struct.Struct("<b")
+
+
+def dumps(replay: Replay) -> bytes:
+    w = Writer()
+    w.pack(_HEADER, MAGIC, VERSION, replay.seed, replay.tick)
+    w.byte(sum(1 << i for i, side in enumerate(SIDES) if side in replay.manual))
+    w.varint(len(replay.roster))
+    for u in replay.roster:
+        s = u.stats
+        w.string(u.id)
+        w.string(u.name)
+        w.byte(SIDES.index(u.side))
+        w.varint(u.lane)
+        w.pack(_FACING, u.facing)
+        for value in (s.max_hp, s.atk, s.defn):
+            w.zigzag(value)
+        w.pack(_STATS, s.spd, s.atb_rate, s.threshold)
+        w.zigzag(u.hp)
+        w.pack(_POS, u.atb, u.pos[0], u.pos[1], u.home_x)
+    skills = sorted({c.skill_id for c in replay.commands if c.skill_id is not None})
+    skill_no = {sid: i + 1 for i, sid in enumerate(skills)}
+    w.varint(len(skills))
+    for sid in skills:
+        w.string(sid)
+    w.varint(len(replay.commands))
+    last = 0
+    for c in replay.commands:
+        w.varint(c.tick - last)
+        last = c.tick
+        w.varint(c.slot)
+        op = skill_no[c.skill_id] if c.skill_id is not None else 0
+        w.varint(op)
+        if op:
+            w.varint(c.target)
+    w.byte(WINNERS.index(replay.winner))
+    w.varint(replay.end_tick)
+    w.pack(_RESULT, replay.digest)
+    return w.getvalue()
+
+
+def loads(data: bytes) -> Replay:
+    try:
+        return _read(Reader(data))
+    except (DecodeError, IndexError) as exc:
+        raise ReplayError(f"malformed replay: {exc}") from exc
+
+
+def _read(r: Reader) -> Replay:
+    magic, version, seed, tick = r.unpack(_HEADER)
+    if magic != MAGIC:
+        raise ReplayError("not a replay file")
+    if version in _OLD_ORDER:
+        raise ReplayError(f"replay version {version} predates the current turn order")
+    if version != VERSION:
+        raise ReplayError(f"unsupported replay version {version}")
+    mask = r.byte()
+    manual = tuple(side for i, side in enumerate(SIDES) if mask >> i & 1)
+    roster = []
+    for _ in range(r.varint()):
+        uid = r.string()
+        name = r.string()
+        side = SIDES[r.byte()]
+        lane = r.varint()
+        (facing,) = r.unpack(_FACING)
+        max_hp, atk, defn = r.zigzag(), r.zigzag(), r.zigzag()
+        spd, rate, threshold = r.unpack(_STATS)
+        hp = r.zigzag()
+        atb, x, y, home_x = r.unpack(_POS)
+        roster.append(
+            Unit(
+                id=uid,
+                name=name,
+                side=side,  # type: ignore[arg-type]
+                lane=lane,
+                stats=Stats(max_hp, atk, defn, spd, rate, threshold),
+                hp=hp,
+                atb=atb,
+                pos=(x, y),
+                home_x=home_x,
+                facing=facing,
+            )
+        )
+    skills = [r.string() for _ in range(r.varint())]
+    commands = []
+    tick_no = 0
+    for _ in range(r.varint()):
+        tick_no += r.varint()
+        slot = r.varint()
+        op = r.varint()
+        if op:
+            commands.append(Command(tick_no, slot, skills[op - 1], r.varint()))
+        else:
+            commands.append(Command(tick_no, slot, None))
+    winner = WINNERS[r.byte()]
+    end_tick = r.varint()
+    (digest,) = r.unpack(_RESULT)
+    return Replay(seed, tick, roster, commands, winner, end_tick, digest, manual)
+
+
+def save(replay: Replay, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(dumps(replay))
+
+
+def load(path: Path) -> Replay:
+    return loads(path.read_bytes())
+
+
+class ReplayWriter:
+    """Background thread writing finished replays into ``directory``.
+
+    :meth:`submit` encodes the replay and returns at once; the file is
+    written on the writer thread, which then deletes the oldest ``*.mbr``
+    files beyond ``keep``. Failures are logged, never raised. :meth:`close`
+    waits for every pending replay.
+    """
+
+    def __init__(self, directory: Path, keep: int) -> None:
+        self.directory = directory
+        self.keep = keep
+        self._cond = threading.Condition()
+        self._pending: list[tuple[Path, bytes]] = []
+        self._busy = False
+        self._stop = False
+        self._thread: threading.Thread | None = None
+        self.written = 0
+
+    def submit(self, replay: Replay) -> Path:
+        """Queue ``replay``; returns the path it will be written to."""
+        path = self.directory / f"{time.strftime('%Y%m%d-%H%M%S')}.mbr"
+        data = dumps(replay)
+        with self._cond:
+            self._pending.append((path, data))
+            self._cond.notify()
+            if self._thread is None:
+                self._stop = False
+                self._thread = threading.Thread(
+                    target=self._run, name="replay-writer", daemon=True
+                )
+                self._thread.start()
+        return path
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every submitted replay is written; ``False`` if
+        ``timeout`` ran out first."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._busy, timeout
+            )
+
+    def close(self) -> None:
+        """Flush and stop the thread; a later :meth:`submit` restarts it."""
+        self.flush()
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def _run(self) -> None:
+        cond = self._cond
+        while True:
+            with cond:
+                cond.wait_for(lambda: self._pending or self._stop)
+                if not self._pending:
+                    return
+                path, data = self._pending.pop(0)
+                self._busy = True
+            ok = False
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(data)
+                ok = True
+                self._prune()
+            except OSError as exc:
+                logger.error("writing replay %s failed: %s", path, exc)
+            finally:
+                # whatever happened, flush must not wait for this replay forever
+                with cond:
+                    self._busy = False
+                    self.written += ok
+                    cond.notify_all()
+
+    def _prune(self) -> None:
+        # names are timestamps, so the oldest sort first
+        old = sorted(self.directory.glob("*.mbr"))[: -self.keep]
+        for path in old:
+            path.unlink(missing_ok=True)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Verify every replay given on the command line; exit 1 on mismatch."""
+    paths = [Path(p) for p in (sys.argv[1:] if argv is None else argv)]
+    failed = 0
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            ok, ctrl = verify(load(path))
+        except ReplayError as exc:
+            ok, detail = False, str(exc)
+        else:
+            detail = f"{ctrl.check_victory()} at tick {ctrl.ticks}"
+        ms = (time.perf_counter() - start) * 1000
+        print(f"{'ok  ' if ok else 'FAIL'} {path} ({detail}, {ms:.1f} ms)")
+        failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
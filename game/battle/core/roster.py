@@ -0,0 +1,48 @@
+"""Roster builders shared by the battle scene and headless simulations."""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from .controller import ALLY_X, ENEMY_X, LANE_Y
+from .models import Stats, Unit
+
+DEFAULT_ALLY_RATES = (40, 45, 50)
+DEFAULT_ENEMY_RATES = (35, 40, 45)
+
+
+def make_unit(side: str, index: int, stats: Stats) -> Unit:
+    """Create a unit standing at its home position in lane ``index``."""
+    ally = side == "ally"
+    home_x = ALLY_X if ally else ENEMY_X
+    return Unit(
+        id=f"{'a' if ally else 'e'}{index}",
+        name=f"{'Ally' if ally else 'Enemy'}{index}",
+        side="ally" if ally else "enemy",
+        lane=index,
+        stats=stats,
+        hp=stats.max_hp,
+        pos=(home_x, LANE_Y[index % len(LANE_Y)]),
+        home_x=home_x,
+        facing=1 if ally else -1,
+    )
+
+
+def default_roster(
+    ally_rates: Sequence[float] = DEFAULT_ALLY_RATES,
+    enemy_rates: Sequence[float] = DEFAULT_ENEMY_RATES,
+) -> list[Unit]:
+    """Return the prototype 3vs3 line-up with the given ATB rates."""
+    units = []
+    for side, rates in (("ally", ally_rates), ("enemy", enemy_rates)):
+        for i, rate in enumerate(rates):
+            stats = Stats(
+                max_hp=30,
+                atk=5,
+                defn=3,
+                spd=1.0,
+                atb_rate=rate,
+                threshold=100,
+            )
+            units.append(make_unit(side, i, stats))
+    return units
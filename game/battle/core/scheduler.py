@@ -0,0 +1,176 @@
+"""Heap-based queues for battle state transitions and turn order.
+
+:class:`EventScheduler` holds the tick of every unit's next transition;
+:class:`ReadyQueue` holds the units whose gauge is full, in the order they
+get to act.
+"""
+
+from __future__ import annotations
+
+import heapq
+from array import array
+from collections.abc import Callable, Iterator
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+U = TypeVar("U")
+
+
+class EventScheduler:
+    """Min-heap of the next transition tick of every unit slot.
+
+    Each slot has at most one live entry. Rescheduling or cancelling bumps the
+    slot's sequence number, which turns older heap entries into tombstones
+    that are skipped lazily when they reach the top.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[int, int, int]] = []
+        self._seq: list[int] = []
+
+    def add_slot(self) -> int:
+        self._seq.append(0)
+        return len(self._seq) - 1
+
+    def schedule(self, slot: int, tick: int) -> None:
+        seq = self._seq[slot] + 1
+        self._seq[slot] = seq
+        heapq.heappush(self._heap, (tick, slot, seq))
+
+    def cancel(self, slot: int) -> None:
+        self._seq[slot] += 1
+
+    def peek(self) -> int | None:
+        """Return the earliest pending tick without consuming it."""
+        heap = self._heap
+        seq = self._seq
+        while heap:
+            tick, slot, s = heap[0]
+            if seq[slot] == s:
+                return tick
+            heapq.heappop(heap)
+        return None
+
+    def pop(self, tick: int) -> int | None:
+        """Pop the next live slot due at or before ``tick``.
+
+        Slots due on the same tick come out in ascending slot order, which is
+        the order the units were added to the battle.
+        """
+        heap = self._heap
+        seq = self._seq
+        while heap and heap[0][0] <= tick:
+            _, slot, s = heapq.heappop(heap)
+            if seq[slot] == s:
+                seq[slot] = s + 1
+                return slot
+        return None
+
+    def copy(self) -> EventScheduler:
+        other = EventScheduler()
+        other._heap = self._heap.copy()
+        other._seq = self._seq.copy()
+        return other
+
+    def dump(self) -> tuple[array, array]:
+        """Live entries as flat ``(tick, slot, seq)`` triples, plus the
+        sequence numbers; tombstones are dropped."""
+        seq = self._seq
+        flat = array("q")
+        for entry in self._heap:
+            if seq[entry[1]] == entry[2]:
+                flat.extend(entry)
+        return flat, array("q", seq)
+
+    def load(self, flat: array, seq: array) -> None:
+        it = iter(flat)
+        self._heap = list(zip(it, it, it, strict=True))
+        heapq.heapify(self._heap)
+        self._seq = seq.tolist()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class ReadyQueue(Generic[T]):
+    """Units waiting for their turn, earliest ready time first.
+
+    Units ready at the same time go faster first, then in the order they
+    were pushed, so turn order follows from the battle alone and never from
+    a random draw. Membership is a dictionary lookup. Removing a unit or
+    pushing it again leaves a tombstone in the heap, skipped when it reaches
+    the top as in :class:`EventScheduler`.
+
+    Items are tracked by identity, so they do not need to be hashable.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, float, int, T]] = []
+        # id(item) -> sequence number of its live heap entry
+        self._live: dict[int, int] = {}
+        self._seq = 0
+
+    def push(self, item: T, ready: float = 0.0, speed: float = 0.0) -> None:
+        """Queue ``item``, replacing its earlier entry if it has one."""
+        seq = self._seq
+        self._seq = seq + 1
+        self._live[id(item)] = seq
+        heapq.heappush(self._heap, (ready, -speed, seq, item))
+
+    def pop(self) -> T:
+        """Remove and return the unit whose turn is next."""
+        heap, live = self._heap, self._live
+        while heap:
+            _, _, seq, item = heapq.heappop(heap)
+            if live.get(id(item)) == seq:
+                del live[id(item)]
+                return item
+        raise IndexError("pop from an empty ReadyQueue")
+
+    def peek(self) -> T | None:
+        heap, live = self._heap, self._live
+        while heap:
+            entry = heap[0]
+            if live.get(id(entry[3])) == entry[2]:
+                return entry[3]
+            heapq.heappop(heap)
+        return None
+
+    def remove(self, item: T) -> bool:
+        """Drop ``item`` from the queue; ``False`` if it was not queued."""
+        return self._live.pop(id(item), None) is not None
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._live.clear()
+
+    def copy(self, convert: Callable[[T], U] | None = None) -> ReadyQueue[U]:
+        """Copy the queue with the same order, optionally swapping every
+        item for ``convert(item)``, e.g. its counterpart in a cloned
+        battle."""
+        other: ReadyQueue = ReadyQueue()
+        live = self._live
+        entries = [e for e in self._heap if live.get(id(e[3])) == e[2]]
+        if convert is not None:
+            entries = [(r, s, q, convert(item)) for r, s, q, item in entries]
+        heapq.heapify(entries)
+        other._heap = entries
+        other._live = {id(e[3]): e[2] for e in entries}
+        other._seq = self._seq
+        return other
+
+    def __contains__(self, item: object) -> bool:
+        return id(item) in self._live
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __bool__(self) -> bool:
+        return bool(self._live)
+
+    def __iter__(self) -> Iterator[T]:
+        """Queued units in turn order, without removing them."""
+        live = self._live
+        for _, _, seq, item in sorted(self._heap):
+            if live.get(id(item)) == seq:
+                yield item
@@ -0,0 +1,247 @@
+"""Compiled skill table.
+
+``skills.json`` is validated and compiled into immutable :class:`Skill`
+records addressed by a small integer index. Battle code resolves a skill id
+to its index once, when an action is chosen, so resolving a hit is plain
+attribute access.
+
+The table is loaded on first use rather than at import time. During
+development a :class:`SkillWatcher` reloads it when the file changes; the new
+table is compiled completely before it replaces the old one, so readers see
+either the old or the new table and never a mix.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+SKILL_PATH = Path(__file__).resolve().parent.parent / "data" / "skills.json"
+SKILL_TYPES = ("MELEE", "RANGE")
+
+
+class SkillError(ValueError):
+    """Raised for invalid skill data or unknown skill ids."""
+
+
+@dataclass(frozen=True, slots=True)
+class Skill:
+    index: int
+    id: str
+    name: str
+    type: str
+    power: int
+    hit: float
+    cooldown: float
+    charge_anim: str
+    act_anim: str
+    effect: str
+    # precomputed
+    kind: int  # index into SKILL_TYPES
+    ranged: bool
+
+
+# field -> (accepted types, default); fields without a default are required
+_SCHEMA: dict[str, tuple[tuple[type, ...], Any]] = {
+    "id": ((str,), None),
+    "name": ((str,), None),
+    "type": ((str,), None),
+    "power": ((int,), None),
+    "hit": ((int, float), 1.0),
+    "cooldown": ((int, float), 0.0),
+    "charge_anim": ((str,), ""),
+    "act_anim": ((str,), ""),
+    "effect": ((str,), ""),
+}
+
+
+def _compile(index: int, raw: object) -> Skill:
+    if not isinstance(raw, dict):
+        raise SkillError(f"skill #{index}: expected an object")
+    where = f"skill {raw.get('id', f'#{index}')!r}"
+    unknown = raw.keys() - _SCHEMA.keys()
+    if unknown:
+        raise SkillError(f"{where}: unknown fields {sorted(unknown)}")
+    values: dict[str, Any] = {}
+    for name, (types, default) in _SCHEMA.items():
+        value = raw.get(name, default)
+        if value is None:
+            raise SkillError(f"{where}: missing {name!r}")
+        if isinstance(value, bool) or not isinstance(value, types):
+            raise SkillError(f"{where}: {name!r} has invalid type")
+        values[name] = value
+    if not values["id"]:
+        raise SkillError(f"skill #{index}: empty id")
+    if values["type"] not in SKILL_TYPES:
+        raise SkillError(f"{where}: type must be one of {SKILL_TYPES}")
+    if values["power"] < 0:
+        raise SkillError(f"{where}: power must not be negative")
+    if not 0.0 <= values["hit"] <= 1.0:
+        raise SkillError(f"{where}: hit must be within [0, 1]")
+    if values["cooldown"] < 0:
+        raise SkillError(f"{where}: cooldown must not be negative")
+    kind = SKILL_TYPES.index(values["type"])
+    return Skill(
+        index=index,
+        id=values["id"],
+        name=values["name"],
+        type=values["type"],
+        power=values["power"],
+        hit=float(values["hit"]),
+        cooldown=float(values["cooldown"]),
+        charge_anim=values["charge_anim"],
+        act_anim=values["act_anim"],
+        effect=values["effect"],
+        kind=kind,
+        ranged=SKILL_TYPES[kind] == "RANGE",
+    )
+
+
+class SkillTable:
+    """Immutable, integer-indexed collection of compiled skills."""
+
+    __slots__ = ("skills", "index")
+
+    def __init__(self, skills: Sequence[Skill]) -> None:
+        self.skills: tuple[Skill, ...] = tuple(skills)
+        self.index: dict[str, int] = {s.id: s.index for s in self.skills}
+
+    def __len__(self) -> int:
+        return len(self.skills)
+
+    def __iter__(self) -> Iterator[Skill]:
+        return iter(self.skills)
+
+    def __contains__(self, skill_id: object) -> bool:
+        return skill_id in self.index
+
+    def __getitem__(self, skill_id: str) -> Skill:
+        try:
+            return self.skills[self.index[skill_id]]
+        except KeyError:
+            raise SkillError(f"unknown skill {skill_id!r}") from None
+
+    def get(self, skill_id: str) -> Skill | None:
+        i = self.index.get(skill_id)
+        return None if i is None else self.skills[i]
+
+    def lookup(self, skill_id: str) -> int:
+        """Return the index of ``skill_id``; raises :class:`SkillError`."""
+        return self[skill_id].index
+
+
+def compile_skills(data: object, previous: SkillTable | None = None) -> SkillTable:
+    """Validate raw skill data and compile it into a :class:`SkillTable`.
+
+    With ``previous`` the skills it contains keep their indices, so indices
+    already stored in running battles stay valid across a reload; removing
+    one of them is rejected.
+    """
+    if not isinstance(data, list):
+        raise SkillError("skill data must be a list")
+    by_id: dict[str, object] = {}
+    for i, raw in enumerate(data):
+        skill_id = raw.get("id") if isinstance(raw, dict) else None
+        if isinstance(skill_id, str) and skill_id in by_id:
+            raise SkillError(f"duplicate skill id {skill_id!r}")
+        by_id[skill_id if isinstance(skill_id, str) else f"#{i}"] = raw
+    order = list(by_id)
+    if previous is not None:
+        missing = [s.id for s in previous if s.id not in by_id]
+        if missing:
+            raise SkillError(f"reload cannot remove skills {missing}")
+        kept = [s.id for s in previous]
+        order = kept + [k for k in order if k not in previous.index]
+    return SkillTable([_compile(i, by_id[k]) for i, k in enumerate(order)])
+
+
+def load_skills(
+    path: Path = SKILL_PATH, previous: SkillTable | None = None
+) -> SkillTable:
+    with path.open(encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as exc:
+            raise SkillError(f"{path}: {exc}") from exc
+    return compile_skills(data, previous)
+
+
+_table: SkillTable | None = None
+_lock = threading.Lock()
+
+
+def skill_table() -> SkillTable:
+    """Return the current table, loading ``skills.json`` on first use."""
+    table = _table
+    if table is None:
+        with _lock:
+            table = _table or _swap(load_skills())
+    return table
+
+
+def reload_skills(path: Path = SKILL_PATH) -> SkillTable:
+    """Recompile ``path`` and swap it in; the old table stays on error."""
+    with _lock:
+        return _swap(load_skills(path, _table))
+
+
+def _swap(table: SkillTable) -> SkillTable:
+    global _table
+    _table = table
+    return table
+
+
+class SkillWatcher:
+    """Daemon thread reloading the skill table when its file changes."""
+
+    def __init__(self, path: Path = SKILL_PATH, interval: float = 0.5) -> None:
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stamp = self._stat()
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def poll(self) -> bool:
+        """Reload if the file changed since the last poll; True on reload."""
+        stamp = self._stat()
+        if stamp is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            reload_skills(self.path)
+        except (OSError, SkillError) as exc:
+            logger.error("skill reload failed: %s", exc)
+            return False
+        logger.info("reloaded skills from %s", self.path)
+        return True
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="skill-watcher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
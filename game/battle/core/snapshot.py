@@ -0,0 +1,197 @@
+"""Flat battle-state snapshots for rollback and lookahead.
+
+A :class:`BattleSnapshot` holds everything that changes while a battle runs
+in a few typed arrays: per-unit state and stats, pending actions, the event
+heap, the target indices, the ready queue and the RNG state. Taking one
+copies a few hundred bytes per unit and allocates no per-unit objects;
+restoring writes the values back into the controller's existing units, so
+references held by scenes and policies stay valid.
+
+Snapshots belong to the battle they were taken from (or a clone of it): the
+roster and slot order must match. Callbacks, event subscribers and work
+pending in a deferred policy are not part of the state.
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from typing import TYPE_CHECKING, Any
+
+from .models import STATE_CODE, STATES, PlannedAction
+from .skills import skill_table
+
+if TYPE_CHECKING:
+    from .controller import BattleController
+
+# per-unit record, stored as doubles (ints are exact below 2**53)
+UNIT_FIELDS = (
+    "hp",
+    "state",
+    "atb",
+    "x",
+    "y",
+    "start",
+    "origin",
+    "max_hp",
+    "atk",
+    "defn",
+    "spd",
+    "atb_rate",
+    "threshold",
+)
+_N = len(UNIT_FIELDS)
+
+
+class BattleSnapshot:
+    """Immutable battle state; see the module docstring."""
+
+    __slots__ = (
+        "size",
+        "ticks",
+        "acc",
+        "winner",
+        "alive",
+        "units",
+        "actions",
+        "ready",
+        "heap",
+        "seq",
+        "sides",
+        "rng",
+    )
+
+    def __init__(self, **fields: Any) -> None:
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by this snapshot, container overhead
+        included."""
+        total = sys.getsizeof(self)
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if isinstance(value, dict):
+                total += sys.getsizeof(value) + sum(
+                    sys.getsizeof(v) for v in value.values()
+                )
+            elif isinstance(value, tuple):
+                total += sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+            else:
+                total += sys.getsizeof(value)
+        return total
+
+
+def _sizeof(value: object) -> int:
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def capture_rng(rng: Any) -> tuple[int, array, float | None]:
+    version, words, gauss = rng.getstate()
+    return (version, array("I", words), gauss)
+
+
+def restore_rng(rng: Any, state: tuple[int, array, float | None]) -> None:
+    version, words, gauss = state
+    rng.setstate((version, tuple(words), gauss))
+
+
+def capture_state(ctrl: BattleController) -> BattleSnapshot:
+    slots = ctrl._slots
+    start = ctrl._start
+    origin = ctrl._origin
+    slot_of = ctrl._slot_of
+    record: list[float] = []
+    actions = array("q")
+    for slot, u in enumerate(slots):
+        s = u.stats
+        record += (
+            u.hp,
+            STATE_CODE[u.state],
+            u.atb,
+            *u.pos,
+            start[slot],
+            origin[slot],
+            s.max_hp,
+            s.atk,
+            s.defn,
+            s.spd,
+            s.atb_rate,
+            s.threshold,
+        )
+        for pa in u.action_queue:
+            skill = pa.skill if pa.skill >= 0 else skill_table().lookup(pa.skill_id)
+            actions.extend((slot, skill, slot_of.get(pa.target_id, -1)))
+    heap, seq = ctrl.scheduler.dump()
+    return BattleSnapshot(
+        size=len(slots),
+        ticks=ctrl.ticks,
+        acc=ctrl._acc,
+        winner=ctrl.winner,
+        alive=(ctrl.alive["ally"], ctrl.alive["enemy"]),
+        units=array("d", record),
+        actions=actions,
+        ready=array("q", [slot_of[u.id] for u in ctrl.ready_queue]),
+        heap=heap,
+        seq=seq,
+        sides=tuple(index.dump() for index in ctrl.targets.values()),
+        rng=capture_rng(ctrl.rng),
+    )
+
+
+def restore_state(ctrl: BattleController, snap: BattleSnapshot) -> None:
+    slots = ctrl._slots
+    if snap.size != len(slots):
+        raise ValueError("snapshot was taken from a different roster")
+    start = ctrl._start
+    origin = ctrl._origin
+    rec = snap.units
+    stats_changed = False
+    for slot, u in enumerate(slots):
+        o = slot * _N
+        u.hp = int(rec[o])
+        u.state = STATES[int(rec[o + 1])]
+        u.atb = rec[o + 2]
+        u.pos = (rec[o + 3], rec[o + 4])
+        start[slot] = int(rec[o + 5])
+        origin[slot] = rec[o + 6]
+        s = u.stats
+        atk, defn = int(rec[o + 8]), int(rec[o + 9])
+        if atk != s.atk or defn != s.defn:
+            s.atk, s.defn = atk, defn
+            stats_changed = True
+        s.max_hp = int(rec[o + 7])
+        s.spd, s.atb_rate, s.threshold = rec[o + 10], rec[o + 11], rec[o + 12]
+        if u.action_queue:
+            u.action_queue.clear()
+    if snap.actions:
+        skills = skill_table().skills
+        acts = snap.actions
+        for i in range(0, len(acts), 3):
+            user = slots[acts[i]]
+            skill = acts[i + 1]
+            target = acts[i + 2]
+            user.action_queue.append(
+                PlannedAction(
+                    skill_id=skills[skill].id,
+                    user_id=user.id,
+                    target_id=slots[target].id if target >= 0 else "",
+                    skill=skill,
+                )
+            )
+    if stats_changed:
+        ctrl._damage = None
+    ctrl.ticks = snap.ticks
+    ctrl._acc = snap.acc
+    ctrl.winner = snap.winner
+    ctrl.alive["ally"], ctrl.alive["enemy"] = snap.alive
+    ctrl.ready_queue.clear()
+    for i in snap.ready:
+        ctrl.mark_ready(slots[i])
+    ctrl.scheduler.load(snap.heap, snap.seq)
+    for index, state in zip(ctrl.targets.values(), snap.sides, strict=True):
+        index.load(state)
+    restore_rng(ctrl.rng, snap.rng)
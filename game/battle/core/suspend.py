@@ -0,0 +1,200 @@
+"""Suspending an in-progress shuttle battle and resuming it later.
+
+:func:`suspend` turns a running :class:`BattleController` into bytes: the
+seed, the tick length, which sides take manual commands, who is in the
+battle and a :class:`~.snapshot.BattleSnapshot` of everything that changes
+while it runs. :func:`resume` builds a controller from the roster and
+restores the snapshot into it, so the battle goes on exactly as it would
+have without the break. Pending actions are stored by skill id, so a
+suspended battle survives changes to the order of the skill table.
+
+Like snapshots, a suspended battle leaves out callbacks, event subscribers,
+replay hooks and work pending in a deferred policy; units that were
+waiting for a command are asked again after resuming.
+
+Layout (see :mod:`game.core.binary` for the encodings)::
+
+    u8 version  u8 has seed  [z seed]  f64 tick  u8 manual sides
+    v unit count, per unit: s id, s name, u8 side, v lane, z facing,
+        f64 home_x, s target id ("" for none)
+    v ticks  f64 tick accumulator  u8 winner  v alive allies  v alive enemies
+    unit records (array of f64, see snapshot.UNIT_FIELDS)
+    v skill count, s skill id ...
+    v action count, per action: v unit slot, v skill no, z target slot
+    ready queue, event heap, event sequence numbers (arrays of i64)
+    per side: z synced tick, xs (array of f64), slots (array of i64),
+        v mover count, v slot ...
+    rng: v version, words (array of u32), u8 has gauss, [f64 gauss]
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Any
+
+from ...core.binary import DecodeError, Reader, Writer
+from .controller import BattleController
+from .models import STATES, Stats, Unit
+from .skills import SkillError, skill_table
+from .snapshot import UNIT_FIELDS, BattleSnapshot
+
+VERSION = 1
+SIDES = ("ally", "enemy")
+WINNERS = (None, "ally", "enemy")
+
+_N = len(UNIT_FIELDS)
+
+
+class SuspendError(ValueError):
+    """Raised for malformed or unsupported suspended battles."""
+
+
+def suspend(ctrl: BattleController) -> bytes:
+    snap = ctrl.snapshot()
+    w = Writer()
+    w.byte(VERSION)
+    w.byte(ctrl.seed is not None)
+    if ctrl.seed is not None:
+        w.zigzag(ctrl.seed)
+    w.f64(ctrl.tick)
+    w.byte(sum(1 << i for i, side in enumerate(SIDES) if ctrl.policies[side] is None))
+    w.varint(len(ctrl._slots))
+    for u in ctrl._slots:
+        w.string(u.id)
+        w.string(u.name)
+        w.byte(SIDES.index(u.side))
+        w.varint(u.lane)
+        w.zigzag(u.facing)
+        w.f64(u.home_x)
+        w.string(u.target_id or "")
+    w.varint(snap.ticks)
+    w.f64(snap.acc)
+    w.byte(WINNERS.index(snap.winner))
+    for alive in snap.alive:
+        w.varint(alive)
+    w.array(snap.units)
+    # actions refer to skills by id; the table order may change
+    skills = skill_table().skills
+    acts = snap.actions
+    used = sorted({skills[acts[i + 1]].id for i in range(0, len(acts), 3)})
+    skill_no = {sid: i for i, sid in enumerate(used)}
+    w.varint(len(used))
+    for sid in used:
+        w.string(sid)
+    w.varint(len(acts) // 3)
+    for i in range(0, len(acts), 3):
+        w.varint(acts[i])
+        w.varint(skill_no[skills[acts[i + 1]].id])
+        w.zigzag(acts[i + 2])
+    w.array(snap.ready)
+    w.array(snap.heap)
+    w.array(snap.seq)
+    for synced, xs, slots, movers in snap.sides:
+        w.zigzag(synced)
+        w.array(xs)
+        w.array(slots)
+        w.varint(len(movers))
+        for slot in movers:
+            w.varint(slot)
+    version, words, gauss = snap.rng
+    w.varint(version)
+    w.array(words)
+    w.byte(gauss is not None)
+    if gauss is not None:
+        w.f64(gauss)
+    return w.getvalue()
+
+
+def resume(data: bytes, **kwargs: Any) -> BattleController:
+    """Rebuild a suspended battle; ``kwargs`` go to :class:`BattleController`
+    (e.g. the policies). Sides that took manual commands get no policy."""
+    try:
+        return _resume(Reader(data), kwargs)
+    except (DecodeError, IndexError) as exc:
+        raise SuspendError(f"malformed suspended battle: {exc}") from exc
+
+
+def _resume(r: Reader, kwargs: dict[str, Any]) -> BattleController:
+    version = r.byte()
+    if version != VERSION:
+        raise SuspendError(f"unsupported suspended battle version {version}")
+    seed = r.zigzag() if r.byte() else None
+    tick = r.f64()
+    mask = r.byte()
+    identity = []
+    for _ in range(r.varint()):
+        uid, name = r.string(), r.string()
+        side = SIDES[r.byte()]
+        lane = r.varint()
+        facing = r.zigzag()
+        home_x = r.f64()
+        target_id = r.string() or None
+        identity.append((uid, name, side, lane, facing, home_x, target_id))
+    ticks = r.varint()
+    acc = r.f64()
+    winner = WINNERS[r.byte()]
+    alive = (r.varint(), r.varint())
+    units = r.array("d")
+    if len(units) != _N * len(identity):
+        raise SuspendError("unit records do not match the roster")
+    table = skill_table()
+    try:
+        skills = [table.lookup(r.string()) for _ in range(r.varint())]
+    except SkillError as exc:
+        raise SuspendError(str(exc)) from exc
+    actions = array("q")
+    for _ in range(r.varint()):
+        actions.extend((r.varint(), skills[r.varint()], r.zigzag()))
+    ready, heap, seq = r.array("q"), r.array("q"), r.array("q")
+    sides = []
+    for _ in SIDES:
+        synced = r.zigzag()
+        xs, slots = r.array("d"), r.array("q")
+        movers = tuple(r.varint() for _ in range(r.varint()))
+        sides.append((synced, xs, slots, movers))
+    rng_version = r.varint()
+    words = r.array("I")
+    gauss = r.f64() if r.byte() else None
+
+    ctrl = BattleController(seed, tick=tick, **kwargs)
+    for i, side in enumerate(SIDES):
+        if mask >> i & 1:
+            ctrl.policies[side] = None
+    roster = []
+    for slot, (uid, name, side, lane, facing, home_x, target_id) in enumerate(identity):
+        rec = units[slot * _N : (slot + 1) * _N]
+        stats = Stats(int(rec[7]), int(rec[8]), int(rec[9]), *rec[10:13])
+        roster.append(
+            Unit(
+                id=uid,
+                name=name,
+                side=side,  # type: ignore[arg-type]
+                lane=lane,
+                stats=stats,
+                hp=int(rec[0]),
+                atb=rec[2],
+                state=STATES[int(rec[1])],
+                pos=(rec[3], rec[4]),
+                home_x=home_x,
+                facing=facing,
+                target_id=target_id,
+            )
+        )
+    ctrl.add_units(roster)
+    ctrl.restore(
+        BattleSnapshot(
+            size=len(roster),
+            ticks=ticks,
+            acc=acc,
+            winner=winner,
+            alive=alive,
+            units=units,
+            actions=actions,
+            ready=ready,
+            heap=heap,
+            seq=seq,
+            sides=tuple(sides),
+            rng=(rng_version, words, gauss),
+        )
+    )
+    return ctrl
@@ -0,0 +1,123 @@
+"""Per-side x-ordered index for nearest-target queries."""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable
+
+
+class SideIndex:
+    """Living units of one side ordered by ``(x, slot)``.
+
+    ``xs`` and ``slots`` are parallel sorted lists, so lookups are bisections
+    and need no allocation. Stationary units only change position on their
+    own transitions; units on the move are kept in ``movers`` and re-keyed by
+    :meth:`sync` once per tick, the first time the index is queried.
+    """
+
+    def __init__(self) -> None:
+        self.xs: list[float] = []
+        self.slots: list[int] = []
+        self.movers: set[int] = set()
+        self._x: dict[int, float] = {}
+        self._synced = -1
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def copy(self) -> SideIndex:
+        other = SideIndex()
+        other.xs = self.xs.copy()
+        other.slots = self.slots.copy()
+        other.movers = self.movers.copy()
+        other._x = self._x.copy()
+        other._synced = self._synced
+        return other
+
+    def dump(self) -> tuple[int, array, array, tuple[int, ...]]:
+        return (
+            self._synced,
+            array("d", self.xs),
+            array("q", self.slots),
+            tuple(self.movers),
+        )
+
+    def load(self, state: tuple[int, array, array, tuple[int, ...]]) -> None:
+        synced, xs, slots, movers = state
+        self._synced = synced
+        self.xs = xs.tolist()
+        self.slots = slots.tolist()
+        self.movers = set(movers)
+        self._x = dict(zip(self.slots, self.xs, strict=True))
+
+    def add(self, slot: int, x: float) -> None:
+        self._x[slot] = x
+        i = self._find(slot, x)
+        self.xs.insert(i, x)
+        self.slots.insert(i, slot)
+
+    def remove(self, slot: int) -> None:
+        x = self._x.pop(slot, None)
+        if x is None:
+            return
+        self.movers.discard(slot)
+        i = self._find(slot, x)
+        del self.xs[i]
+        del self.slots[i]
+
+    def move(self, slot: int, x: float) -> None:
+        old = self._x.get(slot)
+        if old is None or old == x:
+            return
+        i = self._find(slot, old)
+        del self.xs[i]
+        del self.slots[i]
+        self._x[slot] = x
+        i = self._find(slot, x)
+        self.xs.insert(i, x)
+        self.slots.insert(i, slot)
+
+    def start_moving(self, slot: int) -> None:
+        self.movers.add(slot)
+
+    def stop_moving(self, slot: int, x: float) -> None:
+        self.movers.discard(slot)
+        self.move(slot, x)
+
+    def sync(self, tick: int, x_at: Callable[[int, float], float]) -> None:
+        """Re-key every moving unit to its position at ``tick``."""
+        if tick == self._synced:
+            return
+        self._synced = tick
+        for slot in self.movers:
+            self.move(slot, x_at(slot, tick))
+
+    def _find(self, slot: int, x: float) -> int:
+        lo = bisect_left(self.xs, x)
+        return bisect_left(self.slots, slot, lo, bisect_right(self.xs, x, lo))
+
+    def nearest(self, x: float) -> int:
+        """Return the slot closest to ``x``, or ``-1`` when empty.
+
+        Ties go to the lowest slot, matching a scan in slot order.
+        """
+        xs = self.xs
+        n = len(xs)
+        if not n:
+            return -1
+        i = bisect_left(xs, x)
+        if i == n:
+            return self.slots[bisect_left(xs, xs[n - 1])]
+        right = self.slots[i]
+        if i == 0:
+            return right
+        left_x = xs[i - 1]
+        d_left = x - left_x
+        d_right = xs[i] - x
+        if d_right < d_left:
+            return right
+        left = self.slots[bisect_left(xs, left_x)]
+        if d_left < d_right:
+            return left
+        return left if left < right else right
@@ -6,33 +6,7 @@ from collections import deque
 
 import arcade
 
-from ..core.models import Unit
-
-BAR_W = 60
-BAR_H = 6
-
-
-def draw_atb_bar(unit: Unit) -> None:  # pragma: no cover - visual
-    """Draw a simple ATB gauge under a unit."""
-    ratio = unit.atb / unit.stats.threshold if unit.stats.threshold else 0
-    x, y = unit.pos
-    left = x - BAR_W / 2
-    bottom = y - 30
-    color = arcade.color.GREEN if unit.side == "ally" else arcade.color.ORANGE
-    arcade.draw_lbwh_rectangle_filled(
-        left,
-        bottom,
-        BAR_W,
-        BAR_H,
-        arcade.color.GRAY,
-    )  # type: ignore[attr-defined]
-    arcade.draw_lbwh_rectangle_filled(
-        left,
-        bottom,
-        BAR_W * ratio,
-        BAR_H,
-        color,
-    )  # type: ignore[attr-defined]
+from ...core.text import draw_text
 
 
 class CommandMenu:
@@ -56,7 +30,7 @@ class CommandMenu:
         )  # type: ignore[attr-defined]
         for i, opt in enumerate(self.options):
             color = arcade.color.YELLOW if i == self.index else arcade.color.WHITE
-            arcade.draw_text(opt, base_x, base_y - i * 30, color, 16)
+            draw_text(opt, base_x, base_y - i * 30, color, 16)
 
 
 class MessageWindow:
@@ -71,4 +45,4 @@ class MessageWindow:
     def draw(self, width: int, height: int) -> None:  # pragma: no cover - visual
         arcade.draw_lbwh_rectangle_filled(0, 0, width, 40, (0, 0, 0, 200))  # type: ignore[attr-defined]
         for i, line in enumerate(self.lines):
-            arcade.draw_text(line, 10, 10 + i * 18, arcade.color.WHITE, 14)
+            draw_text(line, 10, 10 + i * 18, arcade.color.WHITE, 14)
@@ -0,0 +1,14 @@
+"""Micro and macro benchmarks for the battle core and scene update paths.
+
+Measures per-tick cost against unit count, full-battle throughput, snapshot
+and clone cost, save/replay latency, input routing and animation updates::
+
+    python -m game.bench run -o before.json
+    python -m game.bench run -o after.json 'tick/*' 'battle/*'
+    python -m game.bench compare before.json after.json --tolerance 0.1
+
+Every case is warmed up, then timed in ``repeat`` samples of enough calls to
+last at least ``min_sample`` seconds; the report lists per-call percentiles.
+``compare`` exits with status 1 when any case got slower than the tolerance
+allows, so it can gate a change in CI.
+"""
@@ -0,0 +1,122 @@
+"""Command line entry point, see :mod:`game.bench`."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+
+from .cases import SIZES, all_cases
+from .harness import (
+    Result,
+    Settings,
+    compare,
+    format_changes,
+    format_result,
+    run,
+    select,
+)
+
+
+def _sizes(text: str) -> tuple[int, ...]:
+    try:
+        return tuple(int(v) for v in text.split(","))
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid size list: {text!r}") from exc
+
+
+def _run(args: argparse.Namespace) -> int:
+    settings = Settings(
+        warmup=args.warmup, repeat=args.repeat, min_sample=args.min_sample
+    )
+    cases = select(all_cases(args.sizes), args.patterns)
+    if not cases:
+        print("no benchmark matches", file=sys.stderr)
+        return 2
+    if args.list:
+        for case in cases:
+            print(case.name)
+        return 0
+
+    def progress(result: Result) -> None:
+        print(format_result(result), file=sys.stderr, flush=True)
+
+    report = run(cases, settings, on_result=progress)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+def _compare(args: argparse.Namespace) -> int:
+    base = json.loads(args.base.read_text(encoding="utf-8"))
+    head = json.loads(args.head.read_text(encoding="utf-8"))
+    changes = compare(base, head, args.tolerance, args.stat)
+    print(format_changes(changes, args.stat))
+    slower = [c.name for c in changes if c.status == "slower"]
+    if slower:
+        print(
+            f"{len(slower)} case(s) slower than {args.tolerance:.0%}: "
+            + ", ".join(slower),
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    defaults = Settings()
+    parser = argparse.ArgumentParser(
+        prog="python -m game.bench", description="Benchmark the battle core."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="measure and write JSON results")
+    run_parser.add_argument(
+        "patterns", nargs="*", help="glob patterns of cases to run, e.g. 'tick/*'"
+    )
+    run_parser.add_argument("-o", "--output", type=Path, help="JSON file to write")
+    run_parser.add_argument("--repeat", type=int, default=defaults.repeat)
+    run_parser.add_argument(
+        "--warmup", type=float, default=defaults.warmup, help="seconds per case"
+    )
+    run_parser.add_argument(
+        "--min-sample",
+        type=float,
+        default=defaults.min_sample,
+        help="shortest sample in seconds",
+    )
+    run_parser.add_argument(
+        "--sizes",
+        type=_sizes,
+        default=SIZES,
+        metavar="N,N,...",
+        help="units per side for the scaling cases",
+    )
+    run_parser.add_argument("--list", action="store_true", help="only list cases")
+    run_parser.set_defaults(func=_run)
+
+    cmp_parser = commands.add_parser("compare", help="compare two JSON results")
+    cmp_parser.add_argument("base", type=Path)
+    cmp_parser.add_argument("head", type=Path)
+    cmp_parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="allowed relative slowdown, e.g. 0.1 for 10%%",
+    )
+    cmp_parser.add_argument(
+        "--stat", choices=["p50", "p90", "p95", "p99", "mean", "min"], default="p50"
+    )
+    cmp_parser.set_defaults(func=_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,448 @@
+"""Benchmark cases for the battle core and the scene update paths.
+
+Battles used for per-tick costs give every unit far more hp than it can lose
+while being measured, so they never end and every sample sees the same
+steady state: units filling ATB, running to the centre, hitting and
+returning.
+"""
+
+from __future__ import annotations
+
+import tempfile
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack
+from itertools import count, cycle
+from pathlib import Path
+
+from ..battle.core.controller import TICK, BattleController
+from ..battle.core.models import PlannedAction, Stats, Unit
+from ..battle.core.policy import NearestTargetPolicy
+from ..battle.core.roster import default_roster, make_unit
+from .harness import Case
+
+# units per side for the scaling cases
+SIZES = (3, 30, 300, 3000)
+# units per side of the largest array-backed battle, 10k units in all
+ARRAY_LARGE = 5000
+# ticks played before measuring so units are spread over every phase
+SETTLE_TICKS = 600
+# save slots on disk for the index scan case
+SAVE_SLOTS = 300
+# medabots and distinct parts in a realistic save
+SAVE_ROSTER = 30
+SAVE_PARTS = 400
+ENDLESS_HP = 1 << 30
+
+
+def roster(per_side: int, hp: int = ENDLESS_HP) -> list[Unit]:
+    """``per_side`` units on each side with staggered ATB rates."""
+    units = []
+    for side in ("ally", "enemy"):
+        for i in range(per_side):
+            stats = Stats(
+                max_hp=hp, atk=5, defn=3, spd=1.0, atb_rate=35 + i % 16, threshold=100
+            )
+            units.append(make_unit(side, i, stats))
+    return units
+
+
+def _battle(
+    per_side: int, factory: type[BattleController] = BattleController
+) -> BattleController:
+    ctrl = factory(0, ally_policy=NearestTargetPolicy())
+    ctrl.add_units(roster(per_side))
+    ctrl.run(SETTLE_TICKS)
+    return ctrl
+
+
+def tick_case(per_side: int, array: bool = False) -> Case:
+    """One frame of ``update`` covering exactly one tick."""
+
+    def setup(_stack: ExitStack) -> Callable[[], object]:
+        if array:
+            from ..battle.core.arrays import ArrayBattleController
+
+            ctrl = _battle(per_side, ArrayBattleController)
+        else:
+            ctrl = _battle(per_side)
+        return lambda: ctrl.update(TICK)
+
+    kind = "tick_array" if array else "tick"
+    return Case(f"{kind}/{per_side}v{per_side}", setup, "tick")
+
+
+def find_target_case(per_side: int) -> Case:
+    def setup(_stack: ExitStack) -> Callable[[], object]:
+        ctrl = _battle(per_side)
+        # a different attacker each call, as when several units ready
+        attackers = cycle(ctrl._slots)
+        return lambda: ctrl.find_target(next(attackers))
+
+    return Case(f"find_target/{per_side}v{per_side}", setup, "lookup")
+
+
+def apply_action_case() -> Case:
+    def setup(_stack: ExitStack) -> Callable[[], object]:
+        ctrl = _battle(3)
+        user, target = ctrl.units["a0"], ctrl.units["e0"]
+        pa = PlannedAction("melee_punch", user.id, target.id)
+        return lambda: ctrl.apply_action(pa)
+
+    return Case("apply_action/3v3", setup, "action")
+
+
+def battle_case() -> Case:
+    """A whole default 3v3 battle, a new seed every call."""
+
+    def setup(_stack: ExitStack) -> Callable[[], object]:
+        seeds = count()
+
+        def op() -> str:
+            ctrl = BattleController(next(seeds), ally_policy=NearestTargetPolicy())
+            ctrl.add_units(default_roster())
+            return ctrl.run()
+
+        return op
+
+    return Case("battle/3v3", setup, "battle")
+
+
+def snapshot_cases(per_side: int) -> Iterator[Case]:
+    def take(_stack: ExitStack) -> Callable[[], object]:
+        return _battle(per_side).snapshot
+
+    def restore(_stack: ExitStack) -> Callable[[], object]:
+        ctrl = _battle(per_side)
+        snap = ctrl.snapshot()
+        return lambda: ctrl.restore(snap)
+
+    def clone(_stack: ExitStack) -> Callable[[], object]:
+        return _battle(per_side).clone
+
+    size = f"{per_side}v{per_side}"
+    yield Case(f"snapshot/{size}", take, "snapshot")
+    yield Case(f"restore/{size}", restore, "restore")
+    yield Case(f"clone/{size}", clone, "clone")
+
+
+def _tempdir(stack: ExitStack) -> Path:
+    return Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="bench-")))
+
+
+def _patch(stack: ExitStack, obj: object, name: str, value: object) -> None:
+    old = getattr(obj, name)
+    setattr(obj, name, value)
+    stack.callback(setattr, obj, name, old)
+
+
+def save_cases() -> Iterator[Case]:
+    """Save slot writes and reads, redirected to a temporary directory."""
+
+    def _redirect(stack: ExitStack) -> Path:
+        from ..core import saveio
+
+        directory = _tempdir(stack)
+        _patch(stack, saveio, "SAVES_DIR", directory)
+        # closed before the directory is removed
+        stack.callback(lambda: saveio.save_archive().close())
+        return directory
+
+    def write(stack: ExitStack) -> Callable[[], object]:
+        from ..core import saveio
+
+        _redirect(stack)
+        data = saveio.SaveData(player_name="Bench", progress=3)
+        return lambda: saveio.write_slot(1, data)
+
+    def load(stack: ExitStack) -> Callable[[], object]:
+        from ..core import saveio
+
+        _redirect(stack)
+        saveio.write_slot(1, saveio.SaveData(player_name="Bench", progress=3))
+        return lambda: saveio.load_slot(1)
+
+    def submit(stack: ExitStack) -> Callable[[], object]:
+        from ..core import saveio
+
+        _redirect(stack)
+        writer = saveio.SaveWriter()
+        stack.callback(writer.close)
+        data = saveio.SaveData(player_name="Bench", progress=3)
+        return lambda: writer.submit(1, data)
+
+    def fill(stack: ExitStack) -> None:
+        from ..core import saveio
+
+        _redirect(stack)
+        for slot in range(1, SAVE_SLOTS + 1):
+            saveio.write_slot(slot, saveio.SaveData(player_name="Bench", progress=slot))
+
+    def scan(stack: ExitStack) -> Callable[[], object]:
+        from ..core import saveio
+
+        fill(stack)
+        index = saveio.SlotIndex(saveio.save_archive())
+        index.refresh()
+        return index.refresh
+
+    def open_(stack: ExitStack) -> Callable[[], object]:
+        from ..core import saveio
+        from ..core.archive import SaveArchive
+
+        fill(stack)
+        path = saveio.save_archive().path
+
+        def run() -> object:
+            archive = SaveArchive(path)
+            saveio.SlotIndex(archive).refresh()
+            archive.close()
+            return archive
+
+        return run
+
+    def compact(stack: ExitStack) -> Callable[[], object]:
+        from ..core import saveio
+
+        fill(stack)
+        return saveio.save_archive().compact
+
+    yield Case("save/write", write, "save")
+    yield Case("save/load", load, "load")
+    # the UI thread's share of a background save
+    yield Case("save/submit", submit, "save")
+    # rereading an unchanged archive, as a save screen does on opening
+    yield Case(f"save/scan/{SAVE_SLOTS}", scan, "scan")
+    # opening the archive and reading every summary, as at startup
+    yield Case(f"save/open/{SAVE_SLOTS}", open_, "open")
+    yield Case(f"save/compact/{SAVE_SLOTS}", compact, "compact")
+
+
+def _full_save() -> object:
+    """A save of realistic size: a full roster and parts inventory plus a
+    battle suspended mid-way."""
+    from ..battle.core.suspend import suspend
+    from ..core import saveio
+
+    return saveio.SaveData(
+        player_name="Bench",
+        progress=12,
+        line=40,
+        roster=[
+            saveio.Medabot(name=f"Bot{i}", atb_rate=35 + i % 20)
+            for i in range(SAVE_ROSTER)
+        ],
+        parts={f"part{i:03d}": i % 9 + 1 for i in range(SAVE_PARTS)},
+        battle=suspend(_battle(3)),
+    )
+
+
+def save_format_cases() -> Iterator[Case]:
+    """Encoding and decoding :func:`_full_save` as the indented JSON slots
+    used to be written and as the binary format."""
+
+    def json_encode(_stack: ExitStack) -> Callable[[], object]:
+        data = _full_save()
+        return lambda: data.model_dump_json(indent=2)  # type: ignore[attr-defined]
+
+    def json_decode(_stack: ExitStack) -> Callable[[], object]:
+        from ..core.saveio import SaveData
+
+        raw = _full_save().model_dump_json(indent=2)  # type: ignore[attr-defined]
+        return lambda: SaveData.model_validate_json(raw)
+
+    def binary_encode(_stack: ExitStack) -> Callable[[], object]:
+        from ..core.saveio import encode
+
+        data = _full_save()
+        return lambda: encode(data)  # type: ignore[arg-type]
+
+    def binary_decode(_stack: ExitStack) -> Callable[[], object]:
+        from ..core.saveio import decode, encode
+
+        raw = encode(_full_save())  # type: ignore[arg-type]
+        return lambda: decode(raw)
+
+    def binary_summary(_stack: ExitStack) -> Callable[[], object]:
+        from ..core.savefile import SaveFile
+        from ..core.saveio import encode
+
+        raw = encode(_full_save())  # type: ignore[arg-type]
+        return lambda: SaveFile(raw).section("META")
+
+    yield Case("save/json/encode", json_encode, "save")
+    yield Case("save/json/decode", json_decode, "load")
+    yield Case("save/binary/encode", binary_encode, "save")
+    yield Case("save/binary/decode", binary_decode, "load")
+    yield Case("save/binary/summary", binary_summary, "load")
+
+
+def replay_cases() -> Iterator[Case]:
+    """Writing and reading the replay of a finished 3v3 battle."""
+
+    def recorded() -> object:
+        from ..battle.core.replay import ReplayRecorder
+
+        ctrl = BattleController(0, ally_policy=NearestTargetPolicy())
+        recorder = ReplayRecorder(ctrl, sides=("ally",))
+        ctrl.recorder = recorder
+        ctrl.add_units(default_roster())
+        ctrl.run()
+        return recorder.finish()
+
+    def write(stack: ExitStack) -> Callable[[], object]:
+        from ..battle.core import replay
+
+        rec = recorded()
+        path = _tempdir(stack) / "bench.mbr"
+        return lambda: replay.save(rec, path)  # type: ignore[arg-type]
+
+    def load(stack: ExitStack) -> Callable[[], object]:
+        from ..battle.core import replay
+
+        path = _tempdir(stack) / "bench.mbr"
+        replay.save(recorded(), path)  # type: ignore[arg-type]
+        return lambda: replay.load(path)
+
+    yield Case("replay/write", write, "save")
+    yield Case("replay/load", load, "load")
+
+
+def input_case() -> Case:
+    def setup(_stack: ExitStack) -> Callable[[], object]:
+        import arcade
+
+        from ..core.input import InputRouter
+
+        router = InputRouter(up=lambda: None, down=lambda: None)
+        return lambda: router.on_key_press(arcade.key.DOWN, 0)
+
+    return Case("input/key_press", setup, "key")
+
+
+def animations_case(live: int) -> Case:
+    """``EffectSystem.update`` with ``live`` flashes and damage pops alive
+    and as many hits landing per second as keep that population."""
+
+    def setup(_stack: ExitStack) -> Callable[[], object]:
+        from ..battle.core.animations import POP_TIME, EffectSystem
+
+        ctrl = _battle(3)
+        user, target = ctrl.units["a0"], ctrl.units["e0"]
+        effects = EffectSystem(flashes=live, pops=live)
+        per_frame = max(1, round(live * TICK / POP_TIME))
+
+        def op() -> None:
+            for i in range(per_frame):
+                effects.play_effect("flash", user, target)
+                effects.pop_damage(i, target.pos)
+            effects.update(TICK)
+
+        return op
+
+    return Case(f"animations/{live}", setup, "frame")
+
+
+def pathfind_case(width: int, height: int) -> Case:
+    """An enemy step on a grid a tenth full of units right after another
+    unit moved; distance fields only depend on the terrain, so the field
+    is reused across the moves."""
+
+    def setup(_stack: ExitStack) -> Callable[[], object]:
+        from random import Random
+
+        from ..battle.core.grid import EMPTY, DistanceFields, OccupancyGrid
+
+        grid = OccupancyGrid(width, height)
+        fields = DistanceFields(grid)
+        rng = Random(0)  # noqa: S311
+        free = [(x, y) for y in range(height) for x in range(width)]
+        rng.shuffle(free)
+        for i, (x, y) in enumerate(free[: width * height // 10]):
+            grid.place(i, x, y)
+        goal = (width - 1, height // 2)
+        if grid.at(*goal) == EMPTY:
+            grid.place(len(free), *goal)
+        start = next(c for c in free if grid.at(*c) == EMPTY)
+        grid.place(len(free) + 1, *start)
+        # a unit stepping back and forth between steps, as in a battle
+        cells = next(
+            [(x, y), (x + 1, y)]
+            for x, y in free
+            if grid.at(x, y) >= 0
+            and grid.at(x + 1, y) == EMPTY
+            and grid.inside(x + 1, y)
+        )
+
+        def op() -> object:
+            grid.move(*cells[0], *cells[1])
+            cells.reverse()
+            return fields.step(*start, *goal)
+
+        return op
+
+    return Case(f"pathfind/{width}x{height}", setup, "step")
+
+
+def bitboard_cases(width: int, height: int) -> list[Case]:
+    """Whole-grid queries on a grid a tenth full of units, half of each
+    team: every unit's targets within three cells, and the cells one unit
+    can walk to in five moves."""
+
+    def board(stack: ExitStack):
+        from random import Random
+
+        from ..battle.core.grid import OccupancyGrid
+
+        grid = OccupancyGrid(width, height)
+        rng = Random(0)  # noqa: S311
+        cells = [(x, y) for y in range(height) for x in range(width)]
+        rng.shuffle(cells)
+        units = cells[: width * height // 10]
+        for i, (x, y) in enumerate(units):
+            grid.place(i, x, y, "player" if i % 2 else "enemy")
+        return grid.boards, units
+
+    def targets(stack: ExitStack) -> Callable[[], object]:
+        boards, units = board(stack)
+        boards.in_range(3)  # built once per battle, not per query
+
+        def op() -> object:
+            return [boards.targets(x, y, "enemy", 3) for x, y in units]
+
+        return op
+
+    def reachable(stack: ExitStack) -> Callable[[], object]:
+        boards, units = board(stack)
+        x, y = units[0]
+        return lambda: boards.reachable(x, y, 5)
+
+    name = f"bitboard/{width}x{height}"
+    return [
+        Case(f"{name}/targets", targets, "query"),
+        Case(f"{name}/reachable", reachable, "query"),
+    ]
+
+
+def all_cases(sizes: tuple[int, ...] = SIZES) -> list[Case]:
+    try:
+        import numpy  # noqa: F401
+    except ImportError:  # pragma: no cover - optional dependency
+        array = False
+    else:
+        array = True
+    cases = [tick_case(n) for n in sizes]
+    if array:
+        cases += [tick_case(n, array=True) for n in (*sizes, ARRAY_LARGE)]
+    cases += [find_target_case(n) for n in sizes]
+    cases.append(apply_action_case())
+    cases.append(battle_case())
+    for n in sizes:
+        cases += snapshot_cases(n)
+    cases += save_cases()
+    cases += save_format_cases()
+    cases += replay_cases()
+    cases += [pathfind_case(w, h) for w, h in ((15, 9), (64, 64), (256, 256))]
+    cases += bitboard_cases(15, 9) + bitboard_cases(64, 64)
+    cases.append(input_case())
+    cases += [animations_case(n) for n in (10, 100, 1000)]
+    return cases
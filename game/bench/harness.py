@@ -0,0 +1,218 @@
+"""Timing, statistics and comparison for benchmark cases."""
+
+from __future__ import annotations
+
+import gc
+import math
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable, Iterable, Sequence
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+from fnmatch import fnmatchcase
+from typing import Any
+
+# bump when the layout of the JSON results changes
+RESULTS_VERSION = 1
+
+
+@dataclass(frozen=True, slots=True)
+class Case:
+    """A named benchmark.
+
+    ``setup`` builds the state to measure and returns the operation to time;
+    anything it registers on the ``ExitStack`` (temporary directories,
+    patched globals) is undone once the case has been measured. ``unit``
+    names what one call of the operation does, e.g. ``"tick"``.
+    """
+
+    name: str
+    setup: Callable[[ExitStack], Callable[[], object]]
+    unit: str = "call"
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    warmup: float = 0.1  # seconds of untimed calls before sampling
+    repeat: int = 30  # samples per case
+    min_sample: float = 0.002  # seconds; calls are batched up to this
+
+
+@dataclass(frozen=True, slots=True)
+class Result:
+    """Per-call times of one case, in seconds."""
+
+    name: str
+    unit: str
+    samples: int
+    number: int  # calls per sample
+    mean: float
+    stdev: float
+    min: float
+    p50: float
+    p90: float
+    p95: float
+    p99: float
+    max: float
+
+    @property
+    def per_second(self) -> float:
+        return 1.0 / self.p50 if self.p50 else math.inf
+
+
+def percentiles(values: Sequence[float]) -> dict[str, float]:
+    data = sorted(values)
+    if len(data) == 1:
+        return {k: data[0] for k in ("p50", "p90", "p95", "p99")}
+    cut = statistics.quantiles(data, n=100, method="inclusive")
+    return {"p50": cut[49], "p90": cut[89], "p95": cut[94], "p99": cut[98]}
+
+
+def _time(op: Callable[[], object], number: int) -> float:
+    # like timeit: the collector would charge one case for another's garbage
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(number):
+            op()
+        return time.perf_counter() - start
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _calibrate(op: Callable[[], object], settings: Settings) -> int:
+    """Warm up and return how many calls make up one sample."""
+    number = 1
+    spent = 0.0
+    while True:
+        took = _time(op, number)
+        spent += took
+        if took >= settings.min_sample:
+            break
+        number *= 2 if took * 2 >= settings.min_sample else 10
+    while spent < settings.warmup:
+        spent += _time(op, number)
+    return number
+
+
+def measure(case: Case, settings: Settings) -> Result:
+    with ExitStack() as stack:
+        op = case.setup(stack)
+        number = _calibrate(op, settings)
+        times = [_time(op, number) / number for _ in range(settings.repeat)]
+    return Result(
+        name=case.name,
+        unit=case.unit,
+        samples=len(times),
+        number=number,
+        mean=statistics.fmean(times),
+        stdev=statistics.stdev(times) if len(times) > 1 else 0.0,
+        min=min(times),
+        max=max(times),
+        **percentiles(times),
+    )
+
+
+def select(cases: Iterable[Case], patterns: Sequence[str]) -> list[Case]:
+    """Cases whose name matches any of the glob ``patterns`` (all if none)."""
+    if not patterns:
+        return list(cases)
+    return [c for c in cases if any(fnmatchcase(c.name, p) for p in patterns)]
+
+
+def run(
+    cases: Iterable[Case],
+    settings: Settings,
+    on_result: Callable[[Result], None] | None = None,
+) -> dict[str, Any]:
+    """Measure every case and return the JSON-ready report."""
+    results: dict[str, Any] = {}
+    for case in cases:
+        result = measure(case, settings)
+        results[case.name] = asdict(result)
+        if on_result:
+            on_result(result)
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "settings": asdict(settings),
+        "results": results,
+    }
+
+
+@dataclass(frozen=True, slots=True)
+class Change:
+    name: str
+    base: float
+    head: float
+    status: str  # "ok", "faster", "slower", "added" or "removed"
+
+    @property
+    def ratio(self) -> float:
+        return self.head / self.base if self.base else math.inf
+
+
+def compare(
+    base: dict[str, Any],
+    head: dict[str, Any],
+    tolerance: float = 0.1,
+    stat: str = "p50",
+) -> list[Change]:
+    """Compare ``stat`` of every case in two reports.
+
+    A case is ``slower`` when its time grew by more than ``tolerance`` (a
+    fraction) and ``faster`` when it shrank by more than that.
+    """
+    old = base["results"]
+    new = head["results"]
+    changes = []
+    for name in [*old, *(n for n in new if n not in old)]:
+        if name not in new:
+            changes.append(Change(name, old[name][stat], math.nan, "removed"))
+            continue
+        if name not in old:
+            changes.append(Change(name, math.nan, new[name][stat], "added"))
+            continue
+        a, b = old[name][stat], new[name][stat]
+        status = "ok"
+        if b > a * (1 + tolerance):
+            status = "slower"
+        elif b < a * (1 - tolerance):
+            status = "faster"
+        changes.append(Change(name, a, b, status))
+    return changes
+
+
+def format_time(seconds: float) -> str:
+    if math.isnan(seconds):
+        return "-"
+    for scale, suffix in ((1e-6, "ns"), (1e-3, "us"), (1.0, "ms")):
+        if seconds < scale:
+            return f"{seconds / scale * 1e3:.3g}{suffix}"
+    return f"{seconds:.3g}s"
+
+
+def format_result(result: Result) -> str:
+    return (
+        f"{result.name:<32} p50 {format_time(result.p50):>8}"
+        f"  p95 {format_time(result.p95):>8}  p99 {format_time(result.p99):>8}"
+        f"  {result.per_second:>12,.0f} {result.unit}/s"
+    )
+
+
+def format_changes(changes: Sequence[Change], stat: str = "p50") -> str:
+    lines = [f"{'case':<32} {'base ' + stat:>10} {'head ' + stat:>10}  change"]
+    for c in changes:
+        delta = "" if c.status in ("added", "removed") else f"{c.ratio - 1:+.1%}"
+        lines.append(
+            f"{c.name:<32} {format_time(c.base):>10} {format_time(c.head):>10}"
+            f"  {delta:>7} {c.status}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,352 @@
+"""Single-file archive of save slots, read through ``mmap``.
+
+The file starts with two copies of a fixed-size index, followed by the
+records (little endian)::
+
+    index    b"MBAR" u16 version  u16 capacity  u64 generation  u64 end
+             per slot: u64 offset  u32 length (0: empty)  f64 mtime
+             u32 crc32 of everything above
+    index    the other copy
+    records  every stored payload, appended at ``end``
+
+Opening the archive reads the two index copies and keeps the valid one with
+the higher generation; nothing else is read until a slot is. A write
+appends the payload at ``end``, syncs it, then writes the next generation
+of the index over the older copy and syncs again, so a crash at any point
+leaves the previous index and everything it points to intact.
+
+Rewriting a slot leaves its old record behind as garbage. Once the garbage
+outgrows both :data:`COMPACT_MIN` and the live records, the next write
+compacts: the live records are copied to a new file that replaces the
+archive. A mapped file cannot be replaced everywhere (not on Windows), so
+compaction waits for a write made while no slice of the archive is alive.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO
+
+MAGIC = b"MBAR"
+VERSION = 1
+CAPACITY = 512
+# garbage below this is never compacted away
+COMPACT_MIN = 1 << 20
+
+_HEADER = struct.Struct("<4sHHQQ")
+_ENTRY = struct.Struct("<QId")
+_CRC = struct.Struct("<I")
+
+# (offset, length, mtime) of a stored slot
+Entry = tuple[int, int, float]
+
+
+class ArchiveError(ValueError):
+    """Raised for archives with no readable index, and for closing or
+    replacing an archive while a slice of it is still alive."""
+
+
+def _index_size(capacity: int) -> int:
+    return _HEADER.size + _ENTRY.size * capacity + _CRC.size
+
+
+def _pack_index(
+    capacity: int, generation: int, end: int, entries: list[Entry | None]
+) -> bytes:
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, capacity, generation, end))
+    for entry in entries:
+        out += _ENTRY.pack(*entry) if entry else _ENTRY.pack(0, 0, 0.0)
+    out += _CRC.pack(zlib.crc32(out))
+    return bytes(out)
+
+
+def _unpack_index(
+    data: bytes | memoryview, pos: int
+) -> tuple[int, int, int, list[Entry | None]] | None:
+    """``(capacity, generation, end, entries)`` of the index copy at ``pos``,
+    or ``None`` if it is torn or not an index."""
+    if len(data) < pos + _HEADER.size:
+        return None
+    magic, version, capacity, generation, end = _HEADER.unpack_from(data, pos)
+    if magic != MAGIC or version != VERSION:
+        return None
+    size = _index_size(capacity)
+    if len(data) < pos + size:
+        return None
+    body = data[pos : pos + size - _CRC.size]
+    if zlib.crc32(body) != _CRC.unpack_from(data, pos + size - _CRC.size)[0]:
+        return None
+    entries: list[Entry | None] = [
+        entry if entry[1] else None
+        for entry in _ENTRY.iter_unpack(body[_HEADER.size :])
+    ]
+    return capacity, generation, end, entries
+
+
+class SaveArchive:
+    """Save slots ``0 <= slot < capacity`` stored in one file.
+
+    The file is opened and mapped on first use and created by the first
+    write. Every method is thread safe; :meth:`view` holds the archive's
+    lock while its slice is in use. A map that still has slices when the
+    file grows is retired and closed once they are gone.
+    """
+
+    def __init__(self, path: Path, capacity: int = CAPACITY) -> None:
+        self.path = path
+        self._lock = threading.RLock()
+        self._file: BinaryIO | None = None
+        self._map: mmap.mmap | None = None
+        # maps replaced while a slice of them was alive, and open views
+        self._retired: list[mmap.mmap] = []
+        self._views = 0
+        self._loaded = False
+        self.capacity = capacity
+        self._generation = 0
+        self._end = _index_size(capacity) * 2
+        self._entries: list[Entry | None] = [None] * capacity
+        self.compactions = 0
+
+    @property
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    @property
+    def _data_start(self) -> int:
+        return _index_size(self.capacity) * 2
+
+    @property
+    def live(self) -> int:
+        """Bytes held by the current record of every slot."""
+        with self._lock:
+            self._load()
+            return sum(entry[1] for entry in self._entries if entry)
+
+    @property
+    def garbage(self) -> int:
+        """Bytes held by records that were since overwritten."""
+        with self._lock:
+            self._load()
+            return self._end - self._data_start - self.live
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        try:
+            f = self._file = self.path.open("r+b")
+        except FileNotFoundError:
+            return  # empty until the first write creates it
+        # the capacity never changes, so either copy's header has it
+        head = f.read(_HEADER.size)
+        capacity = _HEADER.unpack(head)[2] if len(head) == _HEADER.size else 0
+        # both index copies come first; a shorter (e.g. empty) file cannot
+        # be mapped or read
+        if os.fstat(f.fileno()).st_size < 2 * _index_size(capacity):
+            self.close()
+            raise ArchiveError(f"{self.path} is truncated")
+        data = self._remap(f)
+        copies = [_unpack_index(data, i * _index_size(capacity)) for i in (0, 1)]
+        best = max(
+            (copy for copy in copies if copy is not None and copy[0] == capacity),
+            key=lambda copy: copy[1],
+            default=None,
+        )
+        if best is None:
+            self.close()
+            raise ArchiveError(f"{self.path} has no readable index")
+        self.capacity, self._generation, self._end, self._entries = best
+        self._loaded = True
+
+    def _remap(self, f: BinaryIO) -> mmap.mmap:
+        self._unmap()
+        self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _unmap(self) -> None:
+        if self._map is not None:
+            self._retired.append(self._map)
+            self._map = None
+        self._release()
+
+    def _release(self) -> bool:
+        """Close the retired maps no slice points into any more; ``True``
+        once all of them are closed."""
+        alive = []
+        for old in self._retired:
+            try:
+                old.close()
+            except BufferError:
+                alive.append(old)
+        self._retired = alive
+        return not alive
+
+    @property
+    def _busy(self) -> bool:
+        return bool(self._views) or not self._release()
+
+    def close(self) -> None:
+        """Release the file; the next use opens it again.
+
+        Raises :class:`ArchiveError` if a slice kept past its :meth:`view`
+        block still holds the old map; the map is closed once it goes.
+        """
+        with self._lock:
+            self._unmap()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._loaded = False
+            if self._retired:
+                raise ArchiveError(f"{self.path} is still mapped by a slice")
+
+    def _check(self, slot: int) -> None:
+        if not 0 <= slot < self.capacity:
+            raise ValueError(f"slot {slot} is outside 0..{self.capacity - 1}")
+
+    def entries(self) -> dict[int, Entry]:
+        """``(offset, length, mtime)`` of every stored slot."""
+        with self._lock:
+            self._load()
+            return {slot: entry for slot, entry in enumerate(self._entries) if entry}
+
+    def entry(self, slot: int) -> Entry | None:
+        with self._lock:
+            self._load()
+            self._check(slot)
+            return self._entries[slot]
+
+    def __contains__(self, slot: int) -> bool:
+        with self._lock:
+            self._load()
+            return 0 <= slot < self.capacity and self._entries[slot] is not None
+
+    @contextmanager
+    def view(self, slot: int) -> Iterator[memoryview | None]:
+        """A zero-copy slice of the slot's record, or ``None`` if the slot is
+        empty. The archive stays locked inside the ``with`` block; do not
+        keep the slice, or anything made from it, past the block."""
+        with self._lock:
+            self._load()
+            self._check(slot)
+            entry = self._entries[slot]
+            if entry is None or self._map is None:
+                yield None
+                return
+            offset, length, _ = entry
+            self._views += 1
+            try:
+                with (
+                    memoryview(self._map) as whole,
+                    whole[offset : offset + length] as view,
+                ):
+                    yield view
+            finally:
+                self._views -= 1
+
+    def read(self, slot: int) -> bytes | None:
+        with self.view(slot) as view:
+            return None if view is None else bytes(view)
+
+    def write(self, slot: int, payload: bytes) -> None:
+        """Store ``payload`` as the slot's record."""
+        if not payload:
+            raise ValueError("archive records cannot be empty")
+        with self._lock:
+            self._load()
+            self._check(slot)
+            f = self._file or self._create()
+            f.seek(self._end)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+            self._entries[slot] = (self._end, len(payload), time.time())
+            self._end += len(payload)
+            self._commit(f)
+            # a write inside a view block, or while an old slice is alive,
+            # leaves compacting to a later write
+            if self.garbage > max(COMPACT_MIN, self.live) and not self._busy:
+                self.compact()
+
+    def delete(self, slot: int) -> None:
+        with self._lock:
+            self._load()
+            self._check(slot)
+            if self._file is not None and self._entries[slot] is not None:
+                self._entries[slot] = None
+                self._commit(self._file)
+
+    def _commit(self, f: BinaryIO) -> None:
+        """Write the next generation of the index over the older copy."""
+        self._generation += 1
+        f.seek(_index_size(self.capacity) * (self._generation % 2))
+        f.write(_pack_index(self.capacity, self._generation, self._end, self._entries))
+        f.flush()
+        os.fsync(f.fileno())
+        if self._map is None or len(self._map) < self._end:
+            self._remap(f)
+
+    def _create(self) -> BinaryIO:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        empty = _pack_index(self.capacity, 0, self._data_start, self._entries)
+        f = self._replace(empty + empty)
+        self._generation, self._end = 0, self._data_start
+        return f
+
+    def _replace(self, *chunks: bytes | memoryview) -> BinaryIO:
+        """Atomically replace the archive with ``chunks`` and open it.
+
+        Raises :class:`ArchiveError`, before touching the file, while any
+        slice of it is alive.
+        """
+        if self._busy:
+            raise ArchiveError(f"{self.path} is in use by a view")
+        self.close()
+        fd, tmp = tempfile.mkstemp(
+            dir=self.path.parent, prefix=self.path.name + ".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        f = self._file = self.path.open("r+b")
+        self._remap(f)
+        self._loaded = True
+        return f
+
+    def compact(self) -> None:
+        """Rewrite the archive with only the live records; raises
+        :class:`ArchiveError` while a slice of the archive is alive."""
+        with self._lock:
+            self._load()
+            if self._map is None:
+                return
+            entries: list[Entry | None] = [None] * self.capacity
+            records = []
+            end = self._data_start
+            with memoryview(self._map) as whole:
+                for slot, entry in enumerate(self._entries):
+                    if entry is None:
+                        continue
+                    offset, length, mtime = entry
+                    records.append(bytes(whole[offset : offset + length]))
+                    entries[slot] = (end, length, mtime)
+                    end += length
+            index = _pack_index(self.capacity, 0, end, entries)
+            self._replace(index, index, *records)
+            self._generation, self._end, self._entries = 0, end, entries
+            self.compactions += 1
@@ -0,0 +1,137 @@
+"""Little-endian binary encoding helpers for save data.
+
+Unsigned integers are LEB128 varints and signed ones zigzag varints.
+Strings and blobs are a varint length followed by the bytes (UTF-8 for
+strings). Typed arrays are a varint item count followed by the items in
+little-endian order, whatever the byte order of the machine. A list of
+strings is a varint count and one string holding them all, separated by
+NUL characters, so it decodes with a single split.
+"""
+
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+_F64 = struct.Struct("<d")
+_SWAP = sys.byteorder == "big"
+
+
+class DecodeError(ValueError):
+    """Raised for truncated or malformed binary data."""
+
+
+class Writer:
+    __slots__ = ("out",)
+
+    def __init__(self) -> None:
+        self.out = bytearray()
+
+    def varint(self, value: int) -> None:
+        out = self.out
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+    def zigzag(self, value: int) -> None:
+        self.varint((value << 1) if value >= 0 else ((-value << 1) - 1))
+
+    def byte(self, value: int) -> None:
+        self.out.append(value)
+
+    def f64(self, value: float) -> None:
+        self.out += _F64.pack(value)
+
+    def pack(self, fmt: struct.Struct, *values: object) -> None:
+        self.out += fmt.pack(*values)
+
+    def string(self, text: str) -> None:
+        self.blob(text.encode("utf-8"))
+
+    def blob(self, raw: bytes) -> None:
+        self.varint(len(raw))
+        self.out += raw
+
+    def strings(self, texts: Sequence[str]) -> None:
+        joined = "\0".join(texts)
+        if joined.count("\0") != max(0, len(texts) - 1):
+            raise ValueError("strings in a list must not contain NUL")
+        self.varint(len(texts))
+        self.string(joined)
+
+    def array(self, values: array) -> None:
+        self.varint(len(values))
+        if _SWAP and values.itemsize > 1:
+            values = array(values.typecode, values)
+            values.byteswap()
+        self.out += values.tobytes()
+
+    def getvalue(self) -> bytes:
+        return bytes(self.out)
+
+
+class Reader:
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data: bytes | memoryview) -> None:
+        self.data = memoryview(data)
+        self.pos = 0
+
+    @property
+    def at_end(self) -> bool:
+        return self.pos == len(self.data)
+
+    def take(self, n: int) -> memoryview:
+        if self.pos + n > len(self.data):
+            raise DecodeError("truncated data")
+        chunk = self.data[self.pos : self.pos + n]
+        self.pos += n
+        return chunk
+
+    def varint(self) -> int:
+        shift = result = 0
+        while True:
+            byte = self.take(1)[0]
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def zigzag(self) -> int:
+        v = self.varint()
+        return (v >> 1) if not v & 1 else -((v + 1) >> 1)
+
+    def byte(self) -> int:
+        return self.take(1)[0]
+
+    def f64(self) -> float:
+        return _F64.unpack(self.take(8))[0]
+
+    def unpack(self, fmt: struct.Struct) -> tuple:
+        return fmt.unpack(self.take(fmt.size))
+
+    def string(self) -> str:
+        return str(self.take(self.varint()), "utf-8")
+
+    def blob(self) -> bytes:
+        return bytes(self.take(self.varint()))
+
+    def strings(self) -> list[str]:
+        count = self.varint()
+        joined = self.string()
+        if not count:
+            return []
+        texts = joined.split("\0")
+        if len(texts) != count:
+            raise DecodeError("string list has the wrong length")
+        return texts
+
+    def array(self, typecode: str) -> array:
+        values = array(typecode)
+        values.frombytes(self.take(self.varint() * values.itemsize))
+        if _SWAP and values.itemsize > 1:
+            values.byteswap()
+        return values
@@ -3,9 +3,9 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 CONFIG_PATH = DATA_DIR / "config.json"
@@ -16,6 +16,15 @@ class Config(BaseModel):
     window_height: int = 600
     window_title: str = "Medabattle Arcade"
     font_name: str = "Arial"
+    # enemy lookahead budget, see game.battle.core.ai.DIFFICULTY
+    difficulty: Literal["easy", "normal", "hard"] = "normal"
+    # record every battle to data/replays, keeping the newest replays_kept
+    record_replays: bool = True
+    replays_kept: int = Field(20, ge=1)
+    # development: reload skills.json when it changes on disk
+    watch_skills: bool = False
+    # development: start with the frame profiler and its overlay on (F3)
+    profile: bool = False
 
 
 def load_config() -> Config:
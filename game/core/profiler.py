@@ -0,0 +1,197 @@
+"""Opt-in frame profiler.
+
+The scene stack and the battle controller report how long each update,
+draw, key press and battle phase took as spans. Spans go into a fixed-size
+ring buffer of typed arrays, so recording allocates nothing and old frames
+simply fall out. The overlay shows p50/p95/p99 of the frame interval and of
+every span name; :meth:`FrameProfiler.export_chrome` writes the buffer as a
+Chrome ``trace_event`` file for ``chrome://tracing`` or Perfetto.
+
+Instrumented code holds a reference to the profiler (or ``None``) and checks
+:attr:`FrameProfiler.enabled` before reading the clock, so a disabled
+profiler costs one attribute test per hook.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from array import array
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Any
+
+import arcade
+
+from .text import draw_text
+
+SPAN_CAPACITY = 16384
+FRAME_CAPACITY = 600
+# seconds between overlay refreshes; the percentiles sort the whole buffer
+OVERLAY_REFRESH = 0.5
+
+
+def _percentiles(values: list[int]) -> tuple[float, float, float]:
+    """Nearest-rank p50/p95/p99 of nanosecond ``values``, in milliseconds."""
+    if not values:
+        return (0.0, 0.0, 0.0)
+    data = sorted(values)
+    last = len(data) - 1
+    p50, p95, p99 = (data[round(q * last)] / 1e6 for q in (0.5, 0.95, 0.99))
+    return (p50, p95, p99)
+
+
+class FrameProfiler:
+    """Ring buffer of timed spans plus frame intervals."""
+
+    def __init__(
+        self, capacity: int = SPAN_CAPACITY, frames: int = FRAME_CAPACITY
+    ) -> None:
+        self.enabled = False
+        self.overlay = False
+        self._names: list[str] = []
+        self._ids: dict[str, int] = {}
+        self._key = array("i", bytes(4 * capacity))
+        self._start = array("q", bytes(8 * capacity))
+        self._dur = array("q", bytes(8 * capacity))
+        self._head = 0
+        self._count = 0
+        self._frames = array("q", bytes(8 * frames))
+        self._frame_head = 0
+        self._frame_count = 0
+        self._last_frame = 0
+        self._origin = perf_counter_ns()
+        self._summary: list[tuple[str, tuple[float, float, float]]] = []
+        self._summary_at = 0
+
+    def key(self, name: str) -> int:
+        """Id of the span ``name``; look it up once and keep it."""
+        key = self._ids.get(name)
+        if key is None:
+            key = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return key
+
+    def set_enabled(self, on: bool) -> None:
+        self.enabled = on
+        # the first frame after a pause would measure the pause itself
+        self._last_frame = 0
+
+    def record(self, key: int, start: int) -> None:
+        """Store a span that began at ``start`` (``perf_counter_ns``) and
+        ends now."""
+        i = self._head
+        self._key[i] = key
+        self._start[i] = start
+        self._dur[i] = perf_counter_ns() - start
+        self._head = (i + 1) % len(self._key)
+        if self._count < len(self._key):
+            self._count += 1
+
+    def frame(self) -> None:
+        """Mark the start of a frame; intervals between marks are the frame
+        times."""
+        now = perf_counter_ns()
+        if self._last_frame:
+            i = self._frame_head
+            self._frames[i] = now - self._last_frame
+            self._frame_head = (i + 1) % len(self._frames)
+            if self._frame_count < len(self._frames):
+                self._frame_count += 1
+        self._last_frame = now
+
+    def clear(self) -> None:
+        self._head = self._count = 0
+        self._frame_head = self._frame_count = 0
+        self._last_frame = 0
+        self._summary = []
+
+    def _order(self, head: int, count: int, size: int) -> range:
+        return range(head - count, head) if count < size else range(head, head + size)
+
+    def spans(self) -> list[tuple[str, int, int]]:
+        """Recorded ``(name, start_ns, duration_ns)``, oldest first."""
+        size = len(self._key)
+        out = []
+        for j in self._order(self._head, self._count, size):
+            i = j % size
+            out.append((self._names[self._key[i]], self._start[i], self._dur[i]))
+        return out
+
+    def frame_times(self) -> list[int]:
+        size = len(self._frames)
+        order = self._order(self._frame_head, self._frame_count, size)
+        return [self._frames[j % size] for j in order]
+
+    def summary(self) -> list[tuple[str, tuple[float, float, float]]]:
+        """p50/p95/p99 in milliseconds of the frame interval and of every
+        span name, frame first and the rest by name."""
+        by_key: dict[int, list[int]] = {}
+        size = len(self._key)
+        for j in self._order(self._head, self._count, size):
+            i = j % size
+            by_key.setdefault(self._key[i], []).append(self._dur[i])
+        rows = [("frame", _percentiles(self.frame_times()))]
+        rows += sorted((self._names[k], _percentiles(v)) for k, v in by_key.items())
+        return rows
+
+    def trace_events(self) -> dict[str, Any]:
+        """The buffer in Chrome ``trace_event`` format (complete events)."""
+        pid = os.getpid()
+        events: list[dict[str, Any]] = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": 1,
+                "args": {"name": "main"},
+            }
+        ]
+        for name, start, dur in self.spans():
+            scope, _, _ = name.partition(".")
+            events.append(
+                {
+                    "name": name,
+                    "cat": scope,
+                    "ph": "X",
+                    "ts": (start - self._origin) / 1e3,
+                    "dur": dur / 1e3,
+                    "pid": pid,
+                    "tid": 1,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.trace_events()), encoding="utf-8")
+
+    def draw(self, height: int) -> None:  # pragma: no cover - visual
+        if not self.overlay:
+            return
+        now = perf_counter_ns()
+        if now - self._summary_at > OVERLAY_REFRESH * 1e9:
+            self._summary = self.summary()
+            self._summary_at = now
+        rows = self._summary
+        top = height - 20
+        arcade.draw_lrbt_rectangle_filled(
+            8, 372, top - 16 * len(rows) - 8, top + 18, (0, 0, 0, 170)
+        )
+        draw_text(
+            f"{'ms':<24}{'p50':>7}{'p95':>7}{'p99':>7}",
+            12,
+            top,
+            arcade.color.YELLOW,
+            10,
+            font_name="Courier New",
+        )
+        for n, (name, (p50, p95, p99)) in enumerate(rows, start=1):
+            draw_text(
+                f"{name[:24]:<24}{p50:7.2f}{p95:7.2f}{p99:7.2f}",
+                12,
+                top - 16 * n,
+                arcade.color.WHITE,
+                10,
+                font_name="Courier New",
+            )
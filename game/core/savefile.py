@@ -0,0 +1,200 @@
+"""Versioned binary save container.
+
+A save file is a fixed header, a table of contents and the payloads of its
+sections, each named by a four-character tag (little endian)::
+
+    header   b"MBSV" u16 version  u16 section count  u32 crc32 of the table
+    table    per section: 4s tag  u8 flags (bit 0 zlib)  u32 offset
+             u32 stored length  u32 decoded length  u32 crc32 of stored bytes
+    payload  the stored bytes of every section, at their offsets
+
+:class:`SaveFile` parses only the header and the table. A section is
+checked and decompressed the first time it is read, so a save screen that
+wants the summary section reads a few dozen bytes (:func:`peek`) and never
+decodes the rest.
+
+Files written by an older version are upgraded on load by the functions
+registered with :func:`migration`, one version step at a time; a migration
+receives and returns the decoded sections.
+"""
+
+from __future__ import annotations
+
+import struct
+import zlib
+from collections.abc import Callable, Mapping
+from pathlib import Path
+
+MAGIC = b"MBSV"
+VERSION = 1
+# sections smaller than this are stored as they are
+COMPRESS_MIN = 256
+
+ZLIB = 1
+
+_HEADER = struct.Struct("<4sHHI")
+_ENTRY = struct.Struct("<4sBIIII")
+
+Sections = dict[str, bytes]
+
+_MIGRATIONS: dict[int, Callable[[Sections], Sections]] = {}
+
+
+class SaveFormatError(ValueError):
+    """Raised for malformed, corrupted or unsupported save data."""
+
+
+def migration(
+    version: int,
+) -> Callable[[Callable[[Sections], Sections]], Callable[[Sections], Sections]]:
+    """Register the decorated function as the upgrade from ``version`` to
+    ``version + 1``."""
+
+    def register(fn: Callable[[Sections], Sections]) -> Callable[[Sections], Sections]:
+        _MIGRATIONS[version] = fn
+        return fn
+
+    return register
+
+
+def migrate(sections: Sections, version: int) -> Sections:
+    while version < VERSION:
+        step = _MIGRATIONS.get(version)
+        if step is None:
+            raise SaveFormatError(f"no migration from save version {version}")
+        sections = step(sections)
+        version += 1
+    return sections
+
+
+def dumps(
+    sections: Mapping[str, bytes], *, compress: bool = True, version: int = VERSION
+) -> bytes:
+    table = bytearray()
+    body = bytearray()
+    offset = _HEADER.size + _ENTRY.size * len(sections)
+    for tag, raw in sections.items():
+        flags = 0
+        stored = raw
+        if compress and len(raw) >= COMPRESS_MIN:
+            packed = zlib.compress(raw, 1)
+            if len(packed) < len(raw):
+                stored, flags = packed, ZLIB
+        table += _ENTRY.pack(
+            _tag(tag),
+            flags,
+            offset + len(body),
+            len(stored),
+            len(raw),
+            zlib.crc32(stored),
+        )
+        body += stored
+    header = _HEADER.pack(MAGIC, version, len(sections), zlib.crc32(table))
+    return bytes(header + table + body)
+
+
+def _tag(tag: str) -> bytes:
+    raw = tag.encode("ascii")
+    if len(raw) != 4:
+        raise ValueError(f"section tags have four characters, got {tag!r}")
+    return raw
+
+
+def _header(data: bytes | memoryview) -> tuple[int, int, int]:
+    if len(data) < _HEADER.size:
+        raise SaveFormatError("truncated save")
+    magic, version, count, crc = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SaveFormatError("not a save file")
+    if version > VERSION:
+        raise SaveFormatError(f"save version {version} is newer than this game")
+    return version, count, crc
+
+
+def _entries(
+    table: bytes | memoryview, count: int, crc: int
+) -> dict[str, tuple[int, ...]]:
+    if len(table) < _ENTRY.size * count:
+        raise SaveFormatError("truncated save")
+    table = table[: _ENTRY.size * count]
+    if zlib.crc32(table) != crc:
+        raise SaveFormatError("save table checksum mismatch")
+    entries = {}
+    for tag, *entry in _ENTRY.iter_unpack(table):
+        entries[tag.decode("ascii")] = tuple(entry)
+    return entries
+
+
+def _decode(tag: str, entry: tuple[int, ...], stored: bytes | memoryview) -> bytes:
+    flags, _, length, size, crc = entry
+    if len(stored) != length:
+        raise SaveFormatError(f"section {tag} is truncated")
+    if zlib.crc32(stored) != crc:
+        raise SaveFormatError(f"section {tag} checksum mismatch")
+    if not flags & ZLIB:
+        return bytes(stored)
+    try:
+        raw = zlib.decompress(stored)
+    except zlib.error as exc:
+        raise SaveFormatError(f"section {tag} does not decompress") from exc
+    if len(raw) != size:
+        raise SaveFormatError(f"section {tag} has the wrong size")
+    return raw
+
+
+class SaveFile:
+    """A parsed save; sections are decoded on first access."""
+
+    def __init__(self, data: bytes | memoryview) -> None:
+        self._data = memoryview(data)
+        version, count, crc = _header(self._data[: _HEADER.size])
+        self.version = version
+        self._entries = _entries(self._data[_HEADER.size :], count, crc)
+        self._decoded: Sections = {}
+        if version < VERSION:
+            self._decoded = migrate(self._decode_all(), version)
+            self._entries = {}
+
+    def _decode_all(self) -> Sections:
+        return {tag: self._read(tag, entry) for tag, entry in self._entries.items()}
+
+    def _read(self, tag: str, entry: tuple[int, ...]) -> bytes:
+        offset, length = entry[1], entry[2]
+        return _decode(tag, entry, self._data[offset : offset + length])
+
+    @property
+    def tags(self) -> list[str]:
+        return list(dict.fromkeys([*self._entries, *self._decoded]))
+
+    def __contains__(self, tag: str) -> bool:
+        return tag in self._decoded or tag in self._entries
+
+    def get(self, tag: str) -> bytes | None:
+        raw = self._decoded.get(tag)
+        if raw is None:
+            entry = self._entries.get(tag)
+            if entry is None:
+                return None
+            raw = self._decoded[tag] = self._read(tag, entry)
+        return raw
+
+    def section(self, tag: str) -> bytes:
+        raw = self.get(tag)
+        if raw is None:
+            raise SaveFormatError(f"save has no {tag} section")
+        return raw
+
+
+def peek(path: Path, tag: str) -> bytes | None:
+    """Read one section of a save file without reading the others."""
+    with path.open("rb") as f:
+        version, count, crc = _header(f.read(_HEADER.size))
+        if version < VERSION:
+            f.seek(0)
+            return SaveFile(f.read()).get(tag)
+        entries = _entries(f.read(_ENTRY.size * count), count, crc)
+        entry = entries.get(tag)
+        if entry is None:
+            return None
+        f.seek(entry[1])
+        return _decode(tag, entry, f.read(entry[2]))
@@ -1,42 +1,449 @@
-"""Save file utilities."""
+"""Save file utilities.
+
+Slots live in one archive, ``SAVES_DIR / "saves.dat"``
+(:mod:`game.core.archive`), each stored in the binary format of
+:mod:`game.core.savefile` with the sections
+
+* ``META``: player name, progress, story position and whether a battle is
+  suspended; small and never compressed, so listing a slot reads only this;
+* ``ROST``: the player's medabots, column by column: the names, then their
+  integer stats and float stats as typed arrays;
+* ``PART``: the parts inventory, as the part ids and an array of counts;
+* ``BATL``: a suspended battle (:mod:`game.battle.core.suspend`), if any.
+
+When the archive does not exist yet, the ``slot<n>.sav`` and
+``slot<n>.json`` files of older versions are moved into it. Screens that
+list slots go through :class:`SlotIndex`, which keeps a
+:class:`SlotSummary` per slot in memory: filling it reads the archive's
+index and the ``META`` section of each slot straight from the mapped file,
+a refresh only re-reads slots whose record moved, and :func:`write_slot`
+updates it directly. Looking a slot up in the index never touches the disk.
+
+The archive appends every write and syncs it before pointing its index at
+it, so a crash mid-write leaves the previous save intact. The game saves
+through a :class:`SaveWriter`, which does that work on a background thread.
+"""
 
 from __future__ import annotations
 
-import json
+import logging
+import os
+import re
+import threading
+from array import array
+from collections.abc import Callable
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 
+from .archive import Entry, SaveArchive
+from .binary import Reader, Writer
 from .config import DATA_DIR
+from .savefile import SaveFile, SaveFormatError, dumps
 
 SAVES_DIR = DATA_DIR / "saves"
-SAVES_DIR.mkdir(exist_ok=True)
+ARCHIVE_NAME = "saves.dat"
+
+logger = logging.getLogger(__name__)
+
+_SLOT_NAME = re.compile(r"slot(\d+)\.(sav|json)")
+
+
+class Medabot(BaseModel):
+    name: str
+    max_hp: int = 30
+    atk: int = 5
+    defn: int = 3
+    spd: float = 1.0
+    atb_rate: float = 40.0
+    threshold: float = 100.0
 
 
 class SaveData(BaseModel):
+    # the suspended battle is binary; JSON carries it as base64
+    model_config = ConfigDict(ser_json_bytes="base64", val_json_bytes="base64")
+
     player_name: str = "Player"
     progress: int = 0
+    episode: str = "episode01"
+    line: int = 0
+    roster: list[Medabot] = Field(default_factory=list)
+    # part id -> how many the player owns
+    parts: dict[str, int] = Field(default_factory=dict)
+    # a battle left mid-way, see game.battle.core.suspend
+    battle: bytes | None = None
+
+
+_BOT_FIELDS = tuple(Medabot.model_fields)
+
+
+def _meta(data: SaveData) -> bytes:
+    w = Writer()
+    w.string(data.player_name)
+    w.zigzag(data.progress)
+    w.string(data.episode)
+    w.zigzag(data.line)
+    w.byte(data.battle is not None)
+    return w.getvalue()
+
+
+def encode(data: SaveData, *, compress: bool = True) -> bytes:
+    """The binary save of ``data``."""
+    sections = {"META": _meta(data)}
+    # column by column, so each decodes with one split or array read
+    roster = data.roster
+    w = Writer()
+    w.strings([bot.name for bot in roster])
+    w.array(array("q", [v for b in roster for v in (b.max_hp, b.atk, b.defn)]))
+    w.array(array("d", [v for b in roster for v in (b.spd, b.atb_rate, b.threshold)]))
+    sections["ROST"] = w.getvalue()
+    w = Writer()
+    w.strings(list(data.parts))
+    w.array(array("q", data.parts.values()))
+    sections["PART"] = w.getvalue()
+    if data.battle is not None:
+        sections["BATL"] = data.battle
+    return dumps(sections, compress=compress)
+
+
+def decode(raw: bytes) -> SaveData:
+    """Parse a binary save; raises :class:`SaveFormatError` or
+    :class:`~game.core.binary.DecodeError` for bad data."""
+    save = SaveFile(raw)
+    r = Reader(save.section("META"))
+    player_name, progress = r.string(), r.zigzag()
+    episode, line = r.string(), r.zigzag()
+    roster = []
+    rost = save.get("ROST")
+    if rost:
+        r = Reader(rost)
+        names, ints, floats = r.strings(), r.array("q"), r.array("d")
+        if len(ints) != 3 * len(names) or len(floats) != 3 * len(names):
+            raise SaveFormatError("roster columns do not match")
+        columns = (ints[0::3], ints[1::3], ints[2::3])
+        columns += (floats[0::3], floats[1::3], floats[2::3])
+        roster = [
+            dict(zip(_BOT_FIELDS, row, strict=True))
+            for row in zip(names, *columns, strict=True)
+        ]
+    parts: dict[str, int] = {}
+    part = save.get("PART")
+    if part:
+        r = Reader(part)
+        ids, counts = r.strings(), r.array("q")
+        if len(ids) != len(counts):
+            raise SaveFormatError("parts columns do not match")
+        parts = dict(zip(ids, counts.tolist(), strict=True))
+    return SaveData.model_validate(
+        {
+            "player_name": player_name,
+            "progress": progress,
+            "episode": episode,
+            "line": line,
+            "roster": roster,
+            "parts": parts,
+            "battle": save.get("BATL"),
+        }
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class SlotSummary:
+    """What a save screen shows for a slot."""
+
+    slot: int
+    player_name: str
+    progress: int
+    suspended: bool  # a battle was left mid-way
+    mtime: float  # seconds since the epoch
+    size: int  # bytes in the archive
+
+    @classmethod
+    def of(cls, slot: int, meta: bytes, entry: Entry) -> SlotSummary:
+        """Summary from the ``META`` section of a save and its archive entry."""
+        r = Reader(meta)
+        player_name, progress = r.string(), r.zigzag()
+        r.string()  # episode
+        r.zigzag()  # line
+        suspended = bool(r.byte())
+        _, size, mtime = entry
+        return cls(slot, player_name, progress, suspended, mtime, size)
+
+
+class SlotIndex:
+    """Cached summaries of the slots in a save archive.
+
+    :meth:`get` and :meth:`summaries` answer from memory, reading the
+    archive once if nothing has been read yet; call :meth:`refresh` to pick
+    up saves written by something other than :func:`write_slot`, e.g. when
+    a save screen opens. Unreadable slots are left out.
+    """
+
+    def __init__(self, archive: SaveArchive | None = None) -> None:
+        self._archive = archive
+        self._scanned: SaveArchive | None = None
+        self._summaries: dict[int, SlotSummary] = {}
+        # slot -> archive entry the summary was read at
+        self._stamps: dict[int, Entry] = {}
+        self.reads = 0  # slots parsed so far, for tests and benchmarks
+
+    @property
+    def archive(self) -> SaveArchive:
+        return self._archive or save_archive()
+
+    def refresh(self) -> None:
+        """Read the archive's index and re-read only the slots that moved."""
+        archive = self.archive
+        if archive is not self._scanned:
+            self._summaries.clear()
+            self._stamps.clear()
+            self._scanned = archive
+        try:
+            entries = archive.entries()
+        except (OSError, ValueError) as exc:
+            logger.error("reading %s failed: %s", archive.path, exc)
+            entries = {}
+        for slot, entry in entries.items():
+            if self._stamps.get(slot) == entry:
+                continue
+            self._stamps[slot] = entry
+            self.reads += 1
+            try:
+                meta = _read_meta(archive, slot)
+            except ValueError:
+                self._summaries.pop(slot, None)
+                continue
+            self._summaries[slot] = SlotSummary.of(slot, meta, entry)
+        for slot in self._stamps.keys() - entries.keys():
+            del self._stamps[slot]
+            self._summaries.pop(slot, None)
+
+    def _ensure(self) -> None:
+        if self._scanned is not self.archive:
+            self.refresh()
 
+    def get(self, slot: int) -> SlotSummary | None:
+        self._ensure()
+        return self._summaries.get(slot)
 
-def slot_path(slot: int) -> Path:
-    return SAVES_DIR / f"slot{slot}.json"
+    def summaries(self) -> list[SlotSummary]:
+        """Every readable slot, in slot order."""
+        self._ensure()
+        return [self._summaries[slot] for slot in sorted(self._summaries)]
+
+    def update(self, slot: int, data: SaveData, archive: SaveArchive) -> None:
+        """Record that ``data`` was just written to ``archive``."""
+        if self._scanned is not archive:
+            return  # the next lookup reads the archive anyway
+        entry = archive.entry(slot)
+        if entry is None:
+            return
+        self._stamps[slot] = entry
+        self._summaries[slot] = SlotSummary.of(slot, _meta(data), entry)
+
+
+def _read_meta(archive: SaveArchive, slot: int) -> bytes:
+    with archive.view(slot) as view:
+        if view is None:
+            raise SaveFormatError(f"slot {slot} is empty")
+        return SaveFile(view).section("META")
+
+
+_archive: SaveArchive | None = None
+_archive_lock = threading.Lock()
+_index = SlotIndex()
+
+
+def save_archive() -> SaveArchive:
+    """The archive in ``SAVES_DIR``; opened, and filled from older slot
+    files if it does not exist yet, on first use."""
+    global _archive
+    path = SAVES_DIR / ARCHIVE_NAME
+    with _archive_lock:
+        if _archive is None or _archive.path != path:
+            if _archive is not None:
+                _archive.close()
+            _archive = SaveArchive(path)
+            if not _archive.exists:
+                _import_legacy(_archive)
+        return _archive
+
+
+def close_archive() -> None:
+    """Release the archive's file if :func:`save_archive` opened it; never
+    opens one."""
+    with _archive_lock:
+        if _archive is not None:
+            _archive.close()
+
+
+def slot_index() -> SlotIndex:
+    return _index
+
+
+def _import_legacy(archive: SaveArchive) -> None:
+    """Move the per-slot files of older versions into ``archive``."""
+    found: dict[int, list[Path]] = {}
+    try:
+        entries = list(os.scandir(archive.path.parent))
+    except OSError:
+        return  # nothing to move, or the first write reports the problem
+    for entry in entries:
+        match = _SLOT_NAME.fullmatch(entry.name)
+        if match is not None and entry.is_file():
+            # a binary save sorts before a leftover JSON one
+            found.setdefault(int(match.group(1)), []).append(Path(entry.path))
+    for slot, paths in sorted(found.items()):
+        path = min(paths, key=lambda p: p.suffix != ".sav")
+        try:
+            raw = path.read_bytes()
+            if path.suffix == ".json":
+                raw = encode(SaveData.model_validate_json(raw))
+            else:
+                SaveFile(raw)  # reject files that are not saves
+            archive.write(slot, raw)
+        except (OSError, ValueError) as exc:
+            logger.warning("could not move %s into the archive: %s", path, exc)
+            continue
+        for old in paths:
+            old.unlink(missing_ok=True)
 
 
 def load_slot(slot: int) -> Optional[SaveData]:
-    path = slot_path(slot)
-    if path.exists():
-        return SaveData.model_validate_json(path.read_text())
-    return None
+    raw = save_archive().read(slot)
+    return None if raw is None else decode(raw)
+
+
+def _store(archive: SaveArchive, slot: int, data: SaveData) -> None:
+    archive.write(slot, encode(data))
 
 
 def write_slot(slot: int, data: SaveData) -> None:
-    path = slot_path(slot)
-    path.write_text(data.model_dump_json(indent=2), encoding="utf-8")
+    archive = save_archive()
+    _store(archive, slot, data)
+    _index.update(slot, data, archive)
 
 
 def init_slot(slot: int) -> SaveData:
     data = SaveData()
     write_slot(slot, data)
     return data
+
+
+# called with the slot and the error, or None once the save is on disk
+SaveCallback = Callable[[int, BaseException | None], None]
+
+
+class SaveWriter:
+    """Background thread writing save slots.
+
+    :meth:`submit` copies the data and returns at once. Saves to a slot
+    whose previous save has not started yet are merged: only the newest
+    data is written and the callbacks of every merged save are called.
+    Callbacks run inside :meth:`poll`, on the thread that calls it (the
+    window's update loop), never on the writer thread. :meth:`close` waits
+    for every pending save.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._pending: dict[int, tuple[SaveArchive, SaveData, list[SaveCallback]]] = {}
+        self._done: list[
+            tuple[int, SaveArchive, SaveData, BaseException | None, list[SaveCallback]]
+        ] = []
+        self._busy = False
+        self._stop = False
+        self._thread: threading.Thread | None = None
+        self.written = 0
+        self.merged = 0
+
+    def submit(
+        self, slot: int, data: SaveData, callback: SaveCallback | None = None
+    ) -> None:
+        """Queue ``data`` for ``slot``; later changes to ``data`` do not
+        affect this save."""
+        archive = save_archive()
+        data = data.model_copy(deep=True)
+        with self._cond:
+            entry = self._pending.get(slot)
+            callbacks = entry[2] if entry else []
+            if entry:
+                self.merged += 1
+            if callback is not None:
+                callbacks.append(callback)
+            self._pending[slot] = (archive, data, callbacks)
+            self._cond.notify()
+            if self._thread is None:
+                self._stop = False
+                self._thread = threading.Thread(
+                    target=self._run, name="save-writer", daemon=True
+                )
+                self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        """Saves submitted but not yet on disk."""
+        with self._cond:
+            return len(self._pending) + self._busy
+
+    def poll(self) -> int:
+        """Run the callbacks of finished saves; returns how many finished."""
+        with self._cond:
+            done, self._done = self._done, []
+        for slot, archive, data, error, callbacks in done:
+            if error is None:
+                _index.update(slot, data, archive)
+            else:
+                logger.error("saving slot %d failed: %s", slot, error)
+            for callback in callbacks:
+                callback(slot, error)
+        return len(done)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every submitted save is written and run their
+        callbacks; ``False`` if ``timeout`` ran out first."""
+        with self._cond:
+            ok = self._cond.wait_for(
+                lambda: not self._pending and not self._busy, timeout
+            )
+        self.poll()
+        return ok
+
+    def close(self) -> None:
+        """Flush and stop the thread; a later :meth:`submit` restarts it."""
+        self.flush()
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def _run(self) -> None:
+        cond = self._cond
+        while True:
+            with cond:
+                cond.wait_for(lambda: self._pending or self._stop)
+                if not self._pending:
+                    return
+                slot = next(iter(self._pending))
+                archive, data, callbacks = self._pending.pop(slot)
+                self._busy = True
+            error: BaseException | None = None
+            try:
+                _store(archive, slot, data)
+            except Exception as exc:
+                error = exc
+            except BaseException as exc:
+                error = exc
+                raise
+            finally:
+                # whatever happened, flush must not wait for this save forever
+                with cond:
+                    self._busy = False
+                    if error is None:
+                        self.written += 1
+                    self._done.append((slot, archive, data, error, callbacks))
+                    cond.notify_all()
@@ -3,10 +3,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from time import perf_counter_ns
 from typing import List, Optional
 
 import arcade
 
+from .profiler import FrameProfiler
+
 
 class BaseScene:
     """Base class for scenes."""
@@ -28,11 +31,19 @@ class BaseScene:
 
 
 class SceneStack:
-    """Simple stack-based scene manager."""
+    """Simple stack-based scene manager.
 
-    def __init__(self, window: arcade.Window) -> None:
+    With a :class:`FrameProfiler` attached and enabled, every forwarded
+    event is recorded as a span named after the scene class and the event.
+    """
+
+    def __init__(
+        self, window: arcade.Window, profiler: FrameProfiler | None = None
+    ) -> None:
         self.window = window
         self._stack: List[BaseScene] = []
+        self.profiler = profiler
+        self._keys: dict[tuple[type, str], int] = {}
 
     # stack operations
     def push(self, scene: BaseScene) -> None:
@@ -45,18 +56,50 @@ class SceneStack:
         self.pop()
         self.push(scene)
 
+    def _key(self, prof: FrameProfiler, scene: BaseScene, event: str) -> int:
+        key = self._keys.get((type(scene), event))
+        if key is None:
+            key = prof.key(f"{type(scene).__name__}.{event}")
+            self._keys[type(scene), event] = key
+        return key
+
     # event forwarding
     def on_draw(self) -> None:
-        if self._stack:
-            self._stack[-1].on_draw()
+        if not self._stack:
+            return
+        scene = self._stack[-1]
+        prof = self.profiler
+        if prof is None or not prof.enabled:
+            scene.on_draw()
+            return
+        start = perf_counter_ns()
+        scene.on_draw()
+        prof.record(self._key(prof, scene, "draw"), start)
 
     def on_update(self, delta_time: float) -> None:
-        if self._stack:
-            self._stack[-1].on_update(delta_time)
+        if not self._stack:
+            return
+        scene = self._stack[-1]
+        prof = self.profiler
+        if prof is None or not prof.enabled:
+            scene.on_update(delta_time)
+            return
+        prof.frame()
+        start = perf_counter_ns()
+        scene.on_update(delta_time)
+        prof.record(self._key(prof, scene, "update"), start)
 
     def on_key_press(self, symbol: int, modifiers: int) -> None:
-        if self._stack:
-            self._stack[-1].on_key_press(symbol, modifiers)
+        if not self._stack:
+            return
+        scene = self._stack[-1]
+        prof = self.profiler
+        if prof is None or not prof.enabled:
+            scene.on_key_press(symbol, modifiers)
+            return
+        start = perf_counter_ns()
+        scene.on_key_press(symbol, modifiers)
+        prof.record(self._key(prof, scene, "input"), start)
 
     def on_key_release(self, symbol: int, modifiers: int) -> None:
         if self._stack:
@@ -0,0 +1,161 @@
+"""Cached text drawing shared by every scene and widget.
+
+``arcade.draw_text`` lays out the glyphs of its string on every call. The
+:class:`TextCache` keeps the laid-out :class:`arcade.Text` objects instead,
+keyed by everything that affects layout (string, font, size, anchors) plus
+the colour. Drawing a cached string again only moves it or changes its
+alpha, and only when those differ from the previous draw. Least recently
+used entries are dropped once the estimated size of the cache exceeds its
+budget.
+
+Use the module-level :func:`draw_text` as a drop-in for ``arcade.draw_text``.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+
+import arcade
+
+# rough cost of a cached Text: the object and its layout plus vertex data
+# for every glyph
+ENTRY_BYTES = 2048
+GLYPH_BYTES = 160
+DEFAULT_BUDGET = 1 << 20
+DEFAULT_FONT: str | tuple[str, ...] = ("calibri", "arial")
+
+_Key = tuple[str, str | tuple[str, ...], float, bool, str, str, int, int, int]
+
+
+class TextCache:
+    """LRU cache of laid-out text objects within a memory budget."""
+
+    def __init__(self, budget: int = DEFAULT_BUDGET) -> None:
+        self.budget = budget
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[_Key, arcade.Text] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self,
+        text: str,
+        x: float,
+        y: float,
+        color: tuple[int, ...] = arcade.color.WHITE,
+        font_size: float = 12,
+        *,
+        font_name: str | tuple[str, ...] = DEFAULT_FONT,
+        bold: bool = False,
+        anchor_x: str = "left",
+        anchor_y: str = "baseline",
+    ) -> arcade.Text:
+        """Return the text object for these settings placed at ``(x, y)``
+        with the alpha of ``color``."""
+        r, g, b = color[0], color[1], color[2]
+        alpha = color[3] if len(color) > 3 else 255
+        key = (text, font_name, font_size, bold, anchor_x, anchor_y, r, g, b)
+        entries = self._entries
+        obj = entries.get(key)
+        if obj is None:
+            self.misses += 1
+            obj = arcade.Text(
+                text,
+                x,
+                y,
+                (r, g, b, alpha),
+                font_size,
+                font_name=font_name,
+                bold=bold,
+                anchor_x=anchor_x,
+                anchor_y=anchor_y,
+            )
+            entries[key] = obj
+            self.nbytes += _cost(text)
+            self._evict()
+            return obj
+        self.hits += 1
+        entries.move_to_end(key)
+        if obj.x != x or obj.y != y:
+            obj.position = (x, y)
+        if obj.color[3] != alpha:
+            obj.color = (r, g, b, alpha)
+        return obj
+
+    def draw(
+        self,
+        text: str,
+        x: float,
+        y: float,
+        color: tuple[int, ...] = arcade.color.WHITE,
+        font_size: float = 12,
+        *,
+        font_name: str | tuple[str, ...] = DEFAULT_FONT,
+        bold: bool = False,
+        anchor_x: str = "left",
+        anchor_y: str = "baseline",
+    ) -> None:
+        if not text:
+            return
+        self.get(
+            text,
+            x,
+            y,
+            color,
+            font_size,
+            font_name=font_name,
+            bold=bold,
+            anchor_x=anchor_x,
+            anchor_y=anchor_y,
+        ).draw()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.nbytes = 0
+
+    def _evict(self) -> None:
+        entries = self._entries
+        # the newest entry always stays, however large it is
+        while self.nbytes > self.budget and len(entries) > 1:
+            key, _ = entries.popitem(last=False)
+            self.nbytes -= _cost(key[0])
+
+
+def _cost(text: str) -> int:
+    return ENTRY_BYTES + GLYPH_BYTES * len(text)
+
+
+_shared = TextCache()
+
+
+def shared_cache() -> TextCache:
+    return _shared
+
+
+def draw_text(
+    text: str,
+    x: float,
+    y: float,
+    color: tuple[int, ...] = arcade.color.WHITE,
+    font_size: float = 12,
+    *,
+    font_name: str | tuple[str, ...] = DEFAULT_FONT,
+    bold: bool = False,
+    anchor_x: str = "left",
+    anchor_y: str = "baseline",
+) -> None:
+    """Draw through the shared cache; same arguments as ``arcade.draw_text``."""
+    _shared.draw(
+        text,
+        x,
+        y,
+        color,
+        font_size,
+        font_name=font_name,
+        bold=bold,
+        anchor_x=anchor_x,
+        anchor_y=anchor_y,
+    )
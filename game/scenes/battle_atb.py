@@ -6,9 +6,18 @@ from dataclasses import dataclass
 from typing import List, Optional
 
 import arcade
+from arcade.shape_list import ShapeElementList, create_line
 
+from ..battle.core.grid import (
+    DIRECTIONS,
+    EMPTY,
+    DistanceFields,
+    OccupancyGrid,
+)
+from ..battle.core.scheduler import ReadyQueue
 from ..core.input import InputRouter
 from ..core.scene import BaseScene
+from ..core.text import draw_text
 
 GRID_W, GRID_H = 15, 9
 TILE = 32
@@ -40,11 +49,23 @@ class BattleScene(BaseScene):
             Unit("enemy", 13, 2, arcade.color.RED),
             Unit("enemy", 13, 6, arcade.color.RED),
         ]
-        self.queue: List[Unit] = []
+        self.alive = {"player": 0, "enemy": 0}
+        # unit indices by cell, kept in step with moves and deaths
+        self.occupancy = OccupancyGrid(GRID_W, GRID_H)
+        self.fields = DistanceFields(self.occupancy)
+        for i, u in enumerate(self.units):
+            if u.alive:
+                self.alive[u.team] += 1
+                self.occupancy.place(i, u.x, u.y, u.team)
+        self.finished = False
+        # units with a full gauge, by the time it filled up
+        self.queue: ReadyQueue[Unit] = ReadyQueue()
+        self.elapsed = 0.0
         self.acting: Optional[Unit] = None
         self.state = "idle"
         self.command_index = 0
         self.router = InputRouter(menu=self.open_menu)
+        self.grid: ShapeElementList | None = None
 
     # coordinate helpers
     def to_screen(self, x: int, y: int) -> tuple[float, float]:
@@ -58,11 +79,18 @@ class BattleScene(BaseScene):
     # drawing
     def on_draw(self) -> None:  # pragma: no cover - visuals
         self.window.clear()
-        # grid
-        for x in range(GRID_W):
-            arcade.draw_line(x * TILE, 0, x * TILE, GRID_H * TILE, arcade.color.GRAY)
-        for y in range(GRID_H):
-            arcade.draw_line(0, y * TILE, GRID_W * TILE, y * TILE, arcade.color.GRAY)
+        # grid, built once and drawn as a single batch
+        if self.grid is None:
+            self.grid = ShapeElementList()
+            for x in range(GRID_W):
+                self.grid.append(
+                    create_line(x * TILE, 0, x * TILE, GRID_H * TILE, arcade.color.GRAY)
+                )
+            for y in range(GRID_H):
+                self.grid.append(
+                    create_line(0, y * TILE, GRID_W * TILE, y * TILE, arcade.color.GRAY)
+                )
+        self.grid.draw()
         # units
         for u in self.units:
             if not u.alive:
@@ -85,7 +113,7 @@ class BattleScene(BaseScene):
                 arcade.color.GREEN,
             )
             # hp text
-            arcade.draw_text(str(u.hp), sx - 8, sy - 8, arcade.color.WHITE, 12)
+            draw_text(str(u.hp), sx - 8, sy - 8, arcade.color.WHITE, 12)
         # command menu
         if self.state == "command" and self.acting:
             opts = ["移動", "攻撃", "待機"]
@@ -95,7 +123,7 @@ class BattleScene(BaseScene):
                     if i == self.command_index
                     else arcade.color.WHITE
                 )
-                arcade.draw_text(
+                draw_text(
                     opt, GRID_W * TILE + 20, GRID_H * TILE - 40 - i * 20, color, 14
                 )
 
@@ -103,15 +131,18 @@ class BattleScene(BaseScene):
     def on_update(self, delta_time: float) -> None:
         if self.state != "idle":
             return
+        self.elapsed += delta_time
+        queue = self.queue
         for u in self.units:
             if not u.alive:
                 continue
             if u.atb < 1.0:
                 u.atb += delta_time * ATB_RATE
-            if u.atb >= 1.0 and u not in self.queue:
-                self.queue.append(u)
-        if not self.acting and self.queue:
-            self.acting = self.queue.pop(0)
+            if u.atb >= 1.0 and u not in queue:
+                # when the gauge passed full within this frame
+                queue.push(u, self.elapsed - (u.atb - 1.0) / ATB_RATE)
+        if not self.acting and queue:
+            self.acting = queue.pop()
             if self.acting.team == "player":
                 self.state = "command"
                 self.router = InputRouter(
@@ -151,39 +182,47 @@ class BattleScene(BaseScene):
     def do_move(self, dx: int, dy: int) -> None:
         assert self.acting
         nx, ny = self.acting.x + dx, self.acting.y + dy
-        if 0 <= nx < GRID_W and 0 <= ny < GRID_H and not self.unit_at(nx, ny):
-            self.acting.x, self.acting.y = nx, ny
+        if self.occupancy.inside(nx, ny) and not self.unit_at(nx, ny):
+            self.move_unit(self.acting, nx, ny)
         self.end_action()
 
     def do_attack(self) -> None:
         assert self.acting
-        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
-            target = self.unit_at(self.acting.x + dx, self.acting.y + dy, team="enemy")
+        x, y = self.acting.x, self.acting.y
+        if not self.occupancy.boards.adjacent(x, y, "enemy"):
+            return
+        for dx, dy in DIRECTIONS:
+            target = self.unit_at(x + dx, y + dy, team="enemy")
             if target:
-                target.hp -= 5
+                self.damage(target, 5)
                 break
 
     # utilities
     def unit_at(self, x: int, y: int, team: str | None = None) -> Optional[Unit]:
-        for u in self.units:
-            if u.alive and u.x == x and u.y == y and (team is None or u.team == team):
-                return u
-        return None
+        i = self.occupancy.at(x, y)
+        if i == EMPTY:
+            return None
+        u = self.units[i]
+        return u if team is None or u.team == team else None
+
+    def move_unit(self, unit: Unit, x: int, y: int) -> None:
+        self.occupancy.move(unit.x, unit.y, x, y)
+        unit.x, unit.y = x, y
 
     def enemy_act(self, unit: Unit) -> None:
-        # simple AI: move toward nearest player; if adjacent attack
-        target = min(
-            (u for u in self.units if u.team == "player" and u.alive),
-            key=lambda p: abs(p.x - unit.x) + abs(p.y - unit.y),
-        )
-        if abs(target.x - unit.x) + abs(target.y - unit.y) == 1:
-            target.hp -= 5
-        else:
-            dx = 1 if target.x > unit.x else -1 if target.x < unit.x else 0
-            dy = 1 if target.y > unit.y else -1 if target.y < unit.y else 0
-            if not self.unit_at(unit.x + dx, unit.y + dy):
-                unit.x += dx
-                unit.y += dy
+        # attack a player standing next to us, else walk around terrain
+        # toward the closest one, stepping past other units
+        grid = self.occupancy
+        adjacent = grid.boards.adjacent(unit.x, unit.y, "player")
+        if adjacent:
+            first = min(grid.at(x, y) for x, y in grid.boards.cells(adjacent))
+            self.damage(self.units[first], 5)
+            return
+        players = [(p.x, p.y) for p in self.units if p.team == "player" and p.alive]
+        # one field toward every player: the step leads to the closest one
+        step = self.fields.step_toward(unit.x, unit.y, players)
+        if step:
+            self.move_unit(unit, *step)
 
     def end_action(self) -> None:
         assert self.acting
@@ -193,15 +232,27 @@ class BattleScene(BaseScene):
         self.router = InputRouter(menu=self.open_menu)
         self.check_end()
 
-    def check_end(self) -> None:
-        if not any(u.alive and u.team == "enemy" for u in self.units):
-            from .battle_result import BattleResultScene
+    def damage(self, target: Unit, amount: int) -> None:
+        was_alive = target.alive
+        target.hp -= amount
+        if was_alive and not target.alive:
+            self.alive[target.team] -= 1
+            self.occupancy.remove(target.x, target.y)
+            self.queue.remove(target)
 
-            self.window.scene_stack.replace(BattleResultScene(self.window, "win"))
-        if not any(u.alive and u.team == "player" for u in self.units):
-            from .battle_result import BattleResultScene
+    def check_end(self) -> None:
+        if self.finished:
+            return
+        if not self.alive["enemy"]:
+            result = "win"
+        elif not self.alive["player"]:
+            result = "lose"
+        else:
+            return
+        from .battle_result import BattleResultScene
 
-            self.window.scene_stack.replace(BattleResultScene(self.window, "lose"))
+        self.finished = True
+        self.window.scene_stack.replace(BattleResultScene(self.window, result))
 
     def on_key_press(self, symbol: int, modifiers: int) -> None:
         self.router.on_key_press(symbol, modifiers)
@@ -3,9 +3,11 @@
 from __future__ import annotations
 
 import time
+
 import arcade
 
 from ..core.scene import BaseScene
+from ..core.text import draw_text
 
 
 class BattleResultScene(BaseScene):
@@ -17,9 +19,9 @@ class BattleResultScene(BaseScene):
         self.start = time.time()
 
     def on_draw(self) -> None:  # pragma: no cover - visuals
-        arcade.start_render()
+        self.window.clear()
         text = "勝利" if self.result == "win" else "敗北"
-        arcade.draw_text(
+        draw_text(
             text,
             self.window.width / 2,
             self.window.height / 2,
@@ -2,104 +2,211 @@
 
 from __future__ import annotations
 
+import logging
+import secrets
+from collections import deque
+from time import perf_counter_ns
+
 import arcade
 
-from ..battle.core.controller import ALLY_X, ENEMY_X, LANE_Y, BattleController
-from ..battle.core.models import Stats, Unit
+from ..battle.core.ai import DIFFICULTY, AsyncLookaheadPolicy
+from ..battle.core.animations import EffectSystem
+from ..battle.core.controller import SPEEDS, BattleController
+from ..battle.core.events import ActionApplied, BattleEnded
+from ..battle.core.models import Unit
+from ..battle.core.policy import AUTO_POLICIES
+from ..battle.core.replay import Replay, ReplayPlayer, ReplayRecorder
+from ..battle.core.roster import default_roster
+from ..battle.core.skills import skill_table
+from ..battle.core.suspend import resume, suspend
+from ..battle.ui.renderer import FieldRenderer
 from ..battle.ui.widgets import CommandMenu, MessageWindow
 from ..core.input import InputRouter
 from ..core.scene import BaseScene
+from ..core.text import draw_text
+
+logger = logging.getLogger(__name__)
+
+AUTO_LABELS = {
+    "nearest": "ちかい てき",
+    "lowest_hp": "よわった てき",
+    "expected_damage": "ダメージ重視",
+}
 
 
 class BattleShuttleScene(BaseScene):
     """Main battle scene implementing shuttle-run ATB."""
 
-    def __init__(self, window: arcade.Window) -> None:
+    def __init__(
+        self,
+        window: arcade.Window,
+        replay: Replay | None = None,
+        suspended: bytes | None = None,
+    ) -> None:
         super().__init__(window)
-        self.controller = BattleController()
         self.router = InputRouter(menu=self.open_menu)
         self.command_menu = CommandMenu()
         self.msg_window = MessageWindow()
         self.command_unit: Unit | None = None
-        self.controller.on_command = self.start_command
-        self._setup_units()
-
-    def _setup_units(self) -> None:
-        ally_rates = [40, 45, 50]
-        enemy_rates = [35, 40, 45]
-        for i in range(3):
-            stats_a = Stats(
-                max_hp=30,
-                atk=5,
-                defn=3,
-                spd=1.0,
-                atb_rate=ally_rates[i],
-                threshold=100,
-            )
-            u = Unit(
-                id=f"a{i}",
-                name=f"Ally{i}",
-                side="ally",
-                lane=i,
-                stats=stats_a,
-                hp=stats_a.max_hp,
-                pos=(ALLY_X, LANE_Y[i]),
-                home_x=ALLY_X,
-                facing=1,
-            )
-            self.controller.add_unit(u)
-        for i in range(3):
-            stats_b = Stats(
-                max_hp=30,
-                atk=5,
-                defn=3,
-                spd=1.0,
-                atb_rate=enemy_rates[i],
-                threshold=100,
-            )
-            u = Unit(
-                id=f"e{i}",
-                name=f"Enemy{i}",
-                side="enemy",
-                lane=i,
-                stats=stats_b,
-                hp=stats_b.max_hp,
-                pos=(ENEMY_X, LANE_Y[i]),
-                home_x=ENEMY_X,
-                facing=-1,
+        # allies readied while the menu was busy, answered in order
+        self.command_queue: deque[Unit] = deque()
+        self.auto = False
+        self.auto_policy = "expected_damage"
+        self.recorder: ReplayRecorder | None = None
+        self.enemy_ai: AsyncLookaheadPolicy | None = None
+        if replay:
+            # watch a recorded battle; commands come from the replay
+            self.controller = replay.build()
+            self.controller.playback = ReplayPlayer(replay, self.controller)
+        elif suspended:
+            # a replay starts from a fresh roster, so a resumed battle is
+            # not recorded
+            difficulty = self.window.settings.difficulty  # type: ignore[attr-defined]
+            self.enemy_ai = AsyncLookaheadPolicy(DIFFICULTY[difficulty])
+            self.controller = resume(suspended, enemy_policy=self.enemy_ai)
+            self.controller.on_command = self.start_command
+        else:
+            difficulty = self.window.settings.difficulty  # type: ignore[attr-defined]
+            self.enemy_ai = AsyncLookaheadPolicy(DIFFICULTY[difficulty])
+            self.controller = BattleController(
+                secrets.randbits(32), enemy_policy=self.enemy_ai
             )
-            self.controller.add_unit(u)
+            self.controller.on_command = self.start_command
+            self.controller.add_units(default_roster())
+            if self.window.settings.record_replays:  # type: ignore[attr-defined]
+                self.recorder = ReplayRecorder(self.controller)
+                self.controller.recorder = self.recorder
+        self.controller.profiler = getattr(self.window, "profiler", None)
+        self.effects = EffectSystem()
+        self.camera = arcade.Camera2D()
+        self.field = FieldRenderer()
+        self.controller.on_effect = self.effects.play_effect
+        self.controller.on_damage = self.effects.pop_damage
+        self.controller.events.subscribe(ActionApplied, self.on_action)
+        self.controller.events.subscribe(BattleEnded, self.on_battle_end)
+        if suspended:
+            # commands pending when the battle was suspended are asked again
+            self.controller.hand_over("enemy")
+            for unit in self.controller.units.values():
+                if unit.side == "ally" and unit.state == "COMMAND":
+                    self.start_command(unit)
 
     def open_menu(self) -> None:
         from .main_menu import MainMenuScene  # type: ignore
 
+        # saving from the menu keeps the battle to resume it later
+        data = getattr(self.window, "save_data", None)
+        if data is not None and not self.controller.playback:
+            data.battle = suspend(self.controller)
         self.window.scene_stack.push(MainMenuScene(self.window))  # type: ignore[attr-defined]
 
     # event hooks
     def on_draw(self) -> None:  # pragma: no cover - visual
         self.window.clear()
-        self.controller.draw_field()
+        dx, dy = self.effects.offset()
+        self.camera.position = (
+            self.window.width / 2 + dx,
+            self.window.height / 2 + dy,
+        )
+        with self.camera.activate():
+            self.field.draw(self.controller.units.values())
+            self.effects.draw()
         self.command_menu.draw()
         self.msg_window.draw(self.window.width, self.window.height)
-        self.controller.draw_effect()
+        speed = self.controller.speed
+        label = "MAX" if speed is None else f"x{speed:g}"
+        if self.auto:
+            label = f"AUTO {AUTO_LABELS[self.auto_policy]}  {label}"
+        draw_text(
+            label,
+            self.window.width - 20,
+            self.window.height - 30,
+            arcade.color.WHITE,
+            14,
+            anchor_x="right",
+        )
 
     def on_update(self, delta_time: float) -> None:
+        before = self.controller.clock
         self.controller.update(delta_time)
-        if self.controller.last_message:
-            self.msg_window.push(self.controller.last_message)
-            self.controller.last_message = None
-        result = self.controller.check_victory()
-        if result != "ongoing":
-            from .battle_result import BattleResultScene
-
-            outcome = "win" if result == "ally" else "lose"
-            self.window.scene_stack.replace(BattleResultScene(self.window, outcome))
+        prof = self.controller.profiler
+        if prof is None or not prof.enabled:
+            self.effects.update(self.controller.clock - before)
+            return
+        start = perf_counter_ns()
+        self.effects.update(self.controller.clock - before)
+        prof.record(prof.key("battle.animations"), start)
 
     def on_key_press(self, symbol: int, modifiers: int) -> None:
+        if symbol == arcade.key.F:
+            self.cycle_speed()
+            return
+        if not self.controller.playback:
+            if symbol == arcade.key.A:
+                self.set_auto(not self.auto)
+                return
+            if symbol == arcade.key.P:
+                self.cycle_auto_policy()
+                return
         self.router.on_key_press(symbol, modifiers)
 
+    def cycle_speed(self) -> None:
+        i = SPEEDS.index(self.controller.speed)
+        self.controller.speed = SPEEDS[(i + 1) % len(SPEEDS)]
+
+    # auto-battle
+    def set_auto(self, on: bool) -> None:
+        self.auto = on
+        if not on:
+            self.controller.policies["ally"] = None
+            return
+        self.controller.policies["ally"] = AUTO_POLICIES[self.auto_policy]()
+        self.command_queue.clear()
+        self.close_command_menu()
+        self.controller.hand_over("ally")
+
+    def cycle_auto_policy(self) -> None:
+        names = list(AUTO_POLICIES)
+        self.auto_policy = names[(names.index(self.auto_policy) + 1) % len(names)]
+        if self.auto:
+            self.controller.policies["ally"] = AUTO_POLICIES[self.auto_policy]()
+
+    # battle events
+    def on_action(self, event: ActionApplied) -> None:
+        user = event.user.name
+        skill = skill_table()[event.skill_id].name
+        target = event.target.name
+        if not event.hit:
+            text = f"{user} の {skill} は ミス！"
+        elif event.target.hp <= 0:
+            text = f"{user} の {skill}！ {target} を たおした!"
+        else:
+            text = f"{user} の {skill}！ {target} に {event.damage} ダメージ"
+        self.msg_window.push(text)
+        logger.info(text)
+
+    def on_battle_end(self, event: BattleEnded) -> None:
+        from .battle_result import BattleResultScene
+
+        if self.enemy_ai:
+            self.enemy_ai.cancel()
+        data = getattr(self.window, "save_data", None)
+        if data is not None:
+            data.battle = None
+        if self.recorder:
+            # encoded here, written and pruned off the UI thread
+            self.window.replay_writer.submit(  # type: ignore[attr-defined]
+                self.recorder.finish()
+            )
+
+        outcome = "win" if event.winner == "ally" else "lose"
+        self.window.scene_stack.replace(BattleResultScene(self.window, outcome))
+
     # command menu handlers
     def start_command(self, unit: Unit) -> None:
+        if self.command_unit:
+            self.command_queue.append(unit)
+            return
         self.command_unit = unit
         self.command_menu.visible = True
         self.command_menu.index = 0
@@ -123,19 +230,33 @@ class BattleShuttleScene(BaseScene):
     def cmd_confirm(self) -> None:
         if not self.command_unit:
             return
+        if self.command_unit.state != "COMMAND":
+            # killed while the menu was open
+            self.close_command_menu()
+            self._next_command()
+            return
         choice = self.command_menu.options[self.command_menu.index]
         if choice == "たたかう":
-            target = self.controller._find_target(self.command_unit)
+            target = self.controller.find_target(self.command_unit)
             if target:
                 self.controller.decide_action(self.command_unit, "melee_punch", target)
             else:
                 self.msg_window.push("ターゲットがいない")
-                self.command_unit.atb = 0.0
-                self.command_unit.state = "IDLE"
+                self.controller.wait(self.command_unit)
         else:
-            self.command_unit.atb = 0.0
-            self.command_unit.state = "IDLE"
+            self.controller.wait(self.command_unit)
             self.msg_window.push(f"{self.command_unit.name} は まった")
+        self.close_command_menu()
+        self._next_command()
+
+    def _next_command(self) -> None:
+        while self.command_queue:
+            unit = self.command_queue.popleft()
+            if unit.state == "COMMAND":
+                self.start_command(unit)
+                break
+
+    def close_command_menu(self) -> None:
         self.command_menu.visible = False
         self.command_unit = None
         self.router = InputRouter(menu=self.open_menu)
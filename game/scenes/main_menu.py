@@ -8,8 +8,8 @@ from typing import Any, cast
 import arcade
 
 from ..core.input import InputRouter
-from ..core.saveio import write_slot
 from ..core.scene import BaseScene
+from ..core.text import draw_text
 
 
 class MainMenuScene(BaseScene):
@@ -47,12 +47,14 @@ class MainMenuScene(BaseScene):
             slot = getattr(self.window, "save_slot", None)
             data = getattr(self.window, "save_data", None)
             if slot and data:
-                write_slot(slot, data)
-                self.toast = "セーブしました"
-                self.toast_time = time.time()
+                self.window.save_writer.submit(slot, data, self.saved)
         elif opt == "戻る":
             self.close()
 
+    def saved(self, slot: int, error: BaseException | None) -> None:
+        self.toast = "セーブしました" if error is None else "セーブに失敗しました"
+        self.toast_time = time.time()
+
     def on_key_press(self, symbol: int, modifiers: int) -> None:
         self.router.on_key_press(symbol, modifiers)
 
@@ -67,7 +69,7 @@ class MainMenuScene(BaseScene):
         )
         for i, opt in enumerate(self.options):
             color = arcade.color.YELLOW if i == self.index else arcade.color.WHITE
-            arcade.draw_text(
+            draw_text(
                 opt,
                 self.window.width / 2,
                 self.window.height / 2 - i * 40 + 80,
@@ -76,7 +78,7 @@ class MainMenuScene(BaseScene):
                 anchor_x="center",
             )
         if self.toast and time.time() - self.toast_time < 2:
-            arcade.draw_text(
+            draw_text(
                 self.toast,
                 self.window.width - 10,
                 self.window.height - 30,
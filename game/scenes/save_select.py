@@ -2,11 +2,16 @@
 
 from __future__ import annotations
 
+import logging
+
 import arcade
 
 from ..core.input import InputRouter
-from ..core.saveio import SaveData, init_slot, load_slot
+from ..core.saveio import init_slot, load_slot, slot_index
 from ..core.scene import BaseScene
+from ..core.text import draw_text
+
+logger = logging.getLogger(__name__)
 
 
 class SaveSelectScene(BaseScene):
@@ -16,6 +21,9 @@ class SaveSelectScene(BaseScene):
         super().__init__(window)
         self.mode = mode  # "continue" or "new"
         self.index = 0
+        # read the slots once on entry; drawing only looks them up
+        self.slots = slot_index()
+        self.slots.refresh()
         self.router = InputRouter(
             up=self.move_up,
             down=self.move_down,
@@ -34,16 +42,27 @@ class SaveSelectScene(BaseScene):
 
     def confirm(self) -> None:
         slot = self.index + 1
-        data = load_slot(slot)
+        data = None
+        if self.slots.get(slot):
+            try:
+                data = load_slot(slot)
+            except (OSError, ValueError):
+                logger.exception("cannot load slot %d", slot)
         if self.mode == "new" and data is None:
             data = init_slot(slot)
         if data is None:
             return  # cannot continue empty slot
         self.window.save_slot = slot  # type: ignore[attr-defined]
         self.window.save_data = data  # type: ignore[attr-defined]
-        from .story import StoryScene
         from .main_menu import MainMenuScene
+        from .story import StoryScene
+
+        if self.mode == "continue" and data.battle is not None:
+            from .battle_shuttle import BattleShuttleScene
 
+            battle = BattleShuttleScene(self.window, suspended=data.battle)
+            self.window.scene_stack.replace(battle)
+            return
         story = StoryScene(self.window)
         self.window.scene_stack.replace(story)
         self.window.scene_stack.push(MainMenuScene(self.window))
@@ -53,7 +72,7 @@ class SaveSelectScene(BaseScene):
 
     def on_draw(self) -> None:  # pragma: no cover - visuals
         self.window.clear()
-        arcade.draw_text(
+        draw_text(
             "セーブスロット",
             self.window.width / 2,
             self.window.height - 100,
@@ -62,12 +81,14 @@ class SaveSelectScene(BaseScene):
         )
         for i in range(3):
             slot = i + 1
-            data = load_slot(slot)
+            summary = self.slots.get(slot)
             text = f"{slot}: " + (
-                f"{data.player_name} Lv{data.progress}" if data else "----"
+                f"{summary.player_name} Lv{summary.progress}" if summary else "----"
             )
+            if summary and summary.suspended:
+                text += " (バトル中断)"
             color = arcade.color.YELLOW if i == self.index else arcade.color.WHITE
-            arcade.draw_text(
+            draw_text(
                 text,
                 self.window.width / 2,
                 self.window.height / 2 - i * 40,
@@ -11,6 +11,7 @@ import arcade
 from ..core.config import DATA_DIR
 from ..core.input import InputRouter
 from ..core.scene import BaseScene
+from ..core.text import draw_text
 
 
 class StoryScene(BaseScene):
@@ -38,8 +39,8 @@ class StoryScene(BaseScene):
             100,
             (0, 0, 0, 180),
         )
-        arcade.draw_text(line1, 40, box_y + 20, arcade.color.WHITE, 18)
-        arcade.draw_text(line2, 40, box_y - 10, arcade.color.WHITE, 18)
+        draw_text(line1, 40, box_y + 20, arcade.color.WHITE, 18)
+        draw_text(line2, 40, box_y - 10, arcade.color.WHITE, 18)
 
     def advance(self) -> None:
         self.index += 1
@@ -6,6 +6,7 @@ import arcade
 
 from ..core.input import InputRouter
 from ..core.scene import BaseScene
+from ..core.text import draw_text
 
 
 class TitleScene(BaseScene):
@@ -40,7 +41,7 @@ class TitleScene(BaseScene):
 
     def on_draw(self) -> None:  # pragma: no cover - visuals
         self.window.clear()
-        arcade.draw_text(
+        draw_text(
             "MEDABATTLE",
             self.window.width / 2,
             self.window.height - 100,
@@ -49,7 +50,7 @@ class TitleScene(BaseScene):
         )
         for i, opt in enumerate(self.options):
             color = arcade.color.YELLOW if i == self.index else arcade.color.WHITE
-            arcade.draw_text(
+            draw_text(
                 opt,
                 self.window.width / 2,
                 self.window.height / 2 - i * 40,
@@ -0,0 +1,291 @@
+"""Headless Monte Carlo battle simulator.
+
+Runs many seeded shuttle-run battles with policies on both sides and reports
+the ally win rate with a confidence interval, battle durations and damage
+distributions::
+
+    python -m game.sim --battles 10000 --ally-rates 40,45,50 --enemy-rates 35,40,45
+
+Battles are spread over a ``ProcessPoolExecutor`` in chunks of seeds and
+progress is printed as chunks finish. The final report is computed from the
+outcomes sorted by seed, so the same seed range always gives identical
+numbers regardless of worker count or completion order.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, replace
+from typing import Any
+
+from .battle.core.ai import DIFFICULTY, LookaheadPolicy
+from .battle.core.controller import MAX_TICKS, BattleController
+from .battle.core.policy import CommandPolicy, NearestTargetPolicy
+from .battle.core.roster import DEFAULT_ALLY_RATES, DEFAULT_ENEMY_RATES, default_roster
+
+
+@dataclass(frozen=True, slots=True)
+class BattleOutcome:
+    """Result of one simulated battle."""
+
+    seed: int
+    winner: str
+    ticks: int
+    duration: float
+    ally_damage: int
+    enemy_damage: int
+    hits: tuple[tuple[int, int], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Matchup:
+    """Roster parameters shared by every battle of a run."""
+
+    ally_rates: tuple[float, ...] = DEFAULT_ALLY_RATES
+    enemy_rates: tuple[float, ...] = DEFAULT_ENEMY_RATES
+    max_ticks: int = MAX_TICKS
+    enemy_ai: str = "nearest"  # or a DIFFICULTY level
+
+
+def _enemy_policy(name: str) -> CommandPolicy:
+    if name == "nearest":
+        return NearestTargetPolicy()
+    # no deadline: the search must not depend on machine speed
+    return LookaheadPolicy(replace(DIFFICULTY[name], deadline=None))
+
+
+def simulate_battle(seed: int, matchup: Matchup) -> BattleOutcome:
+    """Play one battle to the end with the default policies on both sides."""
+    ctrl = BattleController(
+        seed,
+        ally_policy=NearestTargetPolicy(),
+        enemy_policy=_enemy_policy(matchup.enemy_ai),
+    )
+    ctrl.add_units(default_roster(matchup.ally_rates, matchup.enemy_rates))
+    hits: Counter[int] = Counter()
+
+    def record(value: int, _pos: object) -> None:
+        hits[value] += 1
+
+    ctrl.on_damage = record
+    winner = ctrl.run(matchup.max_ticks)
+    taken = {"ally": 0, "enemy": 0}
+    for unit in ctrl.units.values():
+        # overkill on the last hit is not damage the side took
+        taken[unit.side] += unit.stats.max_hp - max(unit.hp, 0)
+    return BattleOutcome(
+        seed=seed,
+        winner=winner,
+        ticks=ctrl.ticks,
+        duration=ctrl.elapsed,
+        ally_damage=taken["enemy"],
+        enemy_damage=taken["ally"],
+        hits=tuple(sorted(hits.items())),
+    )
+
+
+def simulate_chunk(seeds: Sequence[int], matchup: Matchup) -> list[BattleOutcome]:
+    return [simulate_battle(seed, matchup) for seed in seeds]
+
+
+def _chunks(seeds: Sequence[int], size: int) -> Iterator[Sequence[int]]:
+    for i in range(0, len(seeds), size):
+        yield seeds[i : i + size]
+
+
+def run_battles(
+    seeds: Sequence[int],
+    matchup: Matchup,
+    *,
+    workers: int | None = None,
+    chunk_size: int | None = None,
+    on_chunk: Callable[[list[BattleOutcome]], None] | None = None,
+) -> list[BattleOutcome]:
+    """Simulate every seed and return the outcomes sorted by seed.
+
+    ``on_chunk`` is called in the parent process as each chunk completes.
+    With ``workers=1`` everything runs in-process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        # several chunks per worker keeps cores busy while still streaming
+        chunk_size = max(1, math.ceil(len(seeds) / (workers * 8)))
+    outcomes: list[BattleOutcome] = []
+    if workers == 1:
+        for chunk in _chunks(seeds, chunk_size):
+            done = simulate_chunk(chunk, matchup)
+            outcomes.extend(done)
+            if on_chunk:
+                on_chunk(done)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(simulate_chunk, chunk, matchup)
+                for chunk in _chunks(seeds, chunk_size)
+            ]
+            for future in as_completed(futures):
+                done = future.result()
+                outcomes.extend(done)
+                if on_chunk:
+                    on_chunk(done)
+    outcomes.sort(key=lambda o: o.seed)
+    return outcomes
+
+
+def wilson_interval(wins: int, n: int, z: float = 1.96) -> tuple[float, float]:
+    """Wilson score interval for a binomial proportion."""
+    if n == 0:
+        return (0.0, 1.0)
+    p = wins / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return (max(0.0, centre - half), min(1.0, centre + half))
+
+
+def _distribution(values: Iterable[float]) -> dict[str, float]:
+    data = sorted(values)
+    if not data:
+        return {}
+    pct = statistics.quantiles(data, n=20, method="inclusive") if len(data) > 1 else []
+
+    def at(i: int) -> float:
+        return pct[i] if pct else data[0]
+
+    return {
+        "mean": statistics.fmean(data),
+        "stdev": statistics.pstdev(data),
+        "min": data[0],
+        "p5": at(0),
+        "p50": at(9),
+        "p95": at(18),
+        "max": data[-1],
+    }
+
+
+def summarize(outcomes: Sequence[BattleOutcome]) -> dict[str, Any]:
+    """Aggregate outcomes (sorted by seed) into a JSON-friendly report."""
+    n = len(outcomes)
+    wins = sum(1 for o in outcomes if o.winner == "ally")
+    losses = sum(1 for o in outcomes if o.winner == "enemy")
+    low, high = wilson_interval(wins, n)
+    hits: Counter[int] = Counter()
+    for o in outcomes:
+        hits.update(dict(o.hits))
+    swings = sum(hits.values())
+    return {
+        "battles": n,
+        "ally_wins": wins,
+        "enemy_wins": losses,
+        "unfinished": n - wins - losses,
+        "win_rate": wins / n if n else 0.0,
+        "win_rate_ci95": [low, high],
+        "duration": _distribution(o.duration for o in outcomes),
+        "ally_damage": _distribution(o.ally_damage for o in outcomes),
+        "enemy_damage": _distribution(o.enemy_damage for o in outcomes),
+        "miss_rate": hits[0] / swings if swings else 0.0,
+        "hit_damage": {str(k): v for k, v in sorted(hits.items())},
+    }
+
+
+def _rates(text: str) -> tuple[float, ...]:
+    try:
+        return tuple(float(v) for v in text.split(","))
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid rate list: {text!r}") from exc
+
+
+def _format_report(report: dict[str, Any]) -> str:
+    dist = report["duration"]
+    ally = report["ally_damage"]
+    enemy = report["enemy_damage"]
+    low, high = report["win_rate_ci95"]
+    return "\n".join(
+        [
+            f"battles      {report['battles']}"
+            f" (ally {report['ally_wins']} / enemy {report['enemy_wins']}"
+            f" / unfinished {report['unfinished']})",
+            f"win rate     {report['win_rate']:.4f}"
+            f"  95% CI [{low:.4f}, {high:.4f}]",
+            f"duration     mean {dist.get('mean', 0):.2f}s"
+            f"  p50 {dist.get('p50', 0):.2f}s  p95 {dist.get('p95', 0):.2f}s",
+            f"ally dmg     mean {ally.get('mean', 0):.1f}"
+            f"  p5 {ally.get('p5', 0):.0f}  p95 {ally.get('p95', 0):.0f}",
+            f"enemy dmg    mean {enemy.get('mean', 0):.1f}"
+            f"  p5 {enemy.get('p5', 0):.0f}  p95 {enemy.get('p95', 0):.0f}",
+            f"miss rate    {report['miss_rate']:.4f}",
+            f"hit damage   {report['hit_damage']}",
+        ]
+    )
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m game.sim", description="Simulate shuttle-run battles."
+    )
+    parser.add_argument("-n", "--battles", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="first seed of the range")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument(
+        "--ally-rates", type=_rates, default=DEFAULT_ALLY_RATES, metavar="R,R,R"
+    )
+    parser.add_argument(
+        "--enemy-rates", type=_rates, default=DEFAULT_ENEMY_RATES, metavar="R,R,R"
+    )
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS)
+    parser.add_argument(
+        "--enemy-ai",
+        choices=["nearest", *DIFFICULTY],
+        default="nearest",
+        help="enemy policy: nearest target or lookahead search at a difficulty",
+    )
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no progress output")
+    args = parser.parse_args(argv)
+
+    matchup = Matchup(args.ally_rates, args.enemy_rates, args.max_ticks, args.enemy_ai)
+    seeds = range(args.seed, args.seed + args.battles)
+    done = 0
+    wins = 0
+
+    def progress(chunk: list[BattleOutcome]) -> None:
+        nonlocal done, wins
+        done += len(chunk)
+        wins += sum(1 for o in chunk if o.winner == "ally")
+        if not args.quiet:
+            print(
+                f"\r{done}/{args.battles} battles, win rate {wins / done:.3f}",
+                end="",
+                file=sys.stderr,
+                flush=True,
+            )
+
+    outcomes = run_battles(
+        seeds,
+        matchup,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        on_chunk=progress,
+    )
+    if not args.quiet:
+        print(file=sys.stderr)
+    report = summarize(outcomes)
+    report["matchup"] = asdict(matchup)
+    report["seeds"] = [args.seed, args.seed + args.battles]
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(_format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,38 @@
 """Entry point for Medabattle Arcade prototype."""
 
-from game.app import MainApp
+import sys
+from pathlib import Path
+
+USAGE = "usage: main.py [--replay FILE.mbr | --simulate [sim options]]"
 
 
 def main() -> None:
+    args = sys.argv[1:]
+    if "--simulate" in args:
+        # headless balance run; remaining arguments go to game.sim
+        from game.sim import main as simulate
+
+        simulate([a for a in args if a != "--simulate"])
+        return
+
+    replay = None
+    if "--replay" in args:
+        # watch a recorded battle (game/data/replays/*.mbr) at real speed
+        from game.battle.core.replay import ReplayError, load
+
+        i = args.index("--replay")
+        if i + 1 >= len(args):
+            sys.exit(USAGE)
+        try:
+            replay = load(Path(args[i + 1]))
+        except (OSError, ReplayError) as exc:
+            sys.exit(f"cannot load replay {args[i + 1]}: {exc}")
+
+    from game.app import MainApp
+
     app = MainApp()
+    if replay is not None:
+        app.watch_replay(replay)
     app.run()
 
 